@@ -0,0 +1,136 @@
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from agents.report_jobs import REPORT_QUEUE_LIMIT, REPORT_WORKERS
+
+# Graph runs (agent lookups) at once, and how many more may wait before new requests are turned away
+ANALYSIS_CONCURRENCY = int(os.environ.get("ANALYSIS_CONCURRENCY", "8"))
+ANALYSIS_QUEUE_LIMIT = int(os.environ.get("ANALYSIS_QUEUE_LIMIT", "64"))
+
+# PDF text extractions at once; parsing is CPU-bound, so keep this near the core count
+DOCUMENT_CONCURRENCY = int(os.environ.get("DOCUMENT_CONCURRENCY", "2"))
+DOCUMENT_QUEUE_LIMIT = int(os.environ.get("DOCUMENT_QUEUE_LIMIT", "16"))
+
+# Longest a blocking caller waits for a document or report slot before giving up
+STAGE_WAIT_SECONDS = float(os.environ.get("STAGE_WAIT_SECONDS", "60"))
+
+class StageBusy(RuntimeError):
+    """A stage's wait queue is full, or a caller gave up waiting for a slot"""
+
+class Stage:
+    """Bounded concurrency for one kind of work, with a first-come-first-served wait queue.
+
+    Callers take a ticket with join(), which is refused once queue_limit
+    callers are already waiting, then start() when a slot frees up. The
+    ticket's position() can be shown to the user while it waits.
+    """
+
+    def __init__(self, name: str, limit: int, queue_limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_limit = queue_limit
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting: "deque[object]" = deque()
+        self._counters = {"admitted": 0, "rejected": 0, "abandoned": 0}
+
+    def join(self) -> object:
+        """Take a place in line; raises StageBusy when the line is full"""
+        with self._cond:
+            if self._active >= self.limit and len(self._waiting) >= self.queue_limit:
+                self._counters["rejected"] += 1
+                raise StageBusy(f"{self.name} queue is full ({len(self._waiting)} waiting)")
+            ticket = object()
+            self._waiting.append(ticket)
+            return ticket
+
+    def start(self, ticket: object, timeout: Optional[float] = None) -> bool:
+        """Wait up to `timeout` for the ticket's turn; True once it holds a slot"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._waiting[0] is ticket and self._active < self.limit, timeout):
+                return False
+            self._waiting.popleft()
+            self._active += 1
+            self._counters["admitted"] += 1
+            # The next ticket may be able to start too
+            self._cond.notify_all()
+            return True
+
+    def position(self, ticket: object) -> int:
+        """1-based place in line, or 0 once the ticket is running or gone"""
+        with self._cond:
+            try:
+                return self._waiting.index(ticket) + 1
+            except ValueError:
+                return 0
+
+    def cancel(self, ticket: object):
+        """Give up a place in line (the user left or the wait timed out)"""
+        with self._cond:
+            try:
+                self._waiting.remove(ticket)
+            except ValueError:
+                return
+            self._counters["abandoned"] += 1
+            self._cond.notify_all()
+
+    def leave(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = STAGE_WAIT_SECONDS) -> Iterator[None]:
+        """Hold a slot for the duration of the block, waiting for one if needed"""
+        ticket = self.join()
+        if not self.start(ticket, timeout):
+            self.cancel(ticket)
+            raise StageBusy(f"Timed out after {timeout:g}s waiting for {self.name} capacity")
+        try:
+            yield
+        finally:
+            self.leave()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "active": self._active,
+                "waiting": len(self._waiting),
+                "limit": self.limit,
+                "queue_limit": self.queue_limit,
+                **self._counters
+            }
+
+# "analysis" runs the graph for a request, "document" parses PDFs, "report" renders reports
+stages = {
+    "analysis": Stage("analysis", ANALYSIS_CONCURRENCY, ANALYSIS_QUEUE_LIMIT),
+    "document": Stage("document", DOCUMENT_CONCURRENCY, DOCUMENT_QUEUE_LIMIT),
+    "report": Stage("report", REPORT_WORKERS, REPORT_QUEUE_LIMIT)
+}
+
+def stage_stats() -> Dict[str, Dict[str, int]]:
+    return {name: stage.stats() for name, stage in stages.items()}
+
+def metrics_lines() -> List[str]:
+    """Prometheus lines for the /metrics endpoint"""
+    stats = stage_stats()
+    lines = [
+        "# HELP pharma_stage_active Work items holding a slot, by stage",
+        "# TYPE pharma_stage_active gauge"
+    ]
+    lines += [f'pharma_stage_active{{stage="{name}"}} {s["active"]}' for name, s in stats.items()]
+    lines += [
+        "# HELP pharma_stage_waiting Work items waiting for a slot, by stage",
+        "# TYPE pharma_stage_waiting gauge"
+    ]
+    lines += [f'pharma_stage_waiting{{stage="{name}"}} {s["waiting"]}' for name, s in stats.items()]
+    lines += [
+        "# HELP pharma_stage_requests_total Work items admitted, rejected because the queue was full, or abandoned while waiting",
+        "# TYPE pharma_stage_requests_total counter"
+    ]
+    for name, s in stats.items():
+        for outcome in ("admitted", "rejected", "abandoned"):
+            lines.append(f'pharma_stage_requests_total{{stage="{name}",outcome="{outcome}"}} {s[outcome]}')
+    return lines
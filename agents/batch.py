@@ -0,0 +1,146 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+# Allow running as `python agents/batch.py` as well as `python -m agents.batch`
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from agents.master_agent import AGENT_NODES, master_orchestrator
+from agents.data_index import preload
+from agents.exports import resolve_formats, write_exports
+from agents.results import json_default
+from agents.single_flight import lookup_key
+
+logger = logging.getLogger("agents.batch")
+
+# Fields copied from the parsed state into every batch result
+RESULT_FIELDS = ["query", "molecule", "disease", "therapy_area", "geography", "query_type", "analysis_scope", "subtasks"]
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    """Read queries from JSONL, CSV or a {"queries": [...]} JSON file"""
+    items: List[Any] = []
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                items.append({"query": row.get("query") or next(iter(row.values()), ""),
+                              "uploaded_file_path": row.get("uploaded_file_path") or None})
+    elif path.endswith(".jsonl"):
+        with open(path) as f:
+            items = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path) as f:
+            data = json.load(f)
+        items = data.get("queries", []) if isinstance(data, dict) else data
+
+    queries = []
+    for item in items:
+        if isinstance(item, str):
+            item = {"query": item}
+        if item.get("query", "").strip():
+            queries.append({"query": item["query"].strip(), "uploaded_file_path": item.get("uploaded_file_path")})
+    return queries
+
+def _run_agent(task: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    return AGENT_NODES[task](state).get(task, {})
+
+def _warm_datasets():
+    # Load every data source once per worker process; columnar datasets are
+    # memory-mapped, so the processes share their pages
+    for name in ["iqvia_mock.json", "exim_mock.json", "patent_mock.json", "clinical_mock.json", "web_search_mock.json"]:
+        try:
+            preload(name)
+        except FileNotFoundError:
+            pass
+
+def _make_executor(kind: str, workers: int) -> Executor:
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers, initializer=_warm_datasets)
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+    raise ValueError(f"Unknown executor: {kind}")
+
+def run_batch(queries: List[Dict[str, Any]], workers: int = 4, executor: str = "thread") -> List[Dict[str, Any]]:
+    """Parse every query, run each distinct (agent, entity) lookup once, and assemble per-query results"""
+    started = time.perf_counter()
+
+    # Parse all queries up front
+    inputs = [{"query": q["query"], "uploaded_file_path": q.get("uploaded_file_path")} for q in queries]
+    states = [{**state, **master_orchestrator(state)} for state in inputs]
+
+    # Group agent work by resolved entities
+    lookups: Dict[Tuple, Dict[str, Any]] = {}
+    for state in states:
+        for task in state["subtasks"]:
+            if task in AGENT_NODES:
+                lookups.setdefault(lookup_key(task, state), state)
+
+    outputs: Dict[Tuple, Dict[str, Any]] = {}
+    with _make_executor(executor, workers) as pool:
+        futures = {key: pool.submit(_run_agent, key[0], state) for key, state in lookups.items()}
+        for key, future in futures.items():
+            try:
+                outputs[key] = future.result()
+            except Exception as e:
+                outputs[key] = {"status": "error", "data": {}, "summary": f"Error running {key[0]} agent: {str(e)}"}
+
+    results = []
+    for state in states:
+        result = {field: state.get(field) for field in RESULT_FIELDS}
+        for task in state["subtasks"]:
+            if task in AGENT_NODES:
+                result[task] = outputs[lookup_key(task, state)]
+        results.append(result)
+
+    elapsed = time.perf_counter() - started
+    naive_calls = sum(len(s["subtasks"]) for s in states)
+    logger.info("Batch: %d queries, %d agent lookups (vs %d unbatched) in %.2fs (%.1f queries/s)",
+                len(states), len(lookups), naive_calls, elapsed, len(states) / elapsed if elapsed else 0)
+    return results
+
+def write_jsonl(results: List[Dict[str, Any]], path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        for result in results:
+            f.write(json.dumps(result, default=json_default) + "\n")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run many pharmaceutical intelligence queries at once")
+    parser.add_argument("input", nargs="?", default=os.path.join("mock_data", "synthetic_queries.json"),
+                        help="JSONL, CSV or JSON file of queries")
+    parser.add_argument("-o", "--output", default=os.path.join("reports", "batch_results.jsonl"),
+                        help="where to write one JSON result per query")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="number of parallel workers")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--report", action="store_true", help="also write one combined PDF report")
+    parser.add_argument("--formats", default="",
+                        help="also export the results, e.g. xlsx,csv,json (pdf is the same as --report)")
+    parser.add_argument("--export-base", default=os.path.join("reports", "batch_results"),
+                        help="path prefix of the exported files (extension and section are appended)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        formats = resolve_formats(args.formats) if args.formats else []
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = run_batch(load_queries(args.input), workers=args.workers, executor=args.executor)
+    write_jsonl(results, args.output)
+    print(f"Results written to {args.output}")
+
+    if args.report or "pdf" in formats:
+        from agents.report_agent import generate_batch_report
+        print(f"Combined report written to {generate_batch_report(results)}")
+    if any(f != "pdf" for f in formats):
+        for path in write_exports(results, formats, args.export_base):
+            print(f"Exported {path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
-import json
-import os
 from typing import Dict, Any
+from agents.connectors import lookup
+from agents.results import AgentResult
+from agents.trial_store import get_trial_store
 
 def fetch_clinical_trials(state: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -12,20 +13,10 @@ def fetch_clinical_trials(state: Dict[str, Any]) -> Dict[str, Any]:
     query = state.get("query", "")
     
     search_key = molecule or disease or therapy_area or query
-    search_key_lower = search_key.lower() if search_key else ""
-    
-    mock_file = os.path.join("mock_data", "clinical_mock.json")
     
     try:
-        with open(mock_file, 'r') as f:
-            data = json.load(f)
-        
-        # Try exact match first, then case-insensitive
-        result = None
-        for key in data.keys():
-            if key.lower() == search_key_lower:
-                result = data[key]
-                break
+        # Indexed, case-insensitive lookup with brand/synonym aliases
+        _, result = lookup("clinical_mock.json", molecule, disease, therapy_area, query)
         
         if not result:
             result = {
@@ -43,15 +34,35 @@ def fetch_clinical_trials(state: Dict[str, Any]) -> Dict[str, Any]:
                 "key_trials": []
             }
         
-        total_trials = len(result.get("ongoing_trials", []))
-        phase_3_trials = result.get("trial_phases", {}).get("phase_3", 0)
+        # Counts and filtered trials come from the indexed trial store
+        store = get_trial_store()
+        condition = store.resolve_condition(molecule, disease, therapy_area, query)
+        phase = state.get("trial_phase")
+        status = state.get("trial_status")
+        if condition:
+            by_phase = store.count("phase", condition=condition, status="ongoing")
+            sponsors = list(store.count("sponsor", top=3, condition=condition))
+            matches = store.query(condition=condition, phase=phase, status=status) if phase or status else []
+            match_count = store.count(condition=condition, phase=phase, status=status) if phase or status else 0
+        else:
+            by_phase, sponsors, matches, match_count = {}, [], [], 0
+        total_trials = sum(by_phase.values())
+        phase_3_trials = by_phase.get(3, 0)
         
+        filtered = ""
+        if phase or status:
+            label = " ".join(filter(None, [status, f"Phase {phase}" if phase else ""]))
+            listed = ", ".join(t["trial_id"] for t in matches[:3])
+            filtered = f" {match_count} {label} trials match" + (f": {listed}." if listed else ".")
         output = {
             "status": "success",
             "data": result,
+            "trials": matches,
+            "phase_counts": {f"phase_{p}": n for p, n in sorted((p, n) for p, n in by_phase.items() if p)},
             "summary": f"Clinical trials for {search_key}: {total_trials} ongoing trials, "
-                      f"{phase_3_trials} in Phase 3. "
-                      f"Key sponsors: {', '.join(result.get('sponsors', [])[:3])}"
+                      f"{phase_3_trials} in Phase 3."
+                      f"{filtered} "
+                      f"Key sponsors: {', '.join((sponsors or result.get('sponsors', []))[:3])}"
         }
         
     except FileNotFoundError:
@@ -67,4 +78,4 @@ def fetch_clinical_trials(state: Dict[str, Any]) -> Dict[str, Any]:
             "summary": f"Error fetching clinical trials data: {str(e)}"
         }
     
-    return {**state, "clinical": output}
+    return {"clinical": AgentResult(**output)}
@@ -0,0 +1,245 @@
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+# Allow running as `python agents/columnar_store.py` as well as `python -m agents.columnar_store`
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from agents.data_index import normalize_key, resolve_key
+from agents.data_store import STAT_INTERVAL_SECONDS, dataset_cache
+
+# Datasets served from column files when STORAGE_BACKEND=columnar
+COLUMNAR_DATASETS = ["iqvia_mock.json", "exim_mock.json"]
+
+# Converted datasets, one directory per source file version
+COLUMNAR_DIR = os.environ.get("COLUMNAR_DIR", os.path.join("cache", "columnar"))
+
+# Bumped whenever the on-disk layout changes
+FORMAT_VERSION = 2
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _write_blob(path: str, items: List[Optional[bytes]]):
+    """Concatenate byte strings into `<path>.bin` with int64 offsets in `<path>.idx.npy`"""
+    offsets = np.zeros(len(items) + 1, dtype=np.int64)
+    with open(f"{path}.bin", "wb") as f:
+        for i, item in enumerate(items):
+            if item:
+                f.write(item)
+            offsets[i + 1] = offsets[i] + (len(item) if item else 0)
+    np.save(f"{path}.idx.npy", offsets)
+
+def _open_blob(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.load(f"{path}.idx.npy", mmap_mode="r")
+    # np.memmap cannot map an empty file
+    if os.path.getsize(f"{path}.bin") == 0:
+        return np.zeros(0, dtype=np.uint8), offsets
+    return np.memmap(f"{path}.bin", dtype=np.uint8, mode="r"), offsets
+
+def convert(source: str, target: str, signature: Tuple[int, int]):
+    """Write a {key: {field: value}} JSON file as one column file per field plus a sorted key index"""
+    with open(source, "r") as f:
+        data = json.load(f)
+
+    # First spelling wins when two keys normalize to the same value, as in KeyIndex
+    rows: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    for key, record in data.items():
+        if not isinstance(record, dict):
+            raise ValueError(f"Columnar storage needs one object per key, got {type(record).__name__} for {key!r}")
+        rows.setdefault(normalize_key(key), (key, record))
+    del data
+    normalized = sorted(rows)
+    records = [rows[k][1] for k in normalized]
+
+    fields: Dict[str, None] = {}
+    for record in records:
+        fields.update(dict.fromkeys(record))
+
+    tmp_dir = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    try:
+        # Sorted normalized keys for binary search; original spellings are returned with the record
+        _write_blob(os.path.join(tmp_dir, "keys"), [k.encode("utf-8") for k in normalized])
+        _write_blob(os.path.join(tmp_dir, "original_keys"), [rows[k][0].encode("utf-8") for k in normalized])
+
+        columns = []
+        for i, field in enumerate(fields):
+            values = [record.get(field) for record in records]
+            present = [field in record for record in records]
+            column = {"name": field, "file": f"c{i}", "mask": not all(present)}
+            if all(_is_number(v) for v, p in zip(values, present) if p):
+                column["kind"] = "numeric"
+                ints = [isinstance(v, int) for v in values]
+                column["dtype"] = "int64" if all(i for i, p in zip(ints, present) if p) else "float64"
+                # A float column that also holds ints remembers which rows were ints, so 12 reads back as 12
+                column["int_rows"] = column["dtype"] == "float64" and any(i for i, p in zip(ints, present) if p)
+                array = np.array([v if p else 0 for v, p in zip(values, present)], dtype=column["dtype"])
+                np.save(os.path.join(tmp_dir, f"{column['file']}.npy"), array)
+                if column["mask"]:
+                    np.save(os.path.join(tmp_dir, f"{column['file']}.mask.npy"), np.array(present, dtype=bool))
+                if column["int_rows"]:
+                    np.save(os.path.join(tmp_dir, f"{column['file']}.int.npy"), np.array(ints, dtype=bool))
+            else:
+                # Strings, lists and nested objects are stored as compact JSON; missing values are empty
+                column["kind"] = "json"
+                _write_blob(os.path.join(tmp_dir, column["file"]), [
+                    json.dumps(v, separators=(",", ":")).encode("utf-8") if p else None
+                    for v, p in zip(values, present)
+                ])
+            columns.append(column)
+
+        manifest = {
+            "format": FORMAT_VERSION,
+            "source": os.path.basename(source),
+            "signature": list(signature),
+            "rows": len(records),
+            "columns": columns
+        }
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        try:
+            os.rename(tmp_dir, target)
+        except OSError:
+            # Another process finished the same conversion first
+            if not os.path.exists(os.path.join(target, "manifest.json")):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+class ColumnarTable:
+    """Read-only view over a converted dataset; every file is memory-mapped, nothing is loaded eagerly"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), "r") as f:
+            self.manifest = json.load(f)
+        self.rows = self.manifest["rows"]
+        self._keys, self._key_offsets = _open_blob(os.path.join(path, "keys"))
+        self._original_keys, self._original_offsets = _open_blob(os.path.join(path, "original_keys"))
+        self._columns: Dict[str, Dict[str, Any]] = {}
+        for column in self.manifest["columns"]:
+            base = os.path.join(path, column["file"])
+            if column["kind"] == "numeric":
+                mapped = {"values": np.load(f"{base}.npy", mmap_mode="r"), "mask": None, "ints": None}
+                if column["mask"]:
+                    mapped["mask"] = np.load(f"{base}.mask.npy", mmap_mode="r")
+                if column["int_rows"]:
+                    mapped["ints"] = np.load(f"{base}.int.npy", mmap_mode="r")
+            else:
+                mapped = dict(zip(("blob", "offsets"), _open_blob(base)))
+            self._columns[column["name"]] = {**column, **mapped}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    @staticmethod
+    def _slice(blob: np.ndarray, offsets: np.ndarray, row: int) -> bytes:
+        return blob[offsets[row]:offsets[row + 1]].tobytes()
+
+    def key(self, row: int) -> str:
+        return self._slice(self._original_keys, self._original_offsets, row).decode("utf-8")
+
+    def find(self, term: str) -> Optional[int]:
+        """Row of a normalized key, by binary search over the sorted key column"""
+        target = term.encode("utf-8")
+        lo, hi = 0, self.rows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._slice(self._keys, self._key_offsets, mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.rows and self._slice(self._keys, self._key_offsets, lo) == target:
+            return lo
+        return None
+
+    def row(self, row: int, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """One record as a dict, reading only the requested columns"""
+        record = {}
+        for name in columns or self._columns:
+            column = self._columns.get(name)
+            if column is None:
+                continue
+            if column["kind"] == "numeric":
+                if column["mask"] is not None and not column["mask"][row]:
+                    continue
+                value = column["values"][row]
+                is_int = column["dtype"] == "int64" or (column["ints"] is not None and column["ints"][row])
+                record[name] = int(value) if is_int else float(value)
+            else:
+                raw = self._slice(column["blob"], column["offsets"], row)
+                if raw:
+                    record[name] = json.loads(raw)
+        return record
+
+# name -> (source signature, last stat time, table)
+_tables: Dict[str, Tuple[Tuple[int, int], float, ColumnarTable]] = {}
+_tables_lock = threading.Lock()
+
+def table_dir(name: str, signature: Tuple[int, int]) -> str:
+    return os.path.join(COLUMNAR_DIR, os.path.splitext(name)[0], f"v{FORMAT_VERSION}-{signature[0]}-{signature[1]}")
+
+def _remove_old_versions(current: str):
+    # Mapped files stay readable after unlinking, so running readers are unaffected
+    parent = os.path.dirname(current)
+    for entry in os.listdir(parent):
+        path = os.path.join(parent, entry)
+        if path != current and not entry.endswith(".tmp"):
+            shutil.rmtree(path, ignore_errors=True)
+
+def get_table(name: str) -> ColumnarTable:
+    """Columnar view of a dataset, converting the JSON source the first time each version is seen"""
+    cached = _tables.get(name)
+    now = time.monotonic()
+    if cached is not None and now - cached[1] < STAT_INTERVAL_SECONDS:
+        return cached[2]
+
+    source = dataset_cache.path(name)
+    stat = os.stat(source)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if cached is not None and cached[0] == signature:
+        _tables[name] = (signature, now, cached[2])
+        return cached[2]
+
+    with _tables_lock:
+        target = table_dir(name, signature)
+        if not os.path.exists(os.path.join(target, "manifest.json")):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            convert(source, target, signature)
+            _remove_old_versions(target)
+        table = ColumnarTable(target)
+        _tables[name] = (signature, now, table)
+        return table
+
+def columnar_lookup(name: str, *candidates: Any, columns: Optional[List[str]] = None) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Same contract as data_index.lookup: (key, record) for the first matching candidate, or (None, None)"""
+    table = get_table(name)
+    row = resolve_key(table.find, *candidates)
+    if row is None:
+        return None, None
+    return table.key(row), table.row(row, columns)
+
+def main(argv: Optional[List[str]] = None):
+    """Convert datasets ahead of time: python -m agents.columnar_store [dataset ...]"""
+    for name in (argv if argv is not None else sys.argv[1:]) or COLUMNAR_DATASETS:
+        started = time.perf_counter()
+        table = get_table(name)
+        size = sum(os.path.getsize(os.path.join(table.path, f)) for f in os.listdir(table.path))
+        print(f"{name}: {len(table)} rows, {len(table.columns)} columns, {size / 1024:.1f} KB "
+              f"in {table.path} ({time.perf_counter() - started:.2f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from agents.data_index import lookup as local_lookup, normalize_key
+
+# "local" reads the JSON datasets on disk, "http" queries DATA_API_URL
+# (python -m agents.stub_server serves the mock data over HTTP). A single source
+# can be pointed elsewhere with e.g. IQVIA_API_URL or CLINICAL_API_URL.
+DATA_CONNECTOR = os.environ.get("DATA_CONNECTOR", "local")
+DATA_API_URL = os.environ.get("DATA_API_URL", "http://127.0.0.1:8765")
+
+# Pooled keep-alive connections per API host
+DATA_API_MAX_CONNECTIONS = int(os.environ.get("DATA_API_MAX_CONNECTIONS", "20"))
+
+# Requests per second per API host (0 = unlimited); bursts up to one second's worth
+DATA_API_RATE = float(os.environ.get("DATA_API_RATE", "50"))
+
+# Retries after a failed request, with exponential backoff starting at DATA_API_BACKOFF seconds
+DATA_API_RETRIES = int(os.environ.get("DATA_API_RETRIES", "3"))
+DATA_API_BACKOFF = float(os.environ.get("DATA_API_BACKOFF", "0.2"))
+DATA_API_TIMEOUT = float(os.environ.get("DATA_API_TIMEOUT", "10"))
+
+# Prefetched results not picked up by an agent within this many seconds are dropped
+PREFETCH_TTL_SECONDS = 30.0
+
+# Status codes worth retrying; anything else is returned or raised straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def source_name(dataset: str) -> str:
+    """"clinical_mock.json" -> "CLINICAL", the prefix of its <SOURCE>_API_URL override"""
+    return os.path.splitext(dataset)[0].replace("_mock", "").upper()
+
+class Connector(ABC):
+    """Where an agent's records come from; lookup() has the data_index.lookup contract"""
+
+    # Remote connectors benefit from prefetching; local lookups are cheaper than the hand-off
+    remote = False
+
+    @abstractmethod
+    def lookup(self, dataset: str, *candidates: Any, columns: Optional[List[str]] = None) -> Tuple[Optional[str], Optional[Any]]:
+        """(key, record) for the first candidate found in the dataset, or (None, None); `columns` is a read hint"""
+
+    def prefetch(self, requests: Iterable[Tuple[str, List[Any]]]):
+        """Start lookups that agents will make shortly; a no-op unless the source is remote"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+class LocalConnector(Connector):
+    """Mock JSON files on disk, via the cached datasets and key indexes"""
+
+    def lookup(self, dataset: str, *candidates: Any, columns: Optional[List[str]] = None) -> Tuple[Optional[str], Optional[Any]]:
+        return local_lookup(dataset, *candidates, columns=columns)
+
+class RateLimiter:
+    """Token bucket shared by every request to one host; must be used from its event loop"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = max(rate, 1.0)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.tokens, self.updated = 1.0, time.monotonic()
+            self.tokens -= 1
+
+class HttpConnector(Connector):
+    """Async HTTP client for a data API that exposes GET /datasets/<name>/lookup?q=...
+
+    Requests run on one background event loop over a pooled httpx client, so
+    agents on different threads share keep-alive connections. Identical lookups
+    in flight at the same time become a single request, and lookups started by
+    prefetch() are handed to the agent that asks for them.
+    """
+
+    remote = True
+
+    def __init__(self, base_url: str, max_connections: int = DATA_API_MAX_CONNECTIONS,
+                 rate: float = DATA_API_RATE, retries: int = DATA_API_RETRIES,
+                 backoff: float = DATA_API_BACKOFF, timeout: float = DATA_API_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+        self._limiter: Optional[RateLimiter] = None
+        self._start_lock = threading.Lock()
+        # Only touched on the event loop thread
+        self._inflight: Dict[Tuple, "asyncio.Task"] = {}
+        self._prefetched: Dict[Tuple, Tuple["asyncio.Task", float]] = {}
+        self._stats = {"requests": 0, "coalesced": 0, "prefetched": 0, "prefetch_hits": 0, "retries": 0, "errors": 0}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                import httpx
+
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="data-connector", daemon=True).start()
+
+                async def start():
+                    self._limiter = RateLimiter(self.rate)
+                    self._client = httpx.AsyncClient(
+                        base_url=self.base_url,
+                        timeout=self.timeout,
+                        limits=httpx.Limits(max_connections=self.max_connections,
+                                            max_keepalive_connections=self.max_connections)
+                    )
+
+                asyncio.run_coroutine_threadsafe(start(), loop).result()
+                self._loop = loop
+        return self._loop
+
+    @staticmethod
+    def _key(dataset: str, candidates: Iterable[Any]) -> Tuple:
+        return (dataset, tuple(normalize_key(c) for c in candidates if c))
+
+    async def alookup(self, dataset: str, *candidates: Any) -> Tuple[Optional[str], Optional[Any]]:
+        """Lookup on the connector's event loop, joining an identical in-flight or prefetched request"""
+        key = self._key(dataset, candidates)
+        prefetched = self._prefetched.pop(key, None)
+        if prefetched is not None:
+            self._stats["prefetch_hits"] += 1
+            return await asyncio.shield(prefetched[0])
+        return await asyncio.shield(self._start(key, candidates))
+
+    def _start(self, key: Tuple, candidates: Iterable[Any]) -> "asyncio.Task":
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+            return task
+        task = asyncio.ensure_future(self._request(key[0], [str(c) for c in candidates if c]))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _request(self, dataset: str, candidates: List[str]) -> Tuple[Optional[str], Optional[Any]]:
+        import httpx
+
+        for attempt in range(self.retries + 1):
+            await self._limiter.acquire()
+            self._stats["requests"] += 1
+            delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.0)
+            try:
+                response = await self._client.get(f"/datasets/{dataset}/lookup", params=[("q", c) for c in candidates])
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    self._stats["errors"] += 1
+                    raise
+            else:
+                if response.status_code == 404:
+                    raise FileNotFoundError(f"{self.base_url} has no dataset {dataset}")
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    body = response.json()
+                    return body.get("key"), body.get("record")
+                if attempt == self.retries:
+                    self._stats["errors"] += 1
+                    response.raise_for_status()
+                # Honour the server's Retry-After when it sends one
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.replace(".", "", 1).isdigit():
+                    delay = max(delay, float(retry_after))
+            self._stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    def lookup(self, dataset: str, *candidates: Any, columns: Optional[List[str]] = None) -> Tuple[Optional[str], Optional[Any]]:
+        # The data API returns whole records, so `columns` is not sent
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self.alookup(dataset, *candidates), loop)
+        return future.result()
+
+    def prefetch(self, requests: Iterable[Tuple[str, List[Any]]]):
+        loop = self._ensure_loop()
+        requests = list(requests)
+
+        def start():
+            now = time.monotonic()
+            for key, (_, deadline) in list(self._prefetched.items()):
+                if deadline < now:
+                    del self._prefetched[key]
+            for dataset, candidates in requests:
+                key = self._key(dataset, candidates)
+                if key in self._prefetched:
+                    continue
+                task = self._start(key, candidates)
+                # Failures surface when the agent picks the result up
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                self._prefetched[key] = (task, now + PREFETCH_TTL_SECONDS)
+                self._stats["prefetched"] += 1
+
+        loop.call_soon_threadsafe(start)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"base_url": self.base_url, **self._stats}
+
+    def close(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+_local = LocalConnector()
+_http: Dict[str, HttpConnector] = {}
+_http_lock = threading.Lock()
+
+def get_connector(dataset: str) -> Connector:
+    """Connector for one dataset: its <SOURCE>_API_URL, else DATA_CONNECTOR's default"""
+    url = os.environ.get(f"{source_name(dataset)}_API_URL")
+    if not url:
+        if DATA_CONNECTOR == "local":
+            return _local
+        if DATA_CONNECTOR != "http":
+            raise ValueError(f"Unknown data connector: {DATA_CONNECTOR}")
+        url = DATA_API_URL
+    # One connector (and connection pool) per API host
+    connector = _http.get(url)
+    if connector is None:
+        with _http_lock:
+            connector = _http.setdefault(url, HttpConnector(url))
+    return connector
+
+def lookup(dataset: str, *candidates: Any, columns: Optional[List[str]] = None) -> Tuple[Optional[str], Optional[Any]]:
+    """Record for the first matching candidate from the dataset's configured source"""
+    return get_connector(dataset).lookup(dataset, *candidates, columns=columns)
+
+def prefetch(requests: Iterable[Tuple[str, List[Any]]]):
+    """Start remote lookups up front so a sequential pipeline pays for one round-trip, not one per agent"""
+    by_connector: Dict[int, Tuple[Connector, List[Tuple[str, List[Any]]]]] = {}
+    for dataset, candidates in requests:
+        connector = get_connector(dataset)
+        if connector.remote:
+            by_connector.setdefault(id(connector), (connector, []))[1].append((dataset, candidates))
+    for connector, batch in by_connector.values():
+        connector.prefetch(batch)
+
+def connector_stats() -> List[Dict[str, Any]]:
+    return [connector.stats() for connector in list(_http.values())]
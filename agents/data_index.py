@@ -0,0 +1,122 @@
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from agents.data_store import load_derived
+
+# "json" keeps parsed datasets in memory; "columnar" serves the IQVIA and EXIM
+# datasets from memory-mapped column files (see agents/columnar_store.py)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+
+# Alias tables (brand -> INN, synonyms, drug classes) applied to every dataset
+SYNONYMS_FILE = "synonyms.json"
+
+# Longest alias chain followed, e.g. Lipitor -> atorvastatin -> statin
+MAX_ALIAS_HOPS = 3
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+def normalize_key(value: Any) -> str:
+    """Lower-case a key and collapse punctuation and whitespace to single spaces"""
+    if value is None:
+        return ""
+    return _NON_WORD.sub(" ", str(value).lower()).strip()
+
+def _build_aliases(tables: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+    aliases = {}
+    for table in tables.values():
+        for alias, canonical in table.items():
+            aliases[normalize_key(alias)] = normalize_key(canonical)
+    return aliases
+
+def load_aliases() -> Dict[str, str]:
+    """Normalized alias -> canonical name map, merged from all alias tables"""
+    try:
+        return load_derived(SYNONYMS_FILE, "aliases", _build_aliases)
+    except FileNotFoundError:
+        return {}
+
+def alias_chain(value: Any, aliases: Optional[Dict[str, str]] = None) -> Iterable[str]:
+    """Yield the canonical names a term resolves to, nearest first"""
+    aliases = load_aliases() if aliases is None else aliases
+    term = normalize_key(value)
+    seen = {term}
+    for _ in range(MAX_ALIAS_HOPS):
+        term = aliases.get(term)
+        if not term or term in seen:
+            return
+        seen.add(term)
+        yield term
+
+def resolve_key(find: Callable[[str], Any], *candidates: Any) -> Any:
+    """find() result for the first candidate that matches, directly or through an alias.
+
+    `find` takes a normalized term and returns None when it is not present.
+    """
+    terms = [normalize_key(c) for c in candidates if c]
+
+    # Direct matches take priority over alias matches for any candidate
+    for term in terms:
+        found = find(term)
+        if found is not None:
+            return found
+
+    aliases = load_aliases()
+    for term in terms:
+        for canonical in alias_chain(term, aliases):
+            found = find(canonical)
+            if found is not None:
+                return found
+    return None
+
+class KeyIndex:
+    """Normalized key -> original key map for one dataset, built once per load"""
+
+    def __init__(self, keys: Iterable[str]):
+        self._keys: Dict[str, str] = {}
+        for key in keys:
+            # First spelling wins when two keys normalize to the same value
+            self._keys.setdefault(normalize_key(key), key)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get(self, value: Any) -> Optional[str]:
+        return self._keys.get(normalize_key(value))
+
+    def resolve(self, *candidates: Any) -> Optional[str]:
+        """Original key for the first candidate that matches, directly or through an alias"""
+        return resolve_key(self._keys.get, *candidates)
+
+def _indexed(name: str) -> Tuple[Dict[str, Any], KeyIndex]:
+    # Keep the index paired with the exact data it was built from
+    return load_derived(name, "key_index", lambda data: (data, KeyIndex(data.keys())))
+
+def get_index(name: str) -> KeyIndex:
+    """Key index for a dict-shaped dataset, rebuilt only when the file reloads"""
+    return _indexed(name)[1]
+
+def lookup(name: str, *candidates: Any, columns: Optional[List[str]] = None) -> Tuple[Optional[str], Optional[Any]]:
+    """Find the record for the first matching candidate; returns (key, record) or (None, None).
+
+    `columns` names the fields the caller reads. Columnar datasets read only
+    those; records held whole in memory are returned whole.
+    """
+    if STORAGE_BACKEND == "columnar":
+        from agents.columnar_store import COLUMNAR_DATASETS, columnar_lookup
+        if name in COLUMNAR_DATASETS:
+            return columnar_lookup(name, *candidates, columns=columns)
+
+    data, index = _indexed(name)
+    key = index.resolve(*candidates)
+    if key is None:
+        return None, None
+    return key, data[key]
+
+def preload(name: str):
+    """Load a dataset (or open its columnar files) ahead of the first lookup"""
+    if STORAGE_BACKEND == "columnar":
+        from agents.columnar_store import COLUMNAR_DATASETS, get_table
+        if name in COLUMNAR_DATASETS:
+            get_table(name)
+            return
+    get_index(name)
@@ -0,0 +1,149 @@
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Directory holding the JSON-backed data sources
+DATA_DIR = os.environ.get("MOCK_DATA_DIR", "mock_data")
+
+# Minimum seconds between stat() checks of a cached file (0 checks on every call).
+# While the hot-reload watcher runs, lookups never touch the disk.
+STAT_INTERVAL_SECONDS = float(os.environ.get("DATA_STAT_INTERVAL", "1.0"))
+
+# Dataset versions come from one process-wide counter, so a dataset that is
+# invalidated and reloaded never reuses a version a derived structure was built for
+_versions = itertools.count(1)
+
+class _Entry:
+    __slots__ = ("data", "signature", "version", "checked_at", "lock", "derived")
+
+    def __init__(self):
+        self.data = None
+        self.signature: Optional[Tuple[int, int]] = None
+        self.version = 0
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+        # kind -> (version, value) for structures built from the parsed data
+        self.derived: Dict[str, Tuple[int, Any]] = {}
+
+class DatasetCache:
+    """Keeps parsed JSON datasets in memory and reloads them only when the file changes"""
+
+    def __init__(self, data_dir: Optional[str] = None, stat_interval: Optional[float] = None):
+        self.data_dir = data_dir
+        self.stat_interval = STAT_INTERVAL_SECONDS if stat_interval is None else stat_interval
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watcher = threading.Event()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.data_dir or DATA_DIR, name)
+
+    def _entry(self, name: str) -> _Entry:
+        entry = self._entries.get(name)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.setdefault(name, _Entry())
+        return entry
+
+    def _signature(self, name: str) -> Tuple[int, int]:
+        # Raises FileNotFoundError when the dataset is missing, like open() did
+        stat = os.stat(self.path(name))
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self, name: str, entry: _Entry, force_stat: bool = False):
+        now = time.monotonic()
+        if entry.signature is not None and not force_stat:
+            if self.watching or now - entry.checked_at < self.stat_interval:
+                return
+
+        with entry.lock:
+            signature = self._signature(name)
+            entry.checked_at = now
+            if signature == entry.signature:
+                return
+            with open(self.path(name), "r") as f:
+                data = json.load(f)
+            entry.data = data
+            entry.signature = signature
+            entry.version = next(_versions)
+
+    def get(self, name: str) -> Any:
+        """Return the parsed dataset; the result is shared and must not be mutated"""
+        entry = self._entry(name)
+        self._refresh(name, entry)
+        return entry.data
+
+    def version(self, name: str) -> int:
+        """Counter that increases every time the dataset is (re)loaded, including after invalidate()"""
+        entry = self._entry(name)
+        self._refresh(name, entry)
+        return entry.version
+
+    def derived(self, name: str, kind: str, build: Callable[[Any], Any]) -> Any:
+        """Return build(data) for the current version of a dataset, rebuilding it after reloads"""
+        entry = self._entry(name)
+        self._refresh(name, entry)
+        data, version = entry.data, entry.version
+        cached = entry.derived.get(kind)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        value = build(data)
+        entry.derived[kind] = (version, value)
+        return value
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop one cached dataset, or all of them"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    @property
+    def watching(self) -> bool:
+        return self._watcher is not None and self._watcher.is_alive()
+
+    def start_watcher(self, interval: float = 2.0):
+        """Poll loaded datasets in the background and reload them when they change"""
+        if self.watching:
+            return
+        self._stop_watcher.clear()
+
+        def watch():
+            while not self._stop_watcher.wait(interval):
+                for name, entry in list(self._entries.items()):
+                    if entry.signature is None:
+                        continue
+                    try:
+                        self._refresh(name, entry, force_stat=True)
+                    except Exception as e:
+                        # Keep serving the last good copy until the file is fixed
+                        print(f"Failed to reload dataset {name}: {str(e)}")
+
+        self._watcher = threading.Thread(target=watch, name="dataset-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop_watcher.set()
+        if self._watcher is not None:
+            self._watcher.join()
+        self._watcher = None
+
+# Shared cache used by all worker agents
+dataset_cache = DatasetCache()
+
+def load_dataset(name: str) -> Any:
+    """Return a dataset from DATA_DIR, parsing the file only when it has changed"""
+    return dataset_cache.get(name)
+
+def load_derived(name: str, kind: str, build: Callable[[Any], Any]) -> Any:
+    """Return a structure derived from a dataset, rebuilt only when the dataset reloads"""
+    return dataset_cache.derived(name, kind, build)
+
+def start_hot_reload(interval: float = 2.0):
+    """Enable the background watcher for the shared dataset cache"""
+    dataset_cache.start_watcher(interval)
@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+import zlib
+from typing import Any, Dict, Optional
+
+# Extracted internal-document text, keyed by the SHA-256 of the PDF bytes
+DOC_CACHE_DIR = os.environ.get("DOC_CACHE_DIR", os.path.join("cache", "internal_docs"))
+
+# Total size of the cache directory before least recently used entries are evicted
+DOC_CACHE_MAX_BYTES = int(os.environ.get("DOC_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+class DocumentCache:
+    """On-disk, content-addressed cache of extracted PDF text with LRU eviction by size"""
+
+    def __init__(self, cache_dir: str = DOC_CACHE_DIR, max_bytes: int = DOC_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.json.z")
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Cached extraction for a document digest, or None"""
+        if not digest:
+            return None
+        path = self._path(digest)
+        try:
+            with open(path, "rb") as f:
+                record = json.loads(zlib.decompress(f.read()))
+            # Mark as recently used for eviction
+            os.utime(path)
+            return record
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error):
+            # Corrupt or partially written entry; drop it and re-extract
+            self.discard(digest)
+            return None
+
+    def put(self, digest: str, record: Dict[str, Any]):
+        """Store an extraction compactly and evict old entries past the size cap"""
+        if not digest or self.max_bytes <= 0:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        payload = zlib.compress(json.dumps(record, separators=(",", ":")).encode("utf-8"), 6)
+        path = self._path(digest)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def discard(self, digest: str):
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            try:
+                entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".json.z")]
+            except FileNotFoundError:
+                return
+            stats = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries]
+            total = sum(size for _, size, _ in stats)
+            for _, size, path in sorted(stats):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+# Shared cache used by the internal knowledge agent
+document_cache = DocumentCache()
@@ -0,0 +1,296 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+from agents.result_cache import file_digest
+
+# Directory of internal PDFs (strategy decks, MINS, field reports) indexed on first use
+INTERNAL_DOCS_DIR = os.environ.get("INTERNAL_DOCS_DIR", "internal_docs")
+
+# One compressed segment file per indexed document, so adding a document never rewrites the others
+DOC_INDEX_DIR = os.environ.get("DOC_INDEX_DIR", os.path.join("cache", "doc_index"))
+
+# Uploaded documents kept in the index; past either limit the least recently searched are dropped
+DOC_INDEX_MAX_UPLOADS = int(os.environ.get("DOC_INDEX_MAX_UPLOADS", "64"))
+DOC_INDEX_UPLOAD_MAX_AGE_HOURS = float(os.environ.get("DOC_INDEX_UPLOAD_MAX_AGE_HOURS", "24"))
+
+# Longest passage, in words, returned by a search
+MAX_CHUNK_WORDS = 120
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "for", "from", "has",
+    "have", "how", "in", "into", "is", "it", "of", "on", "or", "show", "that", "the", "their",
+    "this", "to", "was", "what", "when", "where", "which", "who", "why", "will", "with"
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOP_WORDS]
+
+def chunk_page(text: str) -> List[str]:
+    """Split a page into paragraphs, windowing long ones to MAX_CHUNK_WORDS"""
+    chunks = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        words = paragraph.split()
+        for start in range(0, len(words), MAX_CHUNK_WORDS):
+            chunks.append(" ".join(words[start:start + MAX_CHUNK_WORDS]))
+    return [c for c in chunks if c]
+
+class DocumentIndex:
+    """Incremental BM25 inverted index over page/paragraph chunks of internal PDFs.
+
+    Documents are either part of the curated corpus (the internal documents
+    directory and the default deck) or user uploads. A search only ever sees
+    the documents it names, or the corpus when it names none, so one user's
+    upload never shows up in another request. Uploads are evicted from memory
+    and disk once there are more than max_uploads of them or they go unused
+    for upload_max_age_hours.
+    """
+
+    def __init__(self, index_dir: str = DOC_INDEX_DIR, max_uploads: int = DOC_INDEX_MAX_UPLOADS,
+                 upload_max_age_hours: float = DOC_INDEX_UPLOAD_MAX_AGE_HOURS):
+        self.index_dir = index_dir
+        self.max_uploads = max_uploads
+        self.upload_max_age_seconds = upload_max_age_hours * 3600
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        # Chunk ids are never reused, so evicting a document leaves the others' ids unchanged
+        self.chunks: Dict[int, Dict[str, Any]] = {}
+        self.lengths: Dict[int, int] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self._next_chunk = 0
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="doc-index")
+        self._pending: Dict[str, Future] = {}
+        # upload digest -> last time it was indexed or searched, least recent first
+        self._uploads: "OrderedDict[str, float]" = OrderedDict()
+
+    def _segment_path(self, digest: str) -> str:
+        return os.path.join(self.index_dir, f"{digest}.json.z")
+
+    def load(self):
+        """Read every segment from disk once"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not os.path.isdir(self.index_dir):
+                return
+            for name in sorted(os.listdir(self.index_dir)):
+                if not name.endswith(".json.z"):
+                    continue
+                try:
+                    path = os.path.join(self.index_dir, name)
+                    with open(path, "rb") as f:
+                        segment = json.loads(zlib.decompress(f.read()))
+                    self._add_segment(segment, os.path.getmtime(path))
+                except (OSError, ValueError, zlib.error) as e:
+                    print(f"Skipping unreadable index segment {name}: {str(e)}")
+
+    def _add_segment(self, segment: Dict[str, Any], used_at: Optional[float] = None):
+        digest = segment["digest"]
+        if digest in self.docs:
+            return
+        chunk_ids = []
+        terms = set()
+        length = 0
+        for chunk in segment["chunks"]:
+            chunk_id = self._next_chunk
+            self._next_chunk += 1
+            self.chunks[chunk_id] = {"doc": digest, "page": chunk["page"], "text": chunk["text"]}
+            self.lengths[chunk_id] = chunk["length"]
+            length += chunk["length"]
+            # Term frequencies are stored in the segment, so loading never re-tokenizes
+            for term, tf in chunk["tf"].items():
+                self.postings.setdefault(term, {})[chunk_id] = tf
+            terms.update(chunk["tf"])
+            chunk_ids.append(chunk_id)
+        corpus = bool(segment.get("corpus"))
+        # The document's own terms, so removing it only visits their posting lists
+        self.docs[digest] = {"name": segment["name"], "chunks": chunk_ids, "terms": sorted(terms),
+                             "length": length, "corpus": corpus}
+        if not corpus:
+            self._uploads[digest] = time.time() if used_at is None else used_at
+            self._uploads.move_to_end(digest)
+
+    def _remove_document(self, digest: str):
+        """Drop a document's chunks and postings from memory and its segment from disk"""
+        doc = self.docs.pop(digest)
+        self._uploads.pop(digest, None)
+        for chunk_id in doc["chunks"]:
+            del self.chunks[chunk_id]
+            del self.lengths[chunk_id]
+        ids = doc["chunks"]
+        for term in doc["terms"]:
+            postings = self.postings[term]
+            # A document's chunk ids are consecutive, so walk whichever side is shorter
+            if len(postings) < len(ids):
+                for chunk_id in [c for c in postings if ids[0] <= c <= ids[-1]]:
+                    del postings[chunk_id]
+            else:
+                for chunk_id in ids:
+                    postings.pop(chunk_id, None)
+            if not postings:
+                del self.postings[term]
+        try:
+            os.remove(self._segment_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Remove uploads past the count cap or unused for longer than the age limit"""
+        cutoff = time.time() - self.upload_max_age_seconds
+        with self._lock:
+            while self._uploads:
+                digest, used_at = next(iter(self._uploads.items()))
+                too_old = self.upload_max_age_seconds > 0 and used_at < cutoff
+                if not too_old and len(self._uploads) <= self.max_uploads:
+                    break
+                self._remove_document(digest)
+
+    def _touch(self, digests: Iterable[str]):
+        now = time.time()
+        for digest in digests:
+            if digest in self._uploads:
+                self._uploads[digest] = now
+                self._uploads.move_to_end(digest)
+                try:
+                    # Keeps the recency across restarts, like the extracted text cache
+                    os.utime(self._segment_path(digest))
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        """Forget every indexed document and delete its segment"""
+        self.load()
+        with self._lock:
+            for digest in list(self.docs):
+                self._remove_document(digest)
+
+    def corpus_documents(self) -> List[str]:
+        self.load()
+        with self._lock:
+            return [digest for digest, doc in self.docs.items() if doc["corpus"]]
+
+    def contains(self, path: str) -> bool:
+        self.load()
+        return file_digest(path) in self.docs
+
+    def add_document(self, path: str, corpus: bool = False) -> str:
+        """Index one PDF; documents already indexed (by content hash) are skipped"""
+        from PyPDF2 import PdfReader
+        from agents.internal_agent import iter_pdf_pages
+
+        self.load()
+        digest = file_digest(path)
+        with self._lock:
+            doc = self.docs.get(digest)
+            if doc is not None:
+                if corpus and not doc["corpus"]:
+                    # An upload that is also in the curated corpus is never evicted
+                    doc["corpus"] = True
+                    self._uploads.pop(digest, None)
+                return digest
+
+        chunks = []
+        for page_num, page_text in iter_pdf_pages(PdfReader(path)):
+            for chunk in chunk_page(page_text):
+                tokens = tokenize(chunk)
+                chunks.append({"page": page_num, "text": chunk, "length": len(tokens), "tf": Counter(tokens)})
+        segment = {"digest": digest, "name": os.path.basename(path), "corpus": corpus, "chunks": chunks}
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        segment_path = self._segment_path(digest)
+        tmp_path = f"{segment_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(json.dumps(segment, separators=(",", ":")).encode("utf-8"), 6))
+        os.replace(tmp_path, segment_path)
+
+        with self._lock:
+            self._add_segment(segment)
+        self.evict()
+        return digest
+
+    def add_document_async(self, path: str, corpus: bool = False) -> Future:
+        """Queue a PDF for indexing in the background; returns the pending future"""
+        with self._lock:
+            future = self._pending.get(path)
+            if future is None or future.done():
+                future = self._executor.submit(self.add_document, path, corpus)
+                self._pending[path] = future
+            return future
+
+    def sync_directory(self, directory: str = INTERNAL_DOCS_DIR) -> List[Future]:
+        """Queue every PDF in a directory that is not indexed yet"""
+        if not os.path.isdir(directory):
+            return []
+        return [
+            self.add_document_async(os.path.join(directory, name), corpus=True)
+            for name in sorted(os.listdir(directory)) if name.lower().endswith(".pdf")
+        ]
+
+    def search(self, query: str, top_k: int = 5, documents: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Top-k chunks by BM25 score among the given document digests (the corpus by default).
+
+        Collection statistics are computed over the searched documents only,
+        so scores do not depend on what else happens to be indexed.
+        """
+        self.load()
+        terms = tokenize(query)
+        with self._lock:
+            if documents is None:
+                allowed = {digest for digest, doc in self.docs.items() if doc["corpus"]}
+            else:
+                allowed = {digest for digest in documents if digest in self.docs}
+            self._touch(allowed)
+            n_chunks = sum(len(self.docs[digest]["chunks"]) for digest in allowed)
+            if not n_chunks or not terms:
+                return []
+            avg_length = sum(self.docs[digest]["length"] for digest in allowed) / n_chunks or 1.0
+            scores: Dict[int, float] = {}
+            for term in set(terms):
+                postings = [
+                    (chunk_id, tf) for chunk_id, tf in self.postings.get(term, {}).items()
+                    if self.chunks[chunk_id]["doc"] in allowed
+                ]
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[chunk_id] / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            ranked = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [
+                {
+                    "document": self.docs[self.chunks[chunk_id]["doc"]]["name"],
+                    "page": self.chunks[chunk_id]["page"],
+                    "text": self.chunks[chunk_id]["text"],
+                    "score": round(score, 4)
+                }
+                for chunk_id, score in ranked
+            ]
+
+# Shared index used by the internal knowledge agent
+document_index = DocumentIndex()
+
+_directory_synced = False
+
+def get_document_index() -> DocumentIndex:
+    """Shared index, with the internal documents directory queued for indexing on first use"""
+    global _directory_synced
+    if not _directory_synced:
+        _directory_synced = True
+        document_index.sync_directory()
+    return document_index
@@ -0,0 +1,139 @@
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from agents.data_store import dataset_cache
+from agents.data_index import normalize_key
+
+# Vocabulary of therapy areas, molecules, diseases, geographies and query-type/scope keywords
+DICTIONARY_FILE = "entity_dictionary.json"
+SYNONYMS_FILE = "synonyms.json"
+
+# Used when the dictionary file is missing; mirrors the parser's original lists
+DEFAULT_VOCABULARY = {
+    "therapy_areas": ["respiratory", "cardiovascular", "oncology", "diabetes",
+                      "neurology", "infectious", "autoimmune", "gastrointestinal"],
+    "molecules": ["metformin", "aspirin", "paracetamol", "ibuprofen", "atorvastatin",
+                  "rosuvastatin", "albuterol", "salmeterol", "insulin", "warfarin"],
+    "diseases": [],
+    "query_types": {
+        "opportunity_analysis": ["repurposing", "unmet", "opportunity"],
+        "market_analysis": ["market", "sales", "iqvia"],
+        "patent_analysis": ["patent", "ip", "freedom", "fto"],
+        "clinical_analysis": ["trial", "clinical"],
+        "trade_analysis": ["trade", "export", "import", "exim"]
+    },
+    "geographies": {
+        "india": ["india"], "china": ["china"], "usa": ["usa", "united states"], "europe": ["europe"]
+    },
+    "analysis_scopes": {
+        "portfolio": ["top", "rank", "compare", "across", "highest", "lowest", "competition"]
+    }
+}
+
+def _trie_pattern(terms: List[str]) -> str:
+    """Compile terms into a prefix-trie regex so matching cost does not grow with the vocabulary"""
+    trie: Dict[str, Any] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        is_end = "" in node
+        branches = []
+        for char in sorted(k for k in node if k):
+            # Multi-word terms match any run of whitespace between words
+            token = r"\s+" if char == " " else re.escape(char)
+            branches.append(token + build(node[char]))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if is_end:
+            # Greedy optional suffix: prefer the longest term, fall back to the shorter one
+            return ("(?:" + body + ")?") if len(branches) == 1 else body + "?"
+        return body
+
+    return build(trie)
+
+class EntityExtractor:
+    """Single-pass, word-boundary-aware matcher over a compiled entity vocabulary"""
+
+    def __init__(self, vocabulary: Dict[str, Any], aliases: Optional[Dict[str, str]] = None):
+        aliases = aliases or {}
+        # normalized term -> [(entity type, canonical value)]
+        self.terms: Dict[str, List[Tuple[str, str]]] = {}
+
+        def add(term: str, entity_type: str, value: str):
+            term = normalize_key(term)
+            if term and (entity_type, value) not in self.terms.get(term, []):
+                self.terms.setdefault(term, []).append((entity_type, value))
+
+        for area in vocabulary.get("therapy_areas", []):
+            add(area, "therapy_area", area.lower())
+        for molecule in vocabulary.get("molecules", []):
+            add(molecule, "molecule", aliases.get(normalize_key(molecule), normalize_key(molecule)))
+        for disease in vocabulary.get("diseases", []):
+            add(disease, "disease", disease.lower())
+        for query_type, keywords in vocabulary.get("query_types", {}).items():
+            for keyword in keywords:
+                add(keyword, "query_type", query_type)
+        for geography, names in vocabulary.get("geographies", {}).items():
+            for name in names:
+                add(name, "geography", normalize_key(geography))
+        for scope, keywords in vocabulary.get("analysis_scopes", {}).items():
+            for keyword in keywords:
+                add(keyword, "analysis_scope", scope)
+        # Brand names are molecule mentions that resolve to their INN
+        for alias, canonical in aliases.items():
+            add(alias, "molecule", canonical)
+
+        # Normalization turns punctuation into spaces, so match on a normalized query
+        pattern = _trie_pattern(list(self.terms)) or r"(?!x)x"
+        self.pattern = re.compile(r"(?<!\w)(?:" + pattern + r")(?!\w)")
+
+    def extract(self, text: str) -> List[Dict[str, Any]]:
+        """All entities in the text, in order of appearance"""
+        entities = []
+        for match in self.pattern.finditer(normalize_key(text)):
+            words = match.group(0).split()
+            # Longest match first, then any shorter terms nested inside a
+            # multi-word match ("type 2 diabetes" also mentions "diabetes")
+            for size in range(len(words), 0, -1):
+                for i in range(len(words) - size + 1):
+                    term = " ".join(words[i:i + size])
+                    for entity_type, value in self.terms.get(term, []):
+                        entities.append({"type": entity_type, "text": term, "value": value, "start": match.start()})
+        return entities
+
+_extractor: Optional[EntityExtractor] = None
+_extractor_versions: Optional[Tuple[int, int]] = None
+_extractor_lock = threading.Lock()
+
+def _version(name: str) -> int:
+    try:
+        return dataset_cache.version(name)
+    except FileNotFoundError:
+        return 0
+
+def get_extractor() -> EntityExtractor:
+    """Shared extractor, recompiled only when the dictionary or alias files change"""
+    global _extractor, _extractor_versions
+    versions = (_version(DICTIONARY_FILE), _version(SYNONYMS_FILE))
+    if _extractor is not None and versions == _extractor_versions:
+        return _extractor
+
+    with _extractor_lock:
+        if _extractor is None or versions != _extractor_versions:
+            vocabulary = dataset_cache.get(DICTIONARY_FILE) if versions[0] else DEFAULT_VOCABULARY
+            synonyms = dataset_cache.get(SYNONYMS_FILE) if versions[1] else {}
+            # Only brand names and synonyms name a molecule; drug classes do not
+            aliases = {}
+            for table in ("brand_names", "synonyms"):
+                for alias, canonical in synonyms.get(table, {}).items():
+                    aliases[normalize_key(alias)] = normalize_key(canonical)
+            molecules = {normalize_key(m) for m in vocabulary.get("molecules", [])}
+            aliases = {alias: canonical for alias, canonical in aliases.items() if canonical in molecules}
+            _extractor = EntityExtractor(vocabulary, aliases)
+            _extractor_versions = versions
+    return _extractor
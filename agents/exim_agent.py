@@ -1,6 +1,10 @@
-import json
-import os
 from typing import Dict, Any
+from agents.connectors import lookup
+from agents.results import AgentResult
+
+# Fields of a trade record the agent reports; columnar storage reads only these
+EXIM_FIELDS = ["export_volume_kg", "import_volume_kg", "net_trade_balance", "top_export_destinations",
+               "top_import_sources", "trade_trend", "api_availability", "formulation_trade"]
 
 def fetch_exim_data(state: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -12,22 +16,20 @@ def fetch_exim_data(state: Dict[str, Any]) -> Dict[str, Any]:
     
     search_key = api_name or molecule or query
     
-    mock_file = os.path.join("mock_data", "exim_mock.json")
-    
     try:
-        with open(mock_file, 'r') as f:
-            data = json.load(f)
+        _, result = lookup("exim_mock.json", api_name, molecule, query, columns=EXIM_FIELDS)
         
-        result = data.get(search_key, {
-            "export_volume_kg": 0,
-            "import_volume_kg": 0,
-            "net_trade_balance": 0,
-            "top_export_destinations": [],
-            "top_import_sources": [],
-            "trade_trend": "stable",
-            "api_availability": "unknown",
-            "formulation_trade": {}
-        })
+        if not result:
+            result = {
+                "export_volume_kg": 0,
+                "import_volume_kg": 0,
+                "net_trade_balance": 0,
+                "top_export_destinations": [],
+                "top_import_sources": [],
+                "trade_trend": "stable",
+                "api_availability": "unknown",
+                "formulation_trade": {}
+            }
         
         output = {
             "status": "success",
@@ -37,6 +39,20 @@ def fetch_exim_data(state: Dict[str, Any]) -> Dict[str, Any]:
                       f"Top destinations: {', '.join(result.get('top_export_destinations', [])[:3])}"
         }
         
+        # Ranking/comparison queries aggregate trade across every molecule
+        if state.get("analysis_scope") == "portfolio":
+            # NumPy is only loaded for whole-table scans
+            from agents.market_analytics import display_name, trade_overview
+            analytics = trade_overview()
+            output["analytics"] = analytics
+            output["summary"] += (
+                f" Across {analytics['molecules_scanned']} molecules, largest net trade by country: "
+                + (", ".join(f"{display_name(c['country'])} {c['net_kg']:+,}kg" for c in analytics["net_trade_by_country"][:3]) or "none")
+                + ". Most import-dependent: "
+                + (", ".join(f"{m['molecule']} ({m['import_share_percent']:g}%)" for m in analytics["import_dependency"][:3]) or "none")
+                + "."
+            )
+        
     except FileNotFoundError:
         output = {
             "status": "error",
@@ -50,4 +66,4 @@ def fetch_exim_data(state: Dict[str, Any]) -> Dict[str, Any]:
             "summary": f"Error fetching EXIM data: {str(e)}"
         }
     
-    return {**state, "exim": output}
\ No newline at end of file
+    return {"exim": AgentResult(**output)}
\ No newline at end of file
@@ -0,0 +1,278 @@
+import csv
+import importlib.util
+import json
+import os
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from agents.results import json_default
+
+# Formats written when a request does not choose any, e.g. REPORT_FORMATS=pdf,xlsx
+REPORT_FORMATS = os.environ.get("REPORT_FORMATS", "pdf")
+
+SUPPORTED_FORMATS = ["pdf", "xlsx", "csv", "json"]
+
+# Agent outputs exported as sections: state key -> sheet/file label
+SECTIONS = [
+    ("iqvia", "Market"),
+    ("exim", "Trade"),
+    ("patent", "Patents"),
+    ("clinical", "Clinical Trials"),
+    ("internal", "Internal Docs"),
+    ("web", "Web")
+]
+
+# Parsed query fields repeated on every exported row
+QUERY_FIELDS = ["query", "molecule", "disease", "therapy_area", "geography", "query_type", "analysis_scope"]
+
+SUMMARY_COLUMNS = QUERY_FIELDS + [f"{key}_{column}" for key, _ in SECTIONS for column in ("status", "summary")]
+
+# Long format keeps one schema for every agent: e.g. field=patent_expiry_timeline, item=0, attribute=expiry_date
+DETAIL_COLUMNS = ["query", "entity", "field", "item", "attribute", "value"]
+
+def resolve_formats(requested: Optional[Iterable[str]] = None) -> List[str]:
+    """Requested output formats in a stable order, falling back to REPORT_FORMATS"""
+    if isinstance(requested, str):
+        requested = requested.split(",")
+    formats = {f.strip().lower() for f in (requested or REPORT_FORMATS.split(",")) if f and f.strip()}
+    unknown = formats - set(SUPPORTED_FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown report format(s): {', '.join(sorted(unknown))}")
+    return [f for f in SUPPORTED_FORMATS if f in formats]
+
+def available_formats() -> List[str]:
+    """Supported formats that can be written here; XLSX needs the optional openpyxl package"""
+    return [f for f in SUPPORTED_FORMATS if f != "xlsx" or importlib.util.find_spec("openpyxl") is not None]
+
+def _entity(result: Mapping) -> str:
+    return result.get("molecule") or result.get("therapy_area") or result.get("disease") or ""
+
+def _cell(value: Any) -> Any:
+    """Scalars stay typed for spreadsheets; anything still nested is written as compact JSON"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, separators=(",", ":"), default=json_default)
+
+def flatten_output(output: Any) -> Iterator[Tuple[str, Any, str, Any]]:
+    """(field, item, attribute, value) rows for one agent output, without truncation"""
+    if not isinstance(output, Mapping):
+        return
+    data = output.get("data")
+    fields = list(data.items()) if isinstance(data, Mapping) else []
+    # Agent-specific top-level fields (trials, fto, analytics, ...); status and summary go to the summary
+    fields += [(key, value) for key, value in output.items() if key not in ("status", "summary", "data")]
+
+    for field, value in fields:
+        if isinstance(value, Mapping):
+            for attribute, item_value in value.items():
+                yield field, "", str(attribute), _cell(item_value)
+        elif isinstance(value, (list, tuple)):
+            for index, item in enumerate(value):
+                if isinstance(item, Mapping):
+                    for attribute, item_value in item.items():
+                        yield field, index, str(attribute), _cell(item_value)
+                else:
+                    yield field, index, "", _cell(item)
+        else:
+            yield field, "", "", _cell(value)
+
+def summary_row(result: Mapping) -> List[Any]:
+    row = [_cell(result.get(field)) for field in QUERY_FIELDS]
+    for key, _ in SECTIONS:
+        output = result.get(key)
+        if isinstance(output, Mapping) and output:
+            row += [output.get("status", ""), output.get("summary", "")]
+        else:
+            row += ["", ""]
+    return row
+
+def detail_rows(result: Mapping, key: str) -> Iterator[List[Any]]:
+    query, entity = result.get("query", ""), _entity(result)
+    for field, item, attribute, value in flatten_output(result.get(key)):
+        yield [query, entity, field, item, attribute, value]
+
+def bundle_record(result: Mapping) -> Dict[str, Any]:
+    record = {field: result.get(field) for field in QUERY_FIELDS if result.get(field)}
+    for key, _ in SECTIONS:
+        if result.get(key):
+            record[key] = result[key]
+    return record
+
+class ExportWriter(ABC):
+    """Writes results one at a time, so a batch never holds a whole export in memory"""
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        self.paths: List[str] = []
+        os.makedirs(os.path.dirname(base_path) or ".", exist_ok=True)
+
+    @abstractmethod
+    def write(self, result: Mapping):
+        """Append one query result to the export"""
+
+    def close(self) -> List[str]:
+        return self.paths
+
+    def abort(self):
+        """Close and delete whatever was written; used when writing fails part way"""
+        try:
+            self.close()
+        except Exception:
+            pass
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self.paths = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class XlsxExportWriter(ExportWriter):
+    """One Summary sheet plus one long-format sheet per agent, in openpyxl's write-only mode"""
+
+    def __init__(self, base_path: str):
+        super().__init__(base_path)
+        try:
+            from openpyxl import Workbook
+            from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        except ImportError as e:
+            raise ImportError("XLSX reports need openpyxl: pip install -r requirements-optional.txt") from e
+        self._illegal = ILLEGAL_CHARACTERS_RE
+        # Write-only workbooks stream rows to temporary files instead of keeping cells in memory
+        self._workbook = Workbook(write_only=True)
+        self._summary = self._workbook.create_sheet("Summary")
+        self._summary.append(SUMMARY_COLUMNS)
+        self._sheets = {}
+        for key, label in SECTIONS:
+            self._sheets[key] = self._workbook.create_sheet(label)
+            self._sheets[key].append(DETAIL_COLUMNS)
+        self._path = f"{base_path}.xlsx"
+
+    def _clean(self, row: List[Any]) -> List[Any]:
+        # Control characters from extracted PDF text are not allowed in worksheet XML
+        return [self._illegal.sub("", value) if isinstance(value, str) else value for value in row]
+
+    def write(self, result: Mapping):
+        self._summary.append(self._clean(summary_row(result)))
+        for key, _ in SECTIONS:
+            sheet = self._sheets[key]
+            for row in detail_rows(result, key):
+                sheet.append(self._clean(row))
+
+    def close(self) -> List[str]:
+        if self._workbook is not None:
+            self._workbook.save(self._path)
+            self._workbook = None
+            self.paths = [self._path]
+        return self.paths
+
+    def abort(self):
+        # Nothing is on disk until close() saves the workbook
+        self._workbook = None
+        self.paths = []
+
+class CsvExportWriter(ExportWriter):
+    """<base>_summary.csv plus <base>_<agent>.csv for each agent that returned data"""
+
+    def __init__(self, base_path: str):
+        super().__init__(base_path)
+        self._files: Dict[str, Any] = {}
+        self._writers: Dict[str, Any] = {}
+        self._writer("summary", SUMMARY_COLUMNS)
+
+    def _writer(self, name: str, header: List[str]):
+        if name not in self._writers:
+            path = f"{self.base_path}_{name}.csv"
+            self._files[name] = open(path, "w", newline="", encoding="utf-8")
+            self._writers[name] = csv.writer(self._files[name])
+            self._writers[name].writerow(header)
+            self.paths.append(path)
+        return self._writers[name]
+
+    def write(self, result: Mapping):
+        self._writer("summary", SUMMARY_COLUMNS).writerow(summary_row(result))
+        for key, _ in SECTIONS:
+            rows = detail_rows(result, key)
+            first = next(rows, None)
+            if first is None:
+                continue
+            writer = self._writer(key, DETAIL_COLUMNS)
+            writer.writerow(first)
+            writer.writerows(rows)
+
+    def close(self) -> List[str]:
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        return self.paths
+
+class JsonExportWriter(ExportWriter):
+    """Compact {"generated": ..., "results": [...]} bundle of the full agent outputs"""
+
+    def __init__(self, base_path: str):
+        super().__init__(base_path)
+        path = f"{base_path}.json"
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write(f'{{"generated":{json.dumps(datetime.now().isoformat(timespec="seconds"))},"results":[')
+        self._count = 0
+        self.paths = [path]
+
+    def write(self, result: Mapping):
+        if self._count:
+            self._file.write(",")
+        self._file.write(json.dumps(bundle_record(result), separators=(",", ":"), default=json_default))
+        self._count += 1
+
+    def close(self) -> List[str]:
+        if not self._file.closed:
+            self._file.write("]}")
+            self._file.close()
+        return self.paths
+
+EXPORT_WRITERS = {
+    "xlsx": XlsxExportWriter,
+    "csv": CsvExportWriter,
+    "json": JsonExportWriter
+}
+
+def write_exports(results: Iterable[Mapping], formats: Iterable[str], base_path: str,
+                  errors: Optional[Dict[str, str]] = None) -> List[str]:
+    """Stream results into every requested tabular format (PDF is rendered separately); returns the files written.
+
+    A format that fails is dropped, with its partial files deleted, and the
+    others are still written; pass `errors` to collect {format: message}.
+    """
+    failed = {} if errors is None else errors
+    writers: Dict[str, ExportWriter] = {}
+
+    def fail(f: str, e: Exception):
+        print(f"Error writing {f} export: {str(e)}")
+        failed[f] = str(e)
+
+    for f in formats:
+        if f in EXPORT_WRITERS:
+            try:
+                writers[f] = EXPORT_WRITERS[f](base_path)
+            except Exception as e:
+                fail(f, e)
+    paths: List[str] = []
+    try:
+        for result in results:
+            for f, writer in list(writers.items()):
+                try:
+                    writer.write(result)
+                except Exception as e:
+                    fail(f, e)
+                    writers.pop(f).abort()
+    finally:
+        for f, writer in writers.items():
+            try:
+                paths += writer.close()
+            except Exception as e:
+                fail(f, e)
+                writer.abort()
+    return paths
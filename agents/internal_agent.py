@@ -1,6 +1,115 @@
-from PyPDF2 import PdfReader
 import os
-from typing import Dict, Any
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, Tuple
+from agents.admission import stages
+from agents.doc_cache import document_cache
+from agents.doc_index import get_document_index
+from agents.result_cache import file_digest
+from agents.results import AgentResult
+from agents.tracing import annotate
+
+if TYPE_CHECKING:
+    from PyPDF2 import PdfReader
+
+# Characters of document text kept for the summary
+SUMMARY_CHAR_BUDGET = 2000
+
+# Section detectors: keyword searched for in each page -> label reported when found
+SECTION_DETECTORS = {
+    "strategy": "Strategy discussion found",
+    "market": "Market insights found",
+    "clinical": "Clinical data found"
+}
+
+# Passages retrieved from the internal document index per query
+TOP_K_PASSAGES = 5
+
+# Seconds to wait for a new document to be indexed before falling back to its leading text
+INDEX_WAIT_SECONDS = float(os.environ.get("INDEX_WAIT_SECONDS", "2"))
+
+def iter_pdf_pages(reader: "PdfReader") -> Iterator[Tuple[int, str]]:
+    """Yield (page number, text) one page at a time, skipping pages that fail to extract"""
+    for page_num, page in enumerate(reader.pages):
+        try:
+            yield page_num + 1, page.extract_text() or ""
+        except Exception:
+            continue
+
+def extract_summary_text(reader: "PdfReader", budget: int = SUMMARY_CHAR_BUDGET) -> Dict[str, Any]:
+    """Read pages until the summary budget is filled and every section detector has fired"""
+    chunks = []
+    page_offsets = []
+    buffered = 0
+    found = set()
+    pages_read = 0
+    chars_read = 0
+    
+    for page_num, page_text in iter_pdf_pages(reader):
+        pages_read = page_num
+        chunk = f"\n--- Page {page_num} ---\n{page_text}"
+        chars_read += len(chunk)
+        
+        # Bounded buffer: keep only what the summary needs
+        if buffered < budget:
+            page_offsets.append([page_num, buffered])
+            chunks.append(chunk[:budget - buffered])
+            buffered += len(chunks[-1])
+        
+        page_lower = page_text.lower()
+        for keyword in SECTION_DETECTORS:
+            if keyword not in found and keyword in page_lower:
+                found.add(keyword)
+        
+        # Stop early once nothing more can change the output
+        if buffered >= budget and len(found) == len(SECTION_DETECTORS):
+            break
+    
+    return {
+        "summary": "".join(chunks),
+        "page_offsets": page_offsets,
+        "key_sections": [label for keyword, label in SECTION_DETECTORS.items() if keyword in found],
+        "pages_read": pages_read,
+        "chars_read": chars_read
+    }
+
+def load_extraction(pdf_path: str, budget: int = SUMMARY_CHAR_BUDGET) -> Dict[str, Any]:
+    """Extracted summary text for a PDF, parsed only the first time its bytes are seen"""
+    digest = file_digest(pdf_path)
+    cached = document_cache.get(digest)
+    if cached and cached.get("budget") == budget and cached.get("detectors") == list(SECTION_DETECTORS):
+        annotate(cache="hit")
+        return cached
+    annotate(cache="miss")
+    
+    from PyPDF2 import PdfReader
+    # Parsing is CPU-bound; bound how many documents are parsed at once across requests
+    with stages["document"].slot():
+        reader = PdfReader(pdf_path)
+        extracted = extract_summary_text(reader, budget)
+        extracted["total_pages"] = len(reader.pages)
+    extracted["budget"] = budget
+    extracted["detectors"] = list(SECTION_DETECTORS)
+    document_cache.put(digest, extracted)
+    return extracted
+
+def retrieve_passages(pdf_path: str, search_text: str, top_k: int = TOP_K_PASSAGES, corpus: bool = False) -> List[str]:
+    """Top-k passages from this PDF alone, or from the curated corpus when it is the default document"""
+    index = get_document_index()
+    if not index.contains(pdf_path):
+        try:
+            index.add_document_async(pdf_path, corpus=corpus).result(timeout=INDEX_WAIT_SECONDS)
+        except FutureTimeoutError:
+            # Large document: keep indexing in the background for later queries
+            pass
+        except Exception as e:
+            print(f"Error indexing {pdf_path}: {str(e)}")
+    
+    # An upload is only ever searched on its own, never alongside other users' documents
+    documents = None if corpus else [file_digest(pdf_path)]
+    return [
+        f"{hit['document']} p.{hit['page']} (score {hit['score']}): {hit['text']}"
+        for hit in index.search(search_text, top_k, documents)
+    ]
 
 def summarize_internal_docs(state: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -9,6 +118,8 @@ def summarize_internal_docs(state: Dict[str, Any]) -> Dict[str, Any]:
     uploaded_file = state.get("uploaded_file_path")
     query = state.get("query", "")
     molecule = state.get("molecule", "")
+    disease = state.get("disease", "") or ""
+    therapy_area = state.get("therapy_area", "") or ""
     
     # Determine which PDF to use
     if uploaded_file and os.path.exists(uploaded_file):
@@ -20,36 +131,22 @@ def summarize_internal_docs(state: Dict[str, Any]) -> Dict[str, Any]:
     
     try:
         if os.path.exists(pdf_path):
-            reader = PdfReader(pdf_path)
-            full_text = ""
-            
-            # Extract text from all pages
-            for page_num, page in enumerate(reader.pages):
-                try:
-                    page_text = page.extract_text()
-                    full_text += f"\n--- Page {page_num + 1} ---\n{page_text}"
-                except:
-                    continue
-            
-            # Create summary (first 2000 chars + key sections)
-            summary = full_text[:2000]
+            extracted = load_extraction(pdf_path)
             
-            # Try to extract key sections
-            key_sections = []
-            if "strategy" in full_text.lower():
-                key_sections.append("Strategy discussion found")
-            if "market" in full_text.lower():
-                key_sections.append("Market insights found")
-            if "clinical" in full_text.lower():
-                key_sections.append("Clinical data found")
+            # Passages relevant to the parsed molecule/disease; fall back to the leading text
+            passages = retrieve_passages(pdf_path, " ".join([molecule or "", disease, therapy_area, query]),
+                                         corpus=source == "default")
+            summary = "\n\n".join(passages)[:SUMMARY_CHAR_BUDGET] if passages else extracted["summary"]
             
             output = {
                 "status": "success",
                 "source": source,
                 "summary": summary,
-                "key_sections": key_sections,
-                "total_pages": len(reader.pages),
-                "full_text_length": len(full_text)
+                "relevant_passages": passages,
+                "key_sections": extracted["key_sections"],
+                "total_pages": extracted["total_pages"],
+                "pages_read": extracted["pages_read"],
+                "chars_read": extracted["chars_read"]
             }
         else:
             output = {
@@ -65,4 +162,4 @@ def summarize_internal_docs(state: Dict[str, Any]) -> Dict[str, Any]:
             "key_sections": []
         }
     
-    return {**state, "internal": output}
\ No newline at end of file
+    return {"internal": AgentResult(**output)}
\ No newline at end of file
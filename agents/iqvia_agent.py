@@ -1,6 +1,10 @@
-import json
-import os
 from typing import Dict, Any
+from agents.connectors import lookup
+from agents.results import AgentResult
+
+# Fields of a market record the agent reports; columnar storage reads only these
+IQVIA_FIELDS = ["market_size_millions_usd", "growth_rate_cagr_percent", "competitors", "therapy_area",
+                "market_trend", "volume_shifts", "geographic_distribution"]
 
 def fetch_iqvia_data(state: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -14,29 +18,9 @@ def fetch_iqvia_data(state: Dict[str, Any]) -> Dict[str, Any]:
     # Determine search key
     search_key = molecule or therapy_area or disease or query
     
-    mock_file = os.path.join("mock_data", "iqvia_mock.json")
-    
     try:
-        with open(mock_file, 'r') as f:
-            data = json.load(f)
-        
-        # Try to find matching data (case-insensitive)
-        result = None
-        search_keys = [molecule, therapy_area, disease, query]
-        for key in search_keys:
-            if key:
-                # Try exact match
-                if key in data:
-                    result = data[key]
-                    break
-                # Try case-insensitive match
-                key_lower = key.lower()
-                for data_key in data.keys():
-                    if data_key.lower() == key_lower:
-                        result = data[data_key]
-                        break
-                if result:
-                    break
+        # Indexed, case-insensitive lookup with brand/synonym aliases
+        _, result = lookup("iqvia_mock.json", molecule, therapy_area, disease, query, columns=IQVIA_FIELDS)
         
         if not result:
             # Default structure
@@ -59,6 +43,27 @@ def fetch_iqvia_data(state: Dict[str, Any]) -> Dict[str, Any]:
                       f"{len(result.get('competitors', []))} major competitors identified."
         }
         
+        # Ranking/comparison queries scan the whole market table
+        if state.get("analysis_scope") == "portfolio":
+            # NumPy is only loaded for whole-table scans
+            from agents.market_analytics import display_name, market_overview
+            geography = state.get("geography")
+            analytics = market_overview(therapy_area, geography)
+            region = f" in {display_name(geography)}" if geography else ""
+            output["analytics"] = analytics
+            output["summary"] += (
+                f" Across {analytics['markets_ranked']} market{'' if analytics['markets_ranked'] == 1 else 's'}{region}, top by size x CAGR: "
+                f"{', '.join(m['market'] for m in analytics['top_markets'][:3]) or 'none'}. "
+                f"Least competition per $M: {', '.join(m['market'] for m in analytics['competition_gaps'][:3]) or 'none'}."
+            )
+            focus = analytics.get("focus")
+            if focus and focus["ranks"]:
+                output["summary"] += (
+                    f" {focus['therapy_area'].title()} ranks "
+                    + ", ".join(f"#{rank}" for rank in focus["ranks"].values())
+                    + f" of {focus['ranked']}."
+                )
+        
     except FileNotFoundError:
         output = {
             "status": "error",
@@ -72,4 +77,4 @@ def fetch_iqvia_data(state: Dict[str, Any]) -> Dict[str, Any]:
             "summary": f"Error fetching IQVIA data: {str(e)}"
         }
     
-    return {**state, "iqvia": output}
\ No newline at end of file
+    return {"iqvia": AgentResult(**output)}
\ No newline at end of file
@@ -0,0 +1,286 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from agents import data_index
+from agents.data_index import normalize_key
+from agents.data_store import load_derived
+
+# Rows returned by each ranking
+TOP_N = 5
+
+def _categories(values: Iterable[str], index: Dict[str, int]) -> List[int]:
+    # Assign each distinct value a column on first sight
+    return [index.setdefault(v, len(index)) for v in values]
+
+def display_name(value: str) -> str:
+    """Country/region label for summaries, e.g. usa -> USA, south korea -> South Korea"""
+    return value.upper() if len(value) <= 3 else value.title()
+
+def _top(scores: np.ndarray, top_n: int) -> np.ndarray:
+    """Indices of the top_n finite scores, highest first, without sorting the whole array"""
+    candidates = np.flatnonzero(np.isfinite(scores))
+    if len(candidates) > top_n:
+        candidates = candidates[np.argpartition(-scores[candidates], top_n - 1)[:top_n]]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+class MarketTable:
+    """IQVIA records as NumPy arrays: one row per market, one column per geography/competitor"""
+
+    def __init__(self, records: Iterable[Tuple[str, Dict[str, Any]]]):
+        keys, areas, sizes, growth = [], [], [], []
+        geo_cells: List[Tuple[int, str, float]] = []
+        competitor_cells: List[Tuple[int, str]] = []
+        for row, (key, record) in enumerate(records):
+            keys.append(key)
+            areas.append(normalize_key(record.get("therapy_area")) or normalize_key(key))
+            sizes.append(record.get("market_size_millions_usd") or 0)
+            growth.append(record.get("growth_rate_cagr_percent") or 0)
+            for geography, share in (record.get("geographic_distribution") or {}).items():
+                geo_cells.append((row, normalize_key(geography), share))
+            for competitor in record.get("competitors") or []:
+                competitor_cells.append((row, str(competitor)))
+
+        self.keys = keys
+        self.market_size = np.array(sizes, dtype=np.float64)
+        self.cagr = np.array(growth, dtype=np.float64)
+
+        self.area_index: Dict[str, int] = {}
+        self.area_codes = np.array(_categories(areas, self.area_index), dtype=np.int32)
+        self.areas = list(self.area_index)
+
+        # Share of each market by geography, in percent (0 where not reported)
+        self.geo_index: Dict[str, int] = {}
+        geo_cols = _categories((g for _, g, _ in geo_cells), self.geo_index)
+        self.geo_share = np.zeros((len(keys), len(self.geo_index)), dtype=np.float64)
+        if geo_cells:
+            self.geo_share[[r for r, _, _ in geo_cells], geo_cols] = [s for _, _, s in geo_cells]
+        # Markets that report a breakdown; the rest are treated as unknown, not zero
+        self.has_geo = self.geo_share.sum(axis=1) > 0
+
+        # Market x competitor incidence matrix; float32 so overlap products use BLAS
+        self.competitor_index: Dict[str, int] = {}
+        comp_cols = _categories((c for _, c in competitor_cells), self.competitor_index)
+        self.competitors = np.zeros((len(keys), len(self.competitor_index)), dtype=np.float32)
+        if competitor_cells:
+            self.competitors[[r for r, _ in competitor_cells], comp_cols] = 1
+        self.competitor_count = self.competitors.sum(axis=1).astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def mask(self, therapy_area: Optional[str] = None) -> np.ndarray:
+        """Rows in a therapy area (all rows when none is given or it is unknown)"""
+        code = self.area_index.get(normalize_key(therapy_area)) if therapy_area else None
+        if code is None:
+            return np.ones(len(self.keys), dtype=bool)
+        return self.area_codes == code
+
+    def regional_size(self, geography: Optional[str] = None) -> np.ndarray:
+        """Market size in one geography ($M); NaN where no breakdown is reported"""
+        col = self.geo_index.get(normalize_key(geography)) if geography else None
+        if col is None:
+            return self.market_size
+        return np.where(self.has_geo, self.market_size * self.geo_share[:, col] / 100, np.nan)
+
+    def _rows(self, indices: np.ndarray, **columns: np.ndarray) -> List[Dict[str, Any]]:
+        return [
+            {
+                "market": self.keys[i],
+                "therapy_area": self.areas[self.area_codes[i]],
+                **{name: int(values[i]) if values.dtype.kind == "i" else round(float(values[i]), 2)
+                   for name, values in columns.items()}
+            }
+            for i in indices
+        ]
+
+    def top_markets(self, therapy_area: Optional[str] = None, geography: Optional[str] = None,
+                    top_n: int = TOP_N) -> List[Dict[str, Any]]:
+        """Markets ranked by size x CAGR, using the regional size when a geography is given"""
+        size = self.regional_size(geography)
+        score = np.where(self.mask(therapy_area), size * self.cagr, np.nan)
+        return self._rows(_top(score, top_n), market_size_millions_usd=size,
+                          growth_rate_cagr_percent=self.cagr, score=score)
+
+    def area_ranks(self, therapy_area: str, geography: Optional[str] = None) -> Dict[str, Any]:
+        """Where one therapy area's markets place in the all-market size x CAGR ranking"""
+        code = self.area_index.get(normalize_key(therapy_area))
+        score = self.regional_size(geography) * self.cagr
+        order = _top(score, len(score))
+        return {
+            "therapy_area": self.areas[code] if code is not None else normalize_key(therapy_area),
+            "markets": int((self.area_codes == code).sum()) if code is not None else 0,
+            "ranked": len(order),
+            "ranks": {self.keys[i]: rank for rank, i in enumerate(order, 1) if self.area_codes[i] == code}
+        }
+
+    def competition_gaps(self, therapy_area: Optional[str] = None, geography: Optional[str] = None,
+                         top_n: int = TOP_N) -> List[Dict[str, Any]]:
+        """High patient burden (market size as a proxy) served by few competitors"""
+        size = self.regional_size(geography)
+        per_competitor = size / np.maximum(self.competitor_count, 1)
+        score = np.where(self.mask(therapy_area), per_competitor, np.nan)
+        return self._rows(_top(score, top_n), market_size_millions_usd=size,
+                          competitors=self.competitor_count, size_per_competitor=score)
+
+    def geography_shares(self, therapy_area: Optional[str] = None) -> Dict[str, Any]:
+        """Therapy area x geography matrix of each area's market split, in percent"""
+        rows = self.mask(therapy_area) & self.has_geo
+        # Regional market size summed per area, one bincount per geography
+        weighted = self.market_size[rows, None] * self.geo_share[rows] / 100
+        codes = self.area_codes[rows]
+        regional = np.column_stack([
+            np.bincount(codes, weights=weighted[:, g], minlength=len(self.areas))
+            for g in range(len(self.geo_index))
+        ]) if self.geo_index else np.zeros((len(self.areas), 0))
+        totals = regional.sum(axis=1, keepdims=True)
+        reported = totals[:, 0] > 0
+        # bincount of no rows is an int array, so the output is always float
+        shares = np.divide(regional, totals, out=np.zeros(regional.shape), where=totals > 0) * 100
+        return {
+            "therapy_areas": [a for a, r in zip(self.areas, reported) if r],
+            "geographies": list(self.geo_index),
+            "share_percent": np.round(shares[reported], 2).tolist()
+        }
+
+    def competitor_overlap(self, therapy_area: Optional[str] = None, top_n: int = TOP_N) -> Dict[str, Any]:
+        """Markets per competitor and the competitor pairs that meet in the most markets"""
+        rows = self.mask(therapy_area)
+        matrix = self.competitors if rows.all() else self.competitors[rows]
+        # co[i, j] = number of markets where competitors i and j are both present
+        co = matrix.T @ matrix
+        names = list(self.competitor_index)
+        presence = np.diag(co)
+        i, j = np.triu_indices(len(names), k=1)
+        pair_counts = co[i, j]
+        order = _top(np.where(pair_counts > 0, pair_counts, np.nan), top_n)
+        return {
+            "markets_per_competitor": {
+                names[k]: int(presence[k]) for k in _top(np.where(presence > 0, presence, np.nan), top_n)
+            },
+            "top_overlaps": [{"competitors": [names[i[k]], names[j[k]]], "shared_markets": int(pair_counts[k])} for k in order]
+        }
+
+class TradeTable:
+    """EXIM records as NumPy arrays with molecule x country destination/source matrices"""
+
+    def __init__(self, records: Iterable[Tuple[str, Dict[str, Any]]]):
+        keys, exports, imports = [], [], []
+        destination_cells: List[Tuple[int, str]] = []
+        source_cells: List[Tuple[int, str]] = []
+        for row, (key, record) in enumerate(records):
+            keys.append(key)
+            exports.append(record.get("export_volume_kg") or 0)
+            imports.append(record.get("import_volume_kg") or 0)
+            destination_cells += [(row, normalize_key(c)) for c in record.get("top_export_destinations") or []]
+            source_cells += [(row, normalize_key(c)) for c in record.get("top_import_sources") or []]
+
+        self.keys = keys
+        self.export_kg = np.array(exports, dtype=np.float64)
+        self.import_kg = np.array(imports, dtype=np.float64)
+        self.net_kg = self.export_kg - self.import_kg
+
+        self.country_index: Dict[str, int] = {}
+        dest_cols = _categories((c for _, c in destination_cells), self.country_index)
+        source_cols = _categories((c for _, c in source_cells), self.country_index)
+        self.destinations = np.zeros((len(keys), len(self.country_index)), dtype=np.float64)
+        self.sources = np.zeros((len(keys), len(self.country_index)), dtype=np.float64)
+        if destination_cells:
+            self.destinations[[r for r, _ in destination_cells], dest_cols] = 1
+        if source_cells:
+            self.sources[[r for r, _ in source_cells], source_cols] = 1
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def net_trade_by_country(self, top_n: int = TOP_N) -> List[Dict[str, Any]]:
+        """Export minus import volume per partner country.
+
+        Only the top partners are reported, without volumes, so each molecule's
+        volume is split evenly across its listed partners.
+        """
+        dest_weights = self.destinations / np.maximum(self.destinations.sum(axis=1, keepdims=True), 1)
+        source_weights = self.sources / np.maximum(self.sources.sum(axis=1, keepdims=True), 1)
+        exported = dest_weights.T @ self.export_kg
+        imported = source_weights.T @ self.import_kg
+        net = exported - imported
+        countries = list(self.country_index)
+        return [
+            {"country": countries[k], "export_kg": round(float(exported[k])), "import_kg": round(float(imported[k])),
+             "net_kg": round(float(net[k]))}
+            for k in _top(np.abs(net), top_n)
+        ]
+
+    def import_dependency(self, top_n: int = TOP_N) -> List[Dict[str, Any]]:
+        """Molecules whose traded volume is mostly imports"""
+        traded = self.export_kg + self.import_kg
+        share = np.divide(self.import_kg, traded, out=np.full_like(traded, np.nan), where=traded > 0) * 100
+        return [
+            {"molecule": self.keys[k], "import_kg": float(self.import_kg[k]), "import_share_percent": round(float(share[k]), 2),
+             "top_import_sources": [display_name(c) for c in np.array(list(self.country_index))[self.sources[k] > 0]]}
+            for k in _top(share, top_n)
+        ]
+
+    def top_balances(self, top_n: int = TOP_N) -> List[Dict[str, Any]]:
+        """Molecules with the largest trade surplus"""
+        return [
+            {"molecule": self.keys[k], "export_kg": float(self.export_kg[k]), "import_kg": float(self.import_kg[k]),
+             "net_trade_balance": float(self.net_kg[k])}
+            for k in _top(self.net_kg, top_n)
+        ]
+
+# Tables built from columnar datasets: name -> (source table, analytics table)
+_columnar_tables: Dict[str, Tuple[Any, Any]] = {}
+_columnar_lock = threading.Lock()
+
+def _table(name: str, kind: type) -> Any:
+    # Built once per dataset version, from whichever storage backend is active
+    if data_index.STORAGE_BACKEND == "columnar":
+        from agents.columnar_store import COLUMNAR_DATASETS, get_table
+        if name in COLUMNAR_DATASETS:
+            source = get_table(name)
+            cached = _columnar_tables.get(name)
+            if cached is None or cached[0] is not source:
+                with _columnar_lock:
+                    cached = _columnar_tables.get(name)
+                    if cached is None or cached[0] is not source:
+                        rows = ((source.key(i), source.row(i)) for i in range(len(source)))
+                        cached = (source, kind(rows))
+                        _columnar_tables[name] = cached
+            return cached[1]
+    return load_derived(name, kind.__name__, lambda data: kind(data.items()))
+
+def market_table() -> MarketTable:
+    return _table("iqvia_mock.json", MarketTable)
+
+def trade_table() -> TradeTable:
+    return _table("exim_mock.json", TradeTable)
+
+def market_overview(therapy_area: Optional[str] = None, geography: Optional[str] = None) -> Dict[str, Any]:
+    """Cross-market rankings and aggregates for the IQVIA agent.
+
+    Rankings span every market, since a therapy area often has a single market
+    to rank; the queried area's placings are reported under "focus".
+    """
+    table = market_table()
+    overview = {
+        "markets_scanned": len(table),
+        # Markets with a size in the geography, i.e. the ones the rankings compare
+        "markets_ranked": int(np.isfinite(table.regional_size(geography)).sum()),
+        "top_markets": table.top_markets(geography=geography),
+        "competition_gaps": table.competition_gaps(geography=geography),
+        "geography_shares": table.geography_shares(),
+        "competitor_overlap": table.competitor_overlap()
+    }
+    if therapy_area:
+        overview["focus"] = table.area_ranks(therapy_area, geography)
+    return overview
+
+def trade_overview() -> Dict[str, Any]:
+    """Cross-molecule trade aggregates for the EXIM agent"""
+    table = trade_table()
+    return {
+        "molecules_scanned": len(table),
+        "net_trade_by_country": table.net_trade_by_country(),
+        "import_dependency": table.import_dependency(),
+        "top_balances": table.top_balances()
+    }
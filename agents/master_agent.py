@@ -5,16 +5,37 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
-from langgraph.graph import StateGraph, END
-from typing import TypedDict, Any
+import time
+import contextvars
+import importlib
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Annotated, TypedDict, Any, Callable, Dict, List, Optional
 from agents.query_parser import QueryParser
-from agents.iqvia_agent import fetch_iqvia_data
-from agents.exim_agent import fetch_exim_data
-from agents.patent_agent import fetch_patent_data
-from agents.clinical_agent import fetch_clinical_trials
-from agents.internal_agent import summarize_internal_docs
-from agents.web_agent import perform_web_search
-from agents.report_agent import generate_pdf_report
+from agents.results import agent_error
+from agents.tracing import traced
+from agents.connectors import prefetch
+from agents.single_flight import single_flight
+
+# Reducers for fields that more than one node may write in the same step
+
+def merge_dicts(left: Optional[dict], right: Optional[dict]) -> dict:
+    if not left:
+        return right or {}
+    if not right:
+        return left
+    return {**left, **right}
+
+def keep_first(left: Any, right: Any) -> Any:
+    return left or right
+
+def merge_spans(left: Optional[list], right: Optional[list]) -> list:
+    """Union of two span lists by span ID, in recording order"""
+    if not left:
+        return right or []
+    seen = {span["span_id"] for span in left}
+    return left + [span for span in right or [] if span["span_id"] not in seen]
 
 class State(TypedDict):
     query: str
@@ -22,119 +43,376 @@ class State(TypedDict):
     disease: str
     therapy_area: str
     query_type: str
+    geography: str
+    analysis_scope: str
+    launch_date: str
+    expiry_horizon_months: int
+    trial_phase: int
+    trial_status: str
     uploaded_file_path: str
     subtasks: list
+    pending_tasks: list
+    current_task: str
     completed_tasks: list
+    task_timings: Annotated[dict, merge_dicts]
     iqvia: dict
     exim: dict
     patent: dict
     clinical: dict
     internal: dict
     web: dict
+    report_formats: list
     report_path: str
+    report_files: list
+    report_job_id: str
     summary: str
+    trace_id: Annotated[str, keep_first]
+    trace: Annotated[list, merge_spans]
 
-def master_orchestrator(state: State) -> State:
-    """Master Agent: Parses query and determines workflow"""
+def master_orchestrator(state: State) -> Dict[str, Any]:
+    """Master Agent: Parses query and determines workflow; returns only the fields it sets"""
     query = state.get("query", "")
     
     # Parse query
     parser = QueryParser()
-    parsed = parser.parse_query(query)
-    
-    # Update state with parsed information
-    state.update(parsed)
+    update: Dict[str, Any] = parser.parse_query(query)
     
     # Ensure molecule is set - use therapy_area, disease, or query snippet
-    if not state.get("molecule") or state.get("molecule") == "None":
-        if state.get("therapy_area"):
-            state["molecule"] = state["therapy_area"].title()
-        elif state.get("disease"):
-            state["molecule"] = state["disease"].title()
+    if not update.get("molecule") or update.get("molecule") == "None":
+        if update.get("therapy_area"):
+            update["molecule"] = update["therapy_area"].title()
+        elif update.get("disease"):
+            update["molecule"] = update["disease"].title()
         else:
             # Use first meaningful words from query
             query_words = query.split()[:3]
-            state["molecule"] = " ".join([w for w in query_words if w.lower() not in ['which', 'what', 'where', 'when', 'how', 'the', 'are', 'for', 'and', 'but']])[:30]
+            update["molecule"] = " ".join([w for w in query_words if w.lower() not in ['which', 'what', 'where', 'when', 'how', 'the', 'are', 'for', 'and', 'but']])[:30]
     
     # Determine which agents to activate
-    subtasks = parser.decompose_query(parsed)
-    state["subtasks"] = subtasks
-    state["completed_tasks"] = []
-    
-    return state
-
-def route_after_master(state: State) -> str:
-    """Route to first agent after master orchestration"""
-    subtasks = state.get("subtasks", [])
-    if subtasks:
-        return subtasks[0]
-    return "report"
-
-def route_after_agent(state: State) -> str:
-    """Route to next agent or report"""
-    subtasks = state.get("subtasks", [])
-    completed = state.get("completed_tasks", [])
-    
-    # Find next uncompleted task
-    for task in subtasks:
-        if task not in completed:
-            # Mark as completed
-            if task not in completed:
-                completed.append(task)
-                state["completed_tasks"] = completed
-            return task
-    
-    return "report"
-
-# Create graph
-graph = StateGraph(State)
-
-# Add nodes
-graph.add_node("master", master_orchestrator)
-graph.add_node("iqvia", fetch_iqvia_data)
-graph.add_node("exim", fetch_exim_data)
-graph.add_node("patent", fetch_patent_data)
-graph.add_node("clinical", fetch_clinical_trials)
-graph.add_node("internal", summarize_internal_docs)
-graph.add_node("web", perform_web_search)
-graph.add_node("report", generate_pdf_report)
-
-# Set entry point
-graph.set_entry_point("master")
-
-# Route from master to first agent
-graph.add_conditional_edges(
-    "master",
-    route_after_master,
-    {
-        "iqvia": "iqvia",
-        "exim": "exim",
-        "patent": "patent",
-        "clinical": "clinical",
-        "internal": "internal",
-        "web": "web",
-        "report": "report"
-    }
-)
+    subtasks = parser.decompose_query(update)
+    update["subtasks"] = subtasks
+    # Start every remote lookup now rather than one round-trip per agent
+    prefetch(
+        (AGENT_LOOKUPS[task][0], [update[f] if f in update else state.get(f) for f in AGENT_LOOKUPS[task][1]])
+        for task in subtasks if task in AGENT_LOOKUPS
+    )
+    update["pending_tasks"] = TaskScheduler.plan(subtasks)
+    update["current_task"] = ""
+    update["completed_tasks"] = []
+    update["task_timings"] = {}
+    
+    return update
+
+# Agents that must finish before another agent may start. The worker agents
+# only read the parsed query today, so none depend on each other.
+TASK_DEPENDENCIES: Dict[str, List[str]] = {}
 
-# Add conditional edges from each agent to next or report
-for agent_name in ["iqvia", "exim", "patent", "clinical", "internal", "web"]:
-    graph.add_conditional_edges(
-        agent_name,
-        route_after_agent,
-        {
-            "iqvia": "iqvia",
-            "exim": "exim",
-            "patent": "patent",
-            "clinical": "clinical",
-            "internal": "internal",
-            "web": "web",
-            "report": "report"
+class TaskScheduler:
+    """Task queue with exactly-once dispatch, dependency ordering and per-task timings"""
+    
+    def __init__(self, pending: List[str], completed: Optional[List[str]] = None,
+                 timings: Optional[Dict[str, Dict[str, Any]]] = None,
+                 dependencies: Optional[Dict[str, List[str]]] = None):
+        self.pending = list(pending)
+        self.completed = list(completed or [])
+        self.timings = {task: dict(timing) for task, timing in (timings or {}).items()}
+        self.dependencies = TASK_DEPENDENCIES if dependencies is None else dependencies
+        self.running: List[str] = []
+    
+    @staticmethod
+    def plan(subtasks: List[str], dependencies: Optional[Dict[str, List[str]]] = None) -> List[str]:
+        """Order subtasks so dependencies come first, dropping duplicates"""
+        dependencies = TASK_DEPENDENCIES if dependencies is None else dependencies
+        tasks = list(dict.fromkeys(subtasks))
+        ordered: List[str] = []
+        visiting = set()
+        
+        def visit(task: str):
+            if task in ordered:
+                return
+            if task in visiting:
+                raise ValueError(f"Circular task dependency involving: {task}")
+            visiting.add(task)
+            for dependency in dependencies.get(task, []):
+                # Dependencies outside this query's plan are treated as satisfied
+                if dependency in tasks:
+                    visit(dependency)
+            visiting.discard(task)
+            ordered.append(task)
+        
+        for task in tasks:
+            visit(task)
+        return ordered
+    
+    @classmethod
+    def from_state(cls, state: State) -> "TaskScheduler":
+        return cls(
+            state.get("pending_tasks") or [],
+            state.get("completed_tasks") or [],
+            state.get("task_timings") or {}
+        )
+    
+    def ready(self) -> List[str]:
+        """Pending tasks whose dependencies have all completed"""
+        planned = set(self.pending) | set(self.running)
+        return [
+            task for task in self.pending
+            if all(dep in self.completed or dep not in planned for dep in self.dependencies.get(task, []))
+        ]
+    
+    def dispatch(self, task: str):
+        """Take a task off the queue; a task can only be dispatched once"""
+        if task not in self.pending:
+            raise ValueError(f"Task already dispatched: {task}")
+        self.pending.remove(task)
+        self.running.append(task)
+        self.timings[task] = {"start": time.time()}
+    
+    def complete(self, task: str, status: str = "success"):
+        """Record a dispatched task as finished"""
+        if task in self.running:
+            self.running.remove(task)
+        if task in self.completed:
+            return
+        self.completed.append(task)
+        timing = self.timings.setdefault(task, {"start": time.time()})
+        timing["end"] = time.time()
+        timing["duration_ms"] = round((timing["end"] - timing["start"]) * 1000, 2)
+        timing["status"] = status
+    
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "pending_tasks": list(self.pending),
+            "completed_tasks": list(self.completed),
+            "task_timings": self.timings
         }
-    )
 
-# Report always ends
-graph.add_edge("report", END)
+def _task_status(output: Any) -> str:
+    return output.get("status", "success") if isinstance(output, Mapping) else "success"
+
+def schedule_next_task(state: State) -> Dict[str, Any]:
+    """Scheduler stage: close out the task that just ran and dispatch the next one"""
+    scheduler = TaskScheduler.from_state(state)
+    
+    current = state.get("current_task")
+    if current:
+        scheduler.complete(current, _task_status(state.get(current, {})))
+    
+    next_task = ""
+    ready = scheduler.ready()
+    while ready:
+        next_task = ready[0]
+        scheduler.dispatch(next_task)
+        if next_task in AGENT_NODES:
+            break
+        # No agent registered for this task; close it out and move on
+        scheduler.complete(next_task, "skipped")
+        next_task = ""
+        ready = scheduler.ready()
+    
+    return {**scheduler.to_state(), "current_task": next_task}
+
+def route_after_scheduler(state: State) -> str:
+    """Route to the agent the scheduler dispatched, or to the report when the queue is empty"""
+    return state.get("current_task") or "report"
+
+def _lazy(module: str, name: str) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Node that imports its module on first call, so startup skips agents (and their libraries) until used"""
+    resolved: List[Callable] = []
+
+    def node(state: Dict[str, Any]) -> Dict[str, Any]:
+        if not resolved:
+            resolved.append(getattr(importlib.import_module(module), name))
+        return resolved[0](state)
+
+    node.__name__ = name
+    return node
+
+# Worker nodes keyed by the subtask names produced by QueryParser.decompose_query;
+# concurrent requests for the same entities share one run of each agent
+AGENT_NODES = {
+    "iqvia": traced("iqvia", single_flight("iqvia", _lazy("agents.iqvia_agent", "fetch_iqvia_data"))),
+    "exim": traced("exim", single_flight("exim", _lazy("agents.exim_agent", "fetch_exim_data"))),
+    "patent": traced("patent", single_flight("patent", _lazy("agents.patent_agent", "fetch_patent_data"))),
+    "clinical": traced("clinical", single_flight("clinical", _lazy("agents.clinical_agent", "fetch_clinical_trials"))),
+    "internal": traced("internal", single_flight("internal", _lazy("agents.internal_agent", "summarize_internal_docs"))),
+    "web": traced("web", single_flight("web", _lazy("agents.web_agent", "perform_web_search")))
+}
+
+# Dataset and candidate fields each agent looks up, in the agent's own order,
+# so the master can prefetch them when the data source is remote
+AGENT_LOOKUPS = {
+    "iqvia": ("iqvia_mock.json", ["molecule", "therapy_area", "disease", "query"]),
+    "exim": ("exim_mock.json", ["api_name", "molecule", "query"]),
+    "patent": ("patent_mock.json", ["molecule", "therapy_area", "query"]),
+    "clinical": ("clinical_mock.json", ["molecule", "disease", "therapy_area", "query"]),
+    "web": ("web_search_mock.json", ["query", "molecule", "disease", "therapy_area"])
+}
+
+# "parallel" fans all subtasks out at once and joins before the report,
+# "sequential" chains them one after another
+GRAPH_MODE = os.environ.get("GRAPH_MODE", "parallel")
+
+# Per-agent timeout in seconds; override a single agent with e.g. INTERNAL_AGENT_TIMEOUT=60
+AGENT_TIMEOUT_SECONDS = float(os.environ.get("AGENT_TIMEOUT_SECONDS", "30"))
+
+# "async" renders the reports on the background report queue and returns a job ID,
+# "sync" renders them inside the graph before returning
+REPORT_MODE = os.environ.get("REPORT_MODE", "async")
+
+# Shared pool so requests reuse worker threads instead of spawning new ones
+_agent_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("AGENT_MAX_WORKERS", "32")),
+    thread_name_prefix="agent"
+)
+
+def agent_timeout(task: str) -> float:
+    """Timeout budget for a single worker agent"""
+    return float(os.environ.get(f"{task.upper()}_AGENT_TIMEOUT", AGENT_TIMEOUT_SECONDS))
+
+# Python threads cannot be stopped, so an agent that times out keeps its
+# worker until it returns on its own. These are counted here; while they
+# run the pool has fewer free workers, and agents queued behind them are
+# cancelled once they have waited their own timeout for a worker.
+_abandoned_agents = 0
+_abandoned_lock = threading.Lock()
+
+def abandoned_agents() -> int:
+    """Timed-out agents still holding a pool worker"""
+    return _abandoned_agents
+
+def _abandon(future):
+    global _abandoned_agents
+    with _abandoned_lock:
+        _abandoned_agents += 1
+    
+    def release(_):
+        global _abandoned_agents
+        with _abandoned_lock:
+            _abandoned_agents -= 1
+    future.add_done_callback(release)
+
+class _AgentRun:
+    """Records when a submitted agent actually gets a worker"""
+    
+    def __init__(self, node: Callable):
+        self.node = node
+        self.started = threading.Event()
+        self.started_at = 0.0
+    
+    def __call__(self, state):
+        self.started_at = time.monotonic()
+        self.started.set()
+        return self.node(state)
+
+def run_agents_parallel(state: State) -> Dict[str, Any]:
+    """Fan-out/fan-in: run every ready subtask concurrently and join the results"""
+    scheduler = TaskScheduler.from_state(state)
+    updates: Dict[str, Any] = {}
+    
+    # Each wave holds the tasks whose dependencies are done; with no
+    # dependencies declared everything runs in a single wave
+    wave = scheduler.ready()
+    while wave:
+        # Agents only read the state, so one view per wave is shared by all of them
+        wave_state = {**state, **updates} if updates else state
+        futures = {}
+        for task in wave:
+            scheduler.dispatch(task)
+            if task in AGENT_NODES:
+                # Copy the context so the agent's span is recorded under this node's span
+                context = contextvars.copy_context()
+                run = _AgentRun(AGENT_NODES[task])
+                futures[task] = (_agent_executor.submit(context.run, run, wave_state), run, time.monotonic())
+            else:
+                scheduler.complete(task, "skipped")
+        
+        for task, (future, run, submitted) in futures.items():
+            timeout = agent_timeout(task)
+            # Time spent waiting for a free worker does not count against the
+            # agent, but it may wait at most its own timeout before giving up
+            if not run.started.wait(max(0.0, submitted + timeout - time.monotonic())) and future.cancel():
+                updates[task] = agent_error(f"{task} agent found no free worker within {timeout:g}s")
+                scheduler.complete(task, "timeout")
+                continue
+            run.started.wait()
+            remaining = max(0.0, run.started_at + timeout - time.monotonic())
+            try:
+                updates[task] = future.result(timeout=remaining).get(task, {})
+                scheduler.complete(task, _task_status(updates[task]))
+            except FutureTimeoutError:
+                # The agent keeps its worker until it returns; its result is discarded
+                _abandon(future)
+                updates[task] = agent_error(f"{task} agent timed out after {timeout:g}s")
+                scheduler.complete(task, "timeout")
+            except Exception as e:
+                updates[task] = agent_error(f"Error running {task} agent: {str(e)}")
+                scheduler.complete(task, "error")
+        
+        wave = scheduler.ready()
+    
+    return {**updates, **scheduler.to_state()}
+
+def build_graph(mode: str = GRAPH_MODE, report_mode: str = REPORT_MODE):
+    """Build and compile the LangGraph workflow in parallel or sequential mode"""
+    from langgraph.graph import StateGraph, END
+    
+    graph = StateGraph(State)
+    
+    graph.add_node("master", traced("master", master_orchestrator))
+    if report_mode == "async":
+        report = _lazy("agents.report_jobs", "queue_pdf_report")
+    else:
+        report = _lazy("agents.report_agent", "generate_reports")
+    graph.add_node("report", traced("report", report))
+    graph.set_entry_point("master")
+    
+    if mode == "parallel":
+        # master -> all agents concurrently -> report
+        graph.add_node("agents", traced("agents", run_agents_parallel))
+        graph.add_edge("master", "agents")
+        graph.add_edge("agents", "report")
+    elif mode == "sequential":
+        # master -> scheduler -> agent -> scheduler -> ... -> report
+        graph.add_node("scheduler", traced("scheduler", schedule_next_task))
+        graph.add_edge("master", "scheduler")
+        
+        routes = {"report": "report"}
+        for agent_name, node in AGENT_NODES.items():
+            graph.add_node(agent_name, node)
+            graph.add_edge(agent_name, "scheduler")
+            routes[agent_name] = agent_name
+        
+        graph.add_conditional_edges("scheduler", route_after_scheduler, routes)
+    else:
+        raise ValueError(f"Unknown graph mode: {mode}")
+    
+    # Report always ends
+    graph.add_edge("report", END)
+    
+    return graph.compile()
+
+_app = None
+_app_lock = threading.Lock()
+
+def get_app():
+    """The default compiled graph, built on first use"""
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = build_graph()
+    return _app
+
+def warm_up():
+    """Build the graph and import every agent and report module ahead of the first request"""
+    get_app()
+    for module in ("agents.iqvia_agent", "agents.exim_agent", "agents.patent_agent", "agents.clinical_agent",
+                   "agents.internal_agent", "agents.web_agent", "agents.report_agent", "agents.report_jobs"):
+        importlib.import_module(module)
 
-# Compile app
-app = graph.compile()
+def __getattr__(name: str):
+    # `from agents.master_agent import app` keeps working, compiling the graph on first access
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
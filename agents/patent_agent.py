@@ -1,7 +1,8 @@
-import json
-import os
 from typing import Dict, Any
-from datetime import datetime, timedelta
+from datetime import date
+from agents.connectors import lookup
+from agents.patent_index import PATENT_HORIZON_MONTHS, add_months, get_patent_index, parse_date
+from agents.results import AgentResult
 
 def fetch_patent_data(state: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -12,20 +13,10 @@ def fetch_patent_data(state: Dict[str, Any]) -> Dict[str, Any]:
     query = state.get("query", "")
     
     search_key = molecule or therapy_area or query
-    search_key_lower = search_key.lower() if search_key else ""
-    
-    mock_file = os.path.join("mock_data", "patent_mock.json")
     
     try:
-        with open(mock_file, 'r') as f:
-            data = json.load(f)
-        
-        # Try exact match first, then case-insensitive
-        result = None
-        for key in data.keys():
-            if key.lower() == search_key_lower:
-                result = data[key]
-                break
+        # Indexed, case-insensitive lookup with brand/synonym aliases
+        _, result = lookup("patent_mock.json", molecule, therapy_area, query)
         
         if not result:
             result = {
@@ -38,17 +29,28 @@ def fetch_patent_data(state: Dict[str, Any]) -> Dict[str, Any]:
                 "competitive_filings": {}
             }
         
-        # Calculate FTO status
-        fto_status = result.get("freedom_to_operate", "unknown")
-        if result.get("active_patents"):
-            fto_status = "restricted" if len(result["active_patents"]) > 0 else "clear"
+        # Expiry window and FTO status come from the date-sorted patent index
+        index = get_patent_index()
+        patents = index.patents_for(molecule, therapy_area, query)
+        today = date.today()
+        launch_date = parse_date(state.get("launch_date"))
+        if launch_date and launch_date > today:
+            window_end, window = launch_date, f"before launch ({launch_date.isoformat()})"
+        else:
+            months = state.get("expiry_horizon_months") or PATENT_HORIZON_MONTHS
+            window_end, window = add_months(today, months), f"in the next {months} months"
+        expiring = index.expiring(today, window_end, patents) if patents else []
+        fto = index.fto_rollup(patents, today, launch_date)
         
+        next_expiry = f" (next: {expiring[0]['patent_number']} on {expiring[0]['expiry'].isoformat()})" if expiring else ""
         output = {
             "status": "success",
             "data": result,
-            "summary": f"Patent analysis for {search_key}: {len(result.get('active_patents', []))} active patents, "
-                      f"FTO status: {fto_status}. "
-                      f"Key expiries: {len(result.get('patent_expiry_timeline', []))} patents expiring soon."
+            "fto": fto,
+            "expiring_patents": [f"{p['patent_number']} ({p['expiry'].isoformat()})" for p in expiring],
+            "summary": f"Patent analysis for {search_key}: {fto['active_patents']} active patents, "
+                      f"FTO status: {fto['status']}. "
+                      f"Key expiries: {len(expiring)} patents expiring {window}{next_expiry}."
         }
         
     except FileNotFoundError:
@@ -64,4 +66,4 @@ def fetch_patent_data(state: Dict[str, Any]) -> Dict[str, Any]:
             "summary": f"Error fetching patent data: {str(e)}"
         }
     
-    return {**state, "patent": output}
+    return {"patent": AgentResult(**output)}
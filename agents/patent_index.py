@@ -0,0 +1,201 @@
+import bisect
+import calendar
+import os
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from agents.data_index import normalize_key, resolve_key
+from agents.data_store import dataset_cache
+
+PATENT_FILE = "patent_mock.json"
+
+# Default look-ahead for "expiring soon", in months
+PATENT_HORIZON_MONTHS = int(os.environ.get("PATENT_HORIZON_MONTHS", "24"))
+
+def parse_date(value: Any) -> Optional[date]:
+    """ISO date (YYYY-MM-DD, YYYY-MM or YYYY) or None when missing/invalid"""
+    if isinstance(value, date):
+        return value
+    text = str(value or "").strip()
+    for fmt, length in (("%Y-%m-%d", 10), ("%Y-%m", 7), ("%Y", 4)):
+        try:
+            return datetime.strptime(text[:length], fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    # Clamp to the end of shorter months (Jan 31 + 1 month -> Feb 28/29)
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+def patents_from_dataset(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Flatten the per-molecule/therapy-area patent records into one entry per patent number"""
+    patents: Dict[str, Dict[str, Any]] = {}
+    for group, record in data.items():
+        if not isinstance(record, dict):
+            continue
+        risks = set(record.get("fto_risks") or [])
+        listed = [(p, p.get("expiry")) for p in record.get("active_patents") or []]
+        listed += [(p, p.get("expiry_date")) for p in record.get("patent_expiry_timeline") or []]
+        for patent, expiry in listed:
+            number = patent.get("patent_number")
+            if not number:
+                continue
+            entry = patents.setdefault(number, {
+                "patent_number": number, "title": "", "molecule": "", "expiry": None,
+                "groups": [], "fto_risk": False
+            })
+            entry["title"] = entry["title"] or patent.get("title", "")
+            entry["molecule"] = entry["molecule"] or normalize_key(patent.get("molecule"))
+            entry["expiry"] = entry["expiry"] or parse_date(expiry)
+            if normalize_key(group) not in entry["groups"]:
+                entry["groups"].append(normalize_key(group))
+            entry["fto_risk"] = entry["fto_risk"] or number in risks or bool(patent.get("fto_risk"))
+    return {number: entry for number, entry in patents.items() if entry["expiry"] is not None}
+
+class PatentIndex:
+    """Patents sorted by expiry date, with per-molecule/therapy-area postings.
+
+    Range queries are two bisects over the sorted dates; adding or changing a
+    patent is a single insort, so dataset updates never rebuild the index.
+    """
+
+    def __init__(self):
+        self._by_expiry: List[Tuple[int, str]] = []
+        self.patents: Dict[str, Dict[str, Any]] = {}
+        self._entities: Dict[str, Set[str]] = {}
+        # Patents that came from the dataset file, as opposed to add_patents()
+        self._synced: Set[str] = set()
+        self._lock = threading.RLock()
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.patents)
+
+    @staticmethod
+    def _entity_keys(patent: Dict[str, Any]) -> List[str]:
+        # A molecule is often also its own group; list each key once
+        return list(dict.fromkeys(k for k in [patent["molecule"], *patent["groups"]] if k))
+
+    def add(self, patent: Dict[str, Any]):
+        """Insert a patent, or replace the entry with the same patent number"""
+        with self._lock:
+            self.remove(patent["patent_number"])
+            self.patents[patent["patent_number"]] = patent
+            bisect.insort(self._by_expiry, (patent["expiry"].toordinal(), patent["patent_number"]))
+            for key in self._entity_keys(patent):
+                self._entities.setdefault(key, set()).add(patent["patent_number"])
+
+    def remove(self, number: str):
+        with self._lock:
+            patent = self.patents.pop(number, None)
+            if patent is None:
+                return
+            position = bisect.bisect_left(self._by_expiry, (patent["expiry"].toordinal(), number))
+            del self._by_expiry[position]
+            for key in self._entity_keys(patent):
+                self._entities[key].discard(number)
+                if not self._entities[key]:
+                    del self._entities[key]
+
+    def sync(self, patents: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """Apply only the differences between the index and a fresh set of patents"""
+        with self._lock:
+            removed = [n for n in self._synced if n not in patents]
+            changed = [p for n, p in patents.items() if self.patents.get(n) != p]
+            if len(changed) + len(removed) > max(1000, len(self.patents) // 10):
+                # Large changes (e.g. the first load) are cheaper as one sort than many insorts
+                for number in removed:
+                    self.patents.pop(number, None)
+                self.patents.update((p["patent_number"], p) for p in changed)
+                self._reindex()
+            else:
+                for number in removed:
+                    self.remove(number)
+                for patent in changed:
+                    self.add(patent)
+            self._synced = set(patents)
+            return {"added_or_updated": len(changed), "removed": len(removed)}
+
+    def _reindex(self):
+        self._by_expiry = sorted((p["expiry"].toordinal(), n) for n, p in self.patents.items())
+        self._entities = {}
+        for number, patent in self.patents.items():
+            for key in self._entity_keys(patent):
+                self._entities.setdefault(key, set()).add(number)
+
+    def find(self, term: str) -> Optional[Set[str]]:
+        """Patent numbers for one normalized molecule or therapy area"""
+        return self._entities.get(term)
+
+    def patents_for(self, *candidates: Any) -> Optional[Set[str]]:
+        """Patents for the first candidate that matches, directly or through an alias"""
+        with self._lock:
+            found = resolve_key(self.find, *candidates)
+            return set(found) if found is not None else None
+
+    def expiring(self, start: date, end: date, numbers: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Patents expiring in [start, end], soonest first, optionally limited to some patent numbers"""
+        first, last = start.toordinal(), end.toordinal()
+        with self._lock:
+            lo = bisect.bisect_left(self._by_expiry, (first, ""))
+            hi = bisect.bisect_right(self._by_expiry, (last, "\uffff"))
+            if numbers is not None and len(numbers) < hi - lo:
+                # Fewer candidate patents than dates in the window: check the candidates instead
+                matches = [self.patents[n] for n in numbers if n in self.patents]
+                matches = [p for p in matches if first <= p["expiry"].toordinal() <= last]
+                return sorted(matches, key=lambda p: (p["expiry"], p["patent_number"]))
+            return [self.patents[n] for _, n in self._by_expiry[lo:hi] if numbers is None or n in numbers]
+
+    def fto_rollup(self, numbers: Optional[Set[str]], as_of: date, launch_date: Optional[date] = None) -> Dict[str, Any]:
+        """Freedom-to-operate for a set of patents at launch (or as of today)"""
+        with self._lock:
+            patents = [self.patents[n] for n in numbers or () if n in self.patents]
+        launch = max(as_of, launch_date) if launch_date else as_of
+        active = [p for p in patents if p["expiry"] >= as_of]
+        blocking = sorted((p for p in patents if p["fto_risk"] and p["expiry"] >= launch), key=lambda p: p["expiry"])
+        if not patents:
+            status = "unknown"
+        else:
+            status = "restricted" if blocking else "clear"
+        return {
+            "status": status,
+            "assessed_for": launch.isoformat(),
+            "patents": len(patents),
+            "active_patents": len(active),
+            "blocking_patents": [p["patent_number"] for p in blocking],
+            # FTO clears once the last flagged patent has expired
+            "clear_from": blocking[-1]["expiry"].isoformat() if blocking else None
+        }
+
+    def rollups(self, as_of: date, launch_date: Optional[date] = None) -> Dict[str, Dict[str, Any]]:
+        """FTO rollup for every indexed molecule and therapy area"""
+        with self._lock:
+            entities = {key: set(numbers) for key, numbers in self._entities.items()}
+        return {key: self.fto_rollup(numbers, as_of, launch_date) for key, numbers in sorted(entities.items())}
+
+# Shared index, kept in step with the patent dataset
+patent_index = PatentIndex()
+_sync_lock = threading.Lock()
+
+def get_patent_index() -> PatentIndex:
+    """Shared index, updated incrementally whenever the patent dataset reloads"""
+    version = dataset_cache.version(PATENT_FILE)
+    if version != patent_index.version:
+        with _sync_lock:
+            if version != patent_index.version:
+                patent_index.sync(patents_from_dataset(dataset_cache.get(PATENT_FILE)))
+                patent_index.version = version
+    return patent_index
+
+def add_patents(records: Iterable[Dict[str, Any]], group: str = ""):
+    """Add patent records (patent_expiry_timeline entries, optionally with "fto_risk") without a reload"""
+    index = get_patent_index()
+    for number, patent in patents_from_dataset({group or "other": {"patent_expiry_timeline": list(records)}}).items():
+        existing = index.patents.get(number)
+        if existing:
+            patent["groups"] = list(dict.fromkeys(existing["groups"] + patent["groups"]))
+            patent["fto_risk"] = patent["fto_risk"] or existing["fto_risk"]
+        index.add(patent)
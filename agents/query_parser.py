@@ -1,90 +1,139 @@
 import re
-from typing import Dict, List, Any
+import string
+from typing import Dict, List, Any, Optional
+from agents.entity_extractor import get_extractor
+
+DISEASE_KEYWORDS = ['disease', 'indication', 'therapy', 'condition', 'disorder']
+DISEASE_KEYWORD_PATTERN = re.compile(r'\b(' + '|'.join(DISEASE_KEYWORDS) + r')[:\s]+([a-z\s]+)')
+
+# "launch in 2027", "before 2027-06", "launch date 2028-01-15"
+LAUNCH_DATE_PATTERN = re.compile(r'\b(?:launch(?:ing)?(?:\s+date)?|before|by)\s+(?:in\s+|on\s+|of\s+)?(\d{4}(?:-\d{2}(?:-\d{2})?)?)\b')
+
+# "next 24 months", "next 3 years"
+HORIZON_PATTERN = re.compile(r'\bnext\s+(\d+)\s+(month|year)s?\b')
+
+# "Phase 3", "phase III", "Phase 2/3" (the later phase)
+TRIAL_PHASE_PATTERN = re.compile(r'\bphase\s*(?:[1-4]|iv|i{1,3})(?:\s*/\s*(?:[1-4]|iv|i{1,3}))?\b')
+_PHASE = re.compile(r"phase\s*([1-4]|iv|i{1,3})(?:\s*/\s*([1-4]|iv|i{1,3}))?", re.IGNORECASE)
+_ROMAN = {"i": 1, "ii": 2, "iii": 3, "iv": 4}
+
+# Trial status wording mapped to the statuses stored for clinical trials
+TRIAL_STATUS_WORDS = {"ongoing": "ongoing", "active": "ongoing", "recruiting": "ongoing",
+                      "completed": "completed", "finished": "completed"}
+TRIAL_STATUS_PATTERN = re.compile(r'\b(' + '|'.join(TRIAL_STATUS_WORDS) + r')\b')
+
+def parse_phase(value: Any) -> Optional[int]:
+    """1-4 from "Phase 3", "phase III" or "Phase 2/3" (the later phase), else None.
+
+    Shared with the trial store, which parses the phase column of the clinical dataset.
+    """
+    if isinstance(value, int):
+        return value if 1 <= value <= 4 else None
+    match = _PHASE.search(str(value or ""))
+    if not match:
+        return None
+    phase = (match.group(2) or match.group(1)).lower()
+    return int(phase) if phase.isdigit() else _ROMAN[phase]
+
+STOP_WORDS = {'which', 'what', 'where', 'when', 'how', 'the', 'are', 'for', 'and', 'but'}
 
 class QueryParser:
     """Parse user queries and extract key entities"""
     
+    # Precedence when a query mentions several query types
+    QUERY_TYPE_PRIORITY = ["opportunity_analysis", "market_analysis", "patent_analysis",
+                           "clinical_analysis", "trade_analysis"]
+    
     @staticmethod
     def parse_query(query: str) -> Dict[str, Any]:
         """Extract molecule, disease, therapy area, and other entities from query"""
         query_lower = query.lower()
         
-        # Extract molecule names (common patterns)
-        molecule_patterns = [
-            r'\b([A-Z][a-z]+(?:[A-Z][a-z]+)*)\b',  # Capitalized words
-            r'molecule[:\s]+([A-Za-z0-9-]+)',
-            r'drug[:\s]+([A-Za-z0-9-]+)',
-            r'compound[:\s]+([A-Za-z0-9-]+)'
-        ]
-        
-        # Extract disease/therapy area
-        disease_keywords = ['disease', 'indication', 'therapy', 'condition', 'disorder']
-        therapy_areas = ['respiratory', 'cardiovascular', 'oncology', 'diabetes', 
-                        'neurology', 'infectious', 'autoimmune', 'gastrointestinal']
-        
         parsed = {
             "original_query": query,
             "molecule": None,
             "disease": None,
             "therapy_area": None,
             "query_type": "general",
+            "geography": None,
+            "analysis_scope": "single",
+            "launch_date": None,
+            "expiry_horizon_months": None,
+            "trial_phase": None,
+            "trial_status": None,
             "entities": []
         }
         
+        # One pass over the query with the compiled dictionary automaton
+        entities = get_extractor().extract(query)
+        parsed["entities"] = [e for e in entities if e["type"] not in ("query_type", "analysis_scope")]
+        
+        def first(entity_type: str):
+            return next((e["value"] for e in entities if e["type"] == entity_type), None)
+        
         # Extract therapy area
-        for area in therapy_areas:
-            if area in query_lower:
-                parsed["therapy_area"] = area
-                # If no molecule found, use therapy area as molecule identifier
-                if not parsed["molecule"]:
-                    parsed["molecule"] = area.title()
-                break
+        therapy_area = first("therapy_area")
+        if therapy_area:
+            parsed["therapy_area"] = therapy_area
+            parsed["molecule"] = therapy_area.title()
+        
+        # If no therapy area, use a known drug name (brand names resolve to the INN)
+        if not parsed["molecule"]:
+            molecule = first("molecule")
+            if molecule:
+                parsed["molecule"] = string.capwords(molecule)
         
-        # Extract disease/indication
-        for keyword in disease_keywords:
-            if keyword in query_lower:
-                # Try to extract what comes after the keyword
-                pattern = f'{keyword}[:\\s]+([A-Za-z\\s]+)'
-                match = re.search(pattern, query_lower)
-                if match:
-                    disease_name = match.group(1).strip()
-                    parsed["disease"] = disease_name
-                    # If no molecule found, use disease as molecule identifier
-                    if not parsed["molecule"]:
-                        parsed["molecule"] = disease_name.title()
+        # Extract disease/indication: a known disease, else whatever follows a keyword
+        disease_name = first("disease")
+        if not disease_name:
+            keyword_matches = list(DISEASE_KEYWORD_PATTERN.finditer(query_lower))
+            if keyword_matches:
+                # Later keywords in DISEASE_KEYWORDS take precedence, first occurrence wins
+                match = max(keyword_matches, key=lambda m: (DISEASE_KEYWORDS.index(m.group(1)), -m.start()))
+                disease_name = match.group(2).strip() or None
+        if disease_name:
+            parsed["disease"] = disease_name
+            # If no molecule found, use disease as molecule identifier
+            if not parsed["molecule"]:
+                parsed["molecule"] = string.capwords(disease_name)
         
-        # If still no molecule, try to extract from common drug names in query
+        # If still no molecule, extract first meaningful capitalized word
         if not parsed["molecule"]:
-            common_drugs = ['metformin', 'aspirin', 'paracetamol', 'ibuprofen', 'atorvastatin', 
-                          'rosuvastatin', 'albuterol', 'salmeterol', 'insulin', 'warfarin']
-            for drug in common_drugs:
-                if drug in query_lower:
-                    parsed["molecule"] = drug.title()
+            for word in query.split():
+                if word[0].isupper() and len(word) > 3 and word.lower() not in STOP_WORDS:
+                    parsed["molecule"] = word
                     break
         
-        # If still no molecule, use therapy area or first meaningful word from query
-        if not parsed["molecule"]:
-            if parsed["therapy_area"]:
-                parsed["molecule"] = parsed["therapy_area"].title()
-            else:
-                # Extract first meaningful capitalized word or therapy-related term
-                words = query.split()
-                for word in words:
-                    if word[0].isupper() and len(word) > 3 and word.lower() not in ['which', 'what', 'where', 'when', 'how', 'the', 'are', 'for', 'and', 'but']:
-                        parsed["molecule"] = word
-                        break
+        parsed["geography"] = first("geography")
+        
+        # Ranking/comparison wording without a specific molecule asks about the
+        # whole market table rather than a single record
+        if first("analysis_scope") and not first("molecule"):
+            parsed["analysis_scope"] = "portfolio"
+        
+        # Dates for patent expiry windows
+        launch_match = LAUNCH_DATE_PATTERN.search(query_lower)
+        if launch_match:
+            parsed["launch_date"] = launch_match.group(1)
+        horizon_match = HORIZON_PATTERN.search(query_lower)
+        if horizon_match:
+            count = int(horizon_match.group(1))
+            parsed["expiry_horizon_months"] = count * 12 if horizon_match.group(2) == "year" else count
         
-        # Determine query type (check opportunity first as it's most comprehensive)
-        if "repurposing" in query_lower or "unmet" in query_lower or "opportunity" in query_lower:
-            parsed["query_type"] = "opportunity_analysis"
-        elif "market" in query_lower or "sales" in query_lower or "iqvia" in query_lower:
-            parsed["query_type"] = "market_analysis"
-        elif "patent" in query_lower or "ip" in query_lower or "freedom" in query_lower or "fto" in query_lower:
-            parsed["query_type"] = "patent_analysis"
-        elif "trial" in query_lower or "clinical" in query_lower:
-            parsed["query_type"] = "clinical_analysis"
-        elif "trade" in query_lower or "export" in query_lower or "import" in query_lower or "exim" in query_lower:
-            parsed["query_type"] = "trade_analysis"
+        # Filters for the clinical trial store
+        phase_match = TRIAL_PHASE_PATTERN.search(query_lower)
+        if phase_match:
+            parsed["trial_phase"] = parse_phase(phase_match.group(0))
+        status_match = TRIAL_STATUS_PATTERN.search(query_lower)
+        if status_match:
+            parsed["trial_status"] = TRIAL_STATUS_WORDS[status_match.group(1)]
+        
+        # Determine query type (opportunity first as it's most comprehensive)
+        found_types = {e["value"] for e in entities if e["type"] == "query_type"}
+        for query_type in QueryParser.QUERY_TYPE_PRIORITY:
+            if query_type in found_types:
+                parsed["query_type"] = query_type
+                break
         
         return parsed
     
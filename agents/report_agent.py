@@ -1,25 +1,125 @@
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.styles import StyleSheet1, getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.platypus.flowables import Flowable
+import copy
+import hashlib
+import json
 import os
+import threading
+from collections.abc import Mapping
 from datetime import datetime
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional
+from xml.sax.saxutils import escape
+from agents.admission import StageBusy, stages
+from agents.exports import SECTIONS, resolve_formats, write_exports
+from agents.result_cache import ResultCache
+from agents.results import json_default
+from agents.single_flight import SingleFlight
+from agents.storage import REPORTS_DIR, report_store
+from agents.tracing import annotate
 
-def generate_pdf_report(state: Dict[str, Any]) -> Dict[str, Any]:
+# Rendered report sections kept for reuse; 0 disables the cache
+SECTION_CACHE_SIZE = int(os.environ.get("SECTION_CACHE_SIZE", "512"))
+
+# Sections are keyed by their content, so the TTL only bounds how long unused ones stay in memory
+SECTION_CACHE_TTL = float(os.environ.get("SECTION_CACHE_TTL", "3600"))
+
+section_cache = ResultCache(SECTION_CACHE_SIZE)
+
+# Coalesces concurrent renders of the same report content
+report_flights = SingleFlight()
+
+_styles: Optional[StyleSheet1] = None
+_styles_lock = threading.Lock()
+
+def get_styles() -> StyleSheet1:
+    """Sample style sheet built once and shared by every report (styles are only read)"""
+    global _styles
+    if _styles is None:
+        with _styles_lock:
+            if _styles is None:
+                _styles = getSampleStyleSheet()
+    return _styles
+
+def section_fingerprint(*parts: Any) -> str:
+    """Content hash of a report section's inputs"""
+    try:
+        encoded = json.dumps(parts, sort_keys=True, default=json_default)
+    except TypeError:
+        # Mixed int/str keys cannot be sorted; insertion order is still deterministic per agent
+        encoded = json.dumps(parts, default=json_default)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+def cached_flowables(key: str, build: Callable[[], List[Flowable]]) -> List[Flowable]:
+    """Flowables for one section, with the markup parsed only the first time its content is seen.
+
+    Each report gets shallow copies. They share the parsed fragments, which
+    line breaking only reads; line breaks and page splits are computed on the
+    copy, so reports rendered at the same time never share layout state.
+    """
+    prototypes = section_cache.get(key)
+    if prototypes is None:
+        prototypes = build()
+        section_cache.set(key, prototypes, SECTION_CACHE_TTL)
+    return [copy.copy(flowable) for flowable in prototypes]
+
+def _header_flowables(molecule: str) -> List[Flowable]:
+    styles = get_styles()
+    summary_text = f"This report provides comprehensive intelligence on {molecule} across market dynamics, trade flows, patent landscape, clinical development, internal insights, and web intelligence."
+    return [
+        Paragraph("Executive Summary", styles['Heading1']),
+        Paragraph(summary_text, styles['Normal']),
+        Spacer(1, 12)
+    ]
+
+def _section_flowables(section_name: str, section_data: Any) -> List[Flowable]:
+    styles = get_styles()
+    story = [Paragraph(section_name, styles['Heading2'])]
+    
+    if isinstance(section_data, Mapping) and section_data:
+        if "summary" in section_data:
+            summary_text = section_data["summary"][:500] + "..." if len(section_data["summary"]) > 500 else section_data["summary"]
+            story.append(Paragraph(f"<b>Summary:</b> {summary_text}", styles['Normal']))
+        
+        # Add other data
+        for key, value in section_data.items():
+            if key not in ["summary", "status"] and value:
+                if isinstance(value, (str, int, float)):
+                    story.append(Paragraph(f"<b>{key.replace('_', ' ').title()}:</b> {str(value)[:200]}", styles['Normal']))
+                elif isinstance(value, list) and value:
+                    items = ", ".join([str(item)[:50] for item in value[:5]])
+                    story.append(Paragraph(f"<b>{key.replace('_', ' ').title()}:</b> {items}", styles['Normal']))
+    else:
+        story.append(Paragraph("No data available for this section.", styles['Normal']))
+    
+    story.append(Spacer(1, 12))
+    return story
+
+def _report_molecule(state: Dict[str, Any]) -> str:
+    molecule = state.get("molecule", "") or state.get("therapy_area", "") or state.get("disease", "") or "Query"
+    return molecule.title() if molecule else "Query"
+
+def report_basename(state: Dict[str, Any], content_key: str = "") -> str:
+    """Path without extension shared by every format of one report"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    molecule_clean = _report_molecule(state).replace(' ', '_').replace('/', '_')[:30]
+    # Different reports for the same molecule within one second must not overwrite each other
+    suffix = f"_{content_key[:8]}" if content_key else ""
+    return os.path.join(REPORTS_DIR, f"pharma_intelligence_report_{molecule_clean}_{timestamp}{suffix}")
+
+def generate_pdf_report(state: Dict[str, Any], basename: str = "") -> Dict[str, Any]:
     """Generate PDF report using ReportLab"""
     try:
-        os.makedirs("reports", exist_ok=True)
+        os.makedirs(REPORTS_DIR, exist_ok=True)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        molecule = state.get("molecule", "") or state.get("therapy_area", "") or state.get("disease", "") or "Query"
-        molecule = molecule.title() if molecule else "Query"
-        molecule_clean = molecule.replace(' ', '_').replace('/', '_')[:30]
-        filename = f"reports/pharma_intelligence_report_{molecule_clean}_{timestamp}.pdf"
+        molecule = _report_molecule(state)
+        filename = f"{basename or report_basename(state)}.pdf"
 
         # Create PDF document
         doc = SimpleDocTemplate(filename, pagesize=letter)
-        styles = getSampleStyleSheet()
+        styles = get_styles()
         story = []
 
         # Title
@@ -37,12 +137,9 @@ def generate_pdf_report(state: Dict[str, Any]) -> Dict[str, Any]:
         story.append(Spacer(1, 12))
 
         # Executive Summary
-        story.append(Paragraph("Executive Summary", styles['Heading1']))
-        summary_text = f"This report provides comprehensive intelligence on {molecule} across market dynamics, trade flows, patent landscape, clinical development, internal insights, and web intelligence."
-        story.append(Paragraph(summary_text, styles['Normal']))
-        story.append(Spacer(1, 12))
+        story.extend(cached_flowables(section_fingerprint("header", molecule), lambda: _header_flowables(molecule)))
 
-        # Sections
+        # Sections: unchanged agent output reuses the section rendered for an earlier report
         sections = [
             ("IQVIA Market Intelligence", state.get("iqvia", {})),
             ("EXIM Trade Analysis", state.get("exim", {})),
@@ -53,30 +150,15 @@ def generate_pdf_report(state: Dict[str, Any]) -> Dict[str, Any]:
         ]
 
         for section_name, section_data in sections:
-            story.append(Paragraph(section_name, styles['Heading2']))
-            
-            if isinstance(section_data, dict) and section_data:
-                if "summary" in section_data:
-                    summary_text = section_data["summary"][:500] + "..." if len(section_data["summary"]) > 500 else section_data["summary"]
-                    story.append(Paragraph(f"<b>Summary:</b> {summary_text}", styles['Normal']))
-                
-                # Add other data
-                for key, value in section_data.items():
-                    if key not in ["summary", "status"] and value:
-                        if isinstance(value, (str, int, float)):
-                            story.append(Paragraph(f"<b>{key.replace('_', ' ').title()}:</b> {str(value)[:200]}", styles['Normal']))
-                        elif isinstance(value, list) and value:
-                            items = ", ".join([str(item)[:50] for item in value[:5]])
-                            story.append(Paragraph(f"<b>{key.replace('_', ' ').title()}:</b> {items}", styles['Normal']))
-            else:
-                story.append(Paragraph("No data available for this section.", styles['Normal']))
-            
-            story.append(Spacer(1, 12))
+            story.extend(cached_flowables(
+                section_fingerprint(section_name, section_data),
+                lambda: _section_flowables(section_name, section_data)
+            ))
 
         # Build PDF
         doc.build(story)
         
-        return {**state, "report_path": filename}
+        return {"report_path": filename}
         
     except Exception as e:
         print(f"Error generating PDF: {str(e)}")
@@ -85,4 +167,107 @@ def generate_pdf_report(state: Dict[str, Any]) -> Dict[str, Any]:
         summary += f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
         summary += "PDF generation failed, but analysis was successful."
         
-        return {**state, "report_path": "", "summary": summary}
\ No newline at end of file
+        return {"report_path": "", "summary": summary}
+
+def generate_reports(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Report node: render every format in state["report_formats"] (default REPORT_FORMATS).
+
+    report_path is the PDF when one was requested, otherwise the first file
+    written; report_files lists every file. A report whose content matches
+    one rendered earlier is served from the earlier files.
+    """
+    try:
+        formats = resolve_formats(state.get("report_formats"))
+    except ValueError as e:
+        return {"report_path": "", "report_files": [], "summary": str(e)}
+
+    # Everything a report shows except its generation time
+    content_key = section_fingerprint("report", formats, state.get("query", "N/A"), _report_molecule(state),
+                                      [state.get(key, {}) for key, _ in SECTIONS])
+    files = report_store.lookup(content_key)
+    annotate(cache="miss" if files is None else "hit")
+    if files is not None:
+        return {"report_path": files[0], "report_files": files}
+
+    # Identical reports requested at the same time are rendered once
+    result, _ = report_flights.do(("report", content_key), lambda: _render_reports(state, formats, content_key))
+    return {**result, "report_files": list(result["report_files"])}
+
+def _render_reports(state: Dict[str, Any], formats: List[str], content_key: str) -> Dict[str, Any]:
+    try:
+        # Layout is CPU-bound; sync-mode graph runs share the same limit as the background queue
+        with stages["report"].slot():
+            return _write_reports(state, formats, content_key)
+    except StageBusy as e:
+        return {"report_path": "", "report_files": [], "summary": str(e)}
+
+def _write_reports(state: Dict[str, Any], formats: List[str], content_key: str) -> Dict[str, Any]:
+    basename = report_basename(state, content_key)
+    result: Dict[str, Any] = {"report_path": "", "report_files": []}
+    if "pdf" in formats:
+        result.update(generate_pdf_report(state, basename))
+        if result["report_path"]:
+            result["report_files"].append(result["report_path"])
+
+    if len(formats) > ("pdf" in formats):
+        errors: Dict[str, str] = {}
+        try:
+            result["report_files"] += write_exports([state], formats, basename, errors)
+        except Exception as e:
+            errors["export"] = str(e)
+            print(f"Error writing report exports: {str(e)}")
+        if errors:
+            result.setdefault("summary", "Report export failed: " + "; ".join(f"{f}: {e}" for f, e in errors.items()))
+
+    if result["report_files"]:
+        # Files of a render that lost a format are still managed, but under their own
+        # key, so an identical request renders the full set again instead of reusing them
+        key = content_key if "summary" not in result else f"{content_key}:incomplete"
+        result["report_files"] = report_store.add(key, result["report_files"])
+        result["report_path"] = result["report_files"][0]
+    return result
+
+def generate_batch_report(results: List[Dict[str, Any]], filename: str = "") -> str:
+    """Generate one combined PDF for a batch of query results; returns the file path"""
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    if not filename:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = os.path.join(REPORTS_DIR, f"pharma_intelligence_batch_report_{timestamp}.pdf")
+
+    doc = SimpleDocTemplate(filename, pagesize=letter)
+    styles = get_styles()
+    story = []
+
+    story.append(Paragraph("Pharmaceutical Intelligence Batch Report", styles['Title']))
+    story.append(Spacer(1, 12))
+    meta_info = f"""
+    <b>Generated:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}<br/>
+    <b>Queries:</b> {len(results)}<br/>
+    """
+    story.append(Paragraph(meta_info, styles['Normal']))
+    story.append(Spacer(1, 12))
+
+    sections = [
+        ("iqvia", "Market"),
+        ("exim", "Trade"),
+        ("patent", "Patents"),
+        ("clinical", "Clinical Trials"),
+        ("internal", "Internal Docs"),
+        ("web", "Web")
+    ]
+
+    for number, result in enumerate(results, 1):
+        story.append(Paragraph(f"{number}. {escape(result.get('query', 'N/A'))}", styles['Heading2']))
+        molecule = result.get("molecule") or result.get("therapy_area") or result.get("disease") or "N/A"
+        story.append(Paragraph(f"<b>Molecule/Therapy Area:</b> {escape(str(molecule))}", styles['Normal']))
+        if result.get("error"):
+            story.append(Paragraph(f"<b>Error:</b> {escape(result['error'])}", styles['Normal']))
+        for key, label in sections:
+            section = result.get(key)
+            if isinstance(section, Mapping) and section.get("summary"):
+                summary_text = section["summary"][:300] + "..." if len(section["summary"]) > 300 else section["summary"]
+                story.append(Paragraph(f"<b>{label}:</b> {escape(summary_text)}", styles['Normal']))
+        story.append(Spacer(1, 12))
+
+    doc.build(story)
+    return filename
@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+# Reports rendered at the same time; further jobs wait in the queue
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", "2"))
+
+# Jobs allowed to wait for a worker before new ones are rejected
+REPORT_QUEUE_LIMIT = int(os.environ.get("REPORT_QUEUE_LIMIT", "64"))
+
+# Finished jobs remembered for status lookups
+REPORT_JOB_HISTORY = 1000
+
+class ReportJobQueue:
+    """Renders reports on a bounded worker pool and tracks them by job ID"""
+
+    def __init__(self, workers: int = REPORT_WORKERS, queue_limit: int = REPORT_QUEUE_LIMIT):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report")
+        self._capacity = threading.BoundedSemaphore(workers + queue_limit)
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._done_events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _run(self, job_id: str, state: Dict[str, Any]):
+        self._update(job_id, status="running", started_at=time.time())
+        try:
+            # ReportLab is only loaded once the first report is rendered
+            from agents.report_agent import generate_reports
+            result = generate_reports(state)
+            if result.get("report_path"):
+                self._update(job_id, status="done", report_path=result["report_path"],
+                             report_files=result.get("report_files", []))
+            else:
+                self._update(job_id, status="error", error=result.get("summary", "Report generation failed"))
+        except Exception as e:
+            self._update(job_id, status="error", error=str(e))
+        finally:
+            self._update(job_id, finished_at=time.time())
+            self._capacity.release()
+            self._done_events.pop(job_id).set()
+
+    def submit(self, state: Dict[str, Any]) -> str:
+        """Queue a report for rendering; the job is rejected when the queue is full"""
+        job_id = uuid.uuid4().hex
+        job = {"job_id": job_id, "status": "queued", "report_path": "", "report_files": [], "error": "",
+               "submitted_at": time.time()}
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > REPORT_JOB_HISTORY:
+                oldest = next(iter(self._jobs.values()))
+                if oldest["status"] in ("queued", "running"):
+                    break
+                self._jobs.popitem(last=False)
+
+        if not self._capacity.acquire(blocking=False):
+            self._update(job_id, status="rejected", error="Report queue is full, please retry shortly")
+            return job_id
+
+        self._done_events[job_id] = threading.Event()
+        self._executor.submit(self._run, job_id, dict(state))
+        return job_id
+
+    def status(self, job_id: Optional[str]) -> Dict[str, Any]:
+        """Snapshot of a job: queued, running, done, error, rejected or unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id or "")
+            return dict(job) if job else {"job_id": job_id, "status": "unknown", "report_path": "", "report_files": [], "error": ""}
+
+    def position(self, job_id: Optional[str]) -> int:
+        """1-based place among jobs waiting for a worker, or 0 once the job is running or finished"""
+        with self._lock:
+            job = self._jobs.get(job_id or "")
+            if job is None or job["status"] != "queued":
+                return 0
+            ahead = 0
+            for other_id, other in self._jobs.items():
+                if other_id == job_id:
+                    return ahead + 1
+                if other["status"] == "queued":
+                    ahead += 1
+            return 0
+
+    def wait(self, job_id: Optional[str], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Block until a job finishes (or the timeout passes) and return its status"""
+        event = self._done_events.get(job_id or "")
+        if event is not None:
+            event.wait(timeout)
+        return self.status(job_id)
+
+# Shared queue used by the report node
+report_queue = ReportJobQueue()
+
+def queue_pdf_report(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Report node that hands rendering (PDF and any other requested formats) to the background queue and returns immediately"""
+    job_id = report_queue.submit(state)
+    return {"report_job_id": job_id, "report_path": ""}
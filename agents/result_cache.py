@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional
+from agents.data_index import normalize_key
+
+# How long each agent's data stays fresh, in seconds; override with e.g. WEB_CACHE_TTL=60
+AGENT_TTL_SECONDS = {
+    "iqvia": 6 * 3600,
+    "exim": 6 * 3600,
+    "patent": 24 * 3600,
+    "clinical": 6 * 3600,
+    "internal": 24 * 3600,
+    "web": 15 * 60
+}
+
+# Maximum number of cached query results (0 disables the cache)
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "256"))
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL and hit/miss counters"""
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float):
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def replace(self, key: str, value: Any):
+        """Swap in a new value for a live entry, keeping its expiry; cached values are never mutated"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], value)
+
+    def discard(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+def agent_ttl(agent: str) -> float:
+    """Freshness budget for one agent's output"""
+    return float(os.environ.get(f"{agent.upper()}_CACHE_TTL", AGENT_TTL_SECONDS.get(agent, 3600)))
+
+def result_ttl(subtasks: List[str]) -> float:
+    """A combined result is only as fresh as its shortest-lived agent"""
+    return min((agent_ttl(task) for task in subtasks), default=agent_ttl("report"))
+
+def has_failures(result: Dict[str, Any]) -> bool:
+    """True when any agent in the result failed or timed out; such results are not cached"""
+    return any(
+        isinstance(result.get(task), Mapping) and result[task].get("status") == "error"
+        for task in result.get("subtasks", [])
+    )
+
+# (path, mtime_ns, size) -> digest, so unchanged files are hashed only once
+_digest_memo: "OrderedDict[tuple, str]" = OrderedDict()
+_digest_lock = threading.Lock()
+_DIGEST_MEMO_SIZE = 1024
+
+def file_digest(path: Optional[str]) -> str:
+    """SHA-256 of a file's bytes, or an empty string when there is no file"""
+    if not path or not os.path.exists(path):
+        return ""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _digest_lock:
+        if memo_key in _digest_memo:
+            _digest_memo.move_to_end(memo_key)
+            return _digest_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    with _digest_lock:
+        _digest_memo[memo_key] = digest.hexdigest()
+        while len(_digest_memo) > _DIGEST_MEMO_SIZE:
+            _digest_memo.popitem(last=False)
+    return digest.hexdigest()
+
+# Agents whose output depends on the query text, not just the recognized entities
+QUERY_DEPENDENT_AGENTS = {"web", "internal"}
+
+def query_dependent(parsed: Dict[str, Any]) -> bool:
+    """True when a cached result for this parse may only be reused for the same query text"""
+    from agents.query_parser import QueryParser
+    return not parsed.get("entities") or bool(QUERY_DEPENDENT_AGENTS & set(QueryParser.decompose_query(parsed)))
+
+def query_cache_key(parsed: Dict[str, Any], uploaded_file_path: Optional[str] = None,
+                    report_formats: Optional[List[str]] = None) -> str:
+    """Cache key from the normalized parse of a query, the uploaded document's hash and the report formats"""
+    normalized = {
+        "molecule": (parsed.get("molecule") or "").lower(),
+        "disease": (parsed.get("disease") or "").lower(),
+        "therapy_area": (parsed.get("therapy_area") or "").lower(),
+        "query_type": parsed.get("query_type") or "",
+        "analysis_scope": parsed.get("analysis_scope") or "",
+        "launch_date": parsed.get("launch_date") or "",
+        "expiry_horizon_months": parsed.get("expiry_horizon_months") or 0,
+        "trial_phase": parsed.get("trial_phase") or 0,
+        "trial_status": parsed.get("trial_status") or "",
+        "entities": sorted({f"{e['type']}:{e['value']}" for e in parsed.get("entities", [])}),
+        # Without recognized entities the molecule is guessed from the raw words, and the
+        # web and internal agents search with the query text, so in those cases only
+        # identical (normalized) queries may share a result
+        "query": normalize_key(parsed.get("original_query", "")) if query_dependent(parsed) else "",
+        "file": file_digest(uploaded_file_path),
+        "formats": sorted(report_formats or [])
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+# Shared cache of full pipeline results, in front of the LangGraph app
+query_cache = ResultCache()
@@ -0,0 +1,70 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+_MISSING = object()
+
+class AgentResult(Mapping):
+    """Read-only output of one worker agent.
+
+    Behaves like the {"status", "data", "summary", ...} dict agents used to
+    return, but stores the common fields in slots and is never mutated, so
+    one instance can be shared between requests without copying.
+    """
+
+    __slots__ = ("status", "summary", "_data", "_extra")
+
+    def __init__(self, status: str = "success", summary: str = "", data: Any = _MISSING, **extra: Any):
+        self.status = status
+        self.summary = summary
+        self._data = data
+        # Agent-specific fields (analytics, fto, trials, ...); None when there are none
+        self._extra: Optional[Dict[str, Any]] = extra or None
+
+    @property
+    def data(self) -> Any:
+        return None if self._data is _MISSING else self._data
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "status":
+            return self.status
+        if key == "summary":
+            return self.summary
+        if key == "data" and self._data is not _MISSING:
+            return self._data
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield "status"
+        if self._data is not _MISSING:
+            yield "data"
+        yield "summary"
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return 2 + (self._data is not _MISSING) + len(self._extra or ())
+
+    def __repr__(self) -> str:
+        return f"AgentResult({dict(self)!r})"
+
+    def __reduce__(self):
+        # Slots plus a sentinel default need an explicit recipe for pickling (process pools, caches)
+        return (_restore, (self.status, self.summary, self._data is not _MISSING, self._data, self._extra or {}))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self)
+
+def _restore(status: str, summary: str, has_data: bool, data: Any, extra: Dict[str, Any]) -> AgentResult:
+    return AgentResult(status, summary, data if has_data else _MISSING, **extra)
+
+def agent_error(summary: str) -> AgentResult:
+    """Output for an agent that failed, timed out or could not run"""
+    return AgentResult("error", summary, {})
+
+def json_default(value: Any) -> Any:
+    """json.dumps default= that writes agent results as objects and anything else as a string"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
@@ -0,0 +1,120 @@
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+from agents.data_index import normalize_key
+from agents.result_cache import file_digest
+from agents.results import agent_error
+from agents.tracing import annotate
+
+# State fields each agent reads; queries that agree on these share one lookup of that agent.
+# The web and internal agents search with the query text itself, so it is part of their key,
+# and uploads are compared by content, so re-uploads of one file share a lookup.
+LOOKUP_FIELDS = {
+    "iqvia": ["molecule", "therapy_area", "disease", "geography", "analysis_scope"],
+    "exim": ["api_name", "molecule", "analysis_scope"],
+    "patent": ["molecule", "therapy_area", "launch_date", "expiry_horizon_months"],
+    "clinical": ["molecule", "disease", "therapy_area", "trial_phase", "trial_status"],
+    "internal": ["uploaded_file_path", "molecule", "disease", "therapy_area", "query"],
+    "web": ["query", "molecule", "disease", "therapy_area"]
+}
+
+# Free-text fields compared case- and punctuation-insensitively
+TEXT_FIELDS = {"query", "molecule", "disease", "therapy_area", "geography", "api_name"}
+
+def lookup_key(task: str, state: Dict[str, Any]) -> Tuple:
+    """Queries that resolve to the same entities share one lookup per agent"""
+    fields = LOOKUP_FIELDS.get(task) or sorted({f for agent_fields in LOOKUP_FIELDS.values() for f in agent_fields})
+    key = (task,) + tuple(
+        normalize_key(state.get(field)) if field in TEXT_FIELDS
+        else file_digest(state.get(field)) if field == "uploaded_file_path"
+        else state.get(field) or ""
+        for field in fields
+    )
+    # Without recognized entities agents fall back to the raw query text
+    if "query" not in fields and not state.get("entities"):
+        key += (normalize_key(state.get("query")),)
+    return key
+
+class WaitTimeout(TimeoutError):
+    """Raised to a caller that gave up waiting on another caller's run"""
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """Runs one computation per key at a time; callers arriving while it runs wait for its result"""
+
+    def __init__(self):
+        self._calls: Dict[Tuple, _Call] = {}
+        self._lock = threading.Lock()
+        # task -> {"leaders": n, "followers": n}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def do(self, key: Tuple, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """(result, shared): shared is True when the result came from another caller's run.
+
+        A caller waiting on another's run gives up after `timeout` seconds with
+        WaitTimeout; the run itself carries on for its own caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            counts = self._stats.setdefault(key[0], {"leaders": 0, "followers": 0})
+            counts["leaders" if leader else "followers"] += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise WaitTimeout(f"waited {timeout:g}s for an identical run")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Forget the key first so callers arriving from now on start a fresh run
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {task: dict(counts) for task, counts in self._stats.items()}
+
+# Shared by every worker node, so concurrent requests for the same entities run each agent once
+agent_flights = SingleFlight()
+
+def single_flight(task: str, node: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Wrap a worker node so identical concurrent calls share one run of the agent.
+
+    Only the agent's own output is shared, and agent outputs are read-only
+    AgentResults, so every caller receives the same instance without a copy.
+    """
+    def run(state: Dict[str, Any]) -> Dict[str, Any]:
+        from agents.master_agent import agent_timeout
+        timeout = agent_timeout(task)
+        try:
+            output, shared = agent_flights.do(lookup_key(task, state), lambda: node(state).get(task, {}), timeout)
+        except WaitTimeout:
+            # A hung leader must not hold its followers' workers forever
+            annotate(single_flight="follower")
+            return {task: agent_error(f"{task} agent timed out after {timeout:g}s")}
+        annotate(single_flight="follower" if shared else "leader")
+        return {task: output}
+
+    run.__name__ = getattr(node, "__name__", task)
+    return run
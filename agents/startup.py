@@ -0,0 +1,83 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+# Allow running as `python agents/startup.py` as well as `python -m agents.startup`
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+def import_times(target: str = "app") -> List[Dict[str, Any]]:
+    """Per-module import cost of `import <target>` in a fresh interpreter (python -X importtime)"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=parent_dir, capture_output=True, text=True,
+        # Skip side effects that are not part of importing, e.g. the metrics server
+        env={**os.environ, "METRICS_PORT": "", "DATA_HOT_RELOAD": ""}
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{completed.stderr[-2000:]}")
+
+    records = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time:   self_us |   cumulative_us |   <indent>module"
+        prefix, cumulative_us, name = line.split("|", 2)
+        self_us = prefix.split(":", 1)[1]
+        records.append({
+            "module": name.strip(),
+            # Two spaces of indentation per level of nesting
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000
+        })
+    return records
+
+def by_package(records: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Import time per top-level package; self times add up to the total exactly"""
+    totals: Dict[str, float] = {}
+    for record in records:
+        package = record["module"].split(".")[0]
+        totals[package] = totals.get(package, 0.0) + record["self_ms"]
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+def report(target: str = "app", top: int = 15) -> str:
+    """Text breakdown of where `import <target>` spends its time"""
+    records = import_times(target)
+    total = sum(r["self_ms"] for r in records)
+    lines = [f"import {target}: {total:.0f} ms across {len(records)} modules", "", "By package:"]
+    for package, ms in list(by_package(records).items())[:top]:
+        lines.append(f"  {package:<36} {ms:>8.1f} ms  {ms / total * 100 if total else 0:5.1f}%")
+    lines += ["", f"Imported while executing {target} (cumulative):"]
+    direct = [r for r in records if r["depth"] == 1 or r["module"] == target]
+    for record in sorted(direct, key=lambda r: r["cumulative_ms"], reverse=True)[:top]:
+        lines.append(f"  {record['module']:<36} {record['cumulative_ms']:>8.1f} ms")
+    return "\n".join(lines)
+
+class StartupTimer:
+    """Wall-clock milestones of one process start (imports done, UI built, graph warm, ...)"""
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = time.perf_counter() if started is None else started
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, name: str) -> float:
+        self.marks[name] = round((time.perf_counter() - self.started) * 1000, 1)
+        return self.marks[name]
+
+    def summary(self) -> str:
+        return ", ".join(f"{name} {ms:.0f}ms" for name, ms in self.marks.items())
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Break down the import time of the app (or any module)")
+    parser.add_argument("target", nargs="?", default="app", help="module to import, e.g. app or agents.master_agent")
+    parser.add_argument("--top", type=int, default=15, help="rows per table")
+    args = parser.parse_args(argv)
+    print(report(args.target, args.top))
+
+if __name__ == "__main__":
+    main()
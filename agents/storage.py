@@ -0,0 +1,322 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Where reports are written
+REPORTS_DIR = os.environ.get("REPORTS_DIR", "reports")
+
+# Reports the store rendered, one JSON line per content key, kept next to the reports.
+# Only files listed here are ever deleted; anything else in the directory is left alone.
+MANIFEST_NAME = ".report_manifest.jsonl"
+
+# Total size of managed reports before the least recently used ones are deleted
+REPORT_STORAGE_MAX_BYTES = int(os.environ.get("REPORT_STORAGE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Reports not downloaded or reused for this long are deleted (0 keeps them until the size quota applies)
+REPORT_MAX_AGE_HOURS = float(os.environ.get("REPORT_MAX_AGE_HOURS", "168"))
+
+# Uploaded documents live in Gradio's cache, which expires them after this long; UPLOAD_DIR is only measured
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "uploads")
+UPLOAD_MAX_AGE_HOURS = float(os.environ.get("UPLOAD_MAX_AGE_HOURS", "24"))
+
+# Seconds between background sweeps (0 disables the sweeper)
+STORAGE_SWEEP_SECONDS = float(os.environ.get("STORAGE_SWEEP_SECONDS", "600"))
+
+# Files younger than this are never evicted, so a report is not removed before the UI serves it
+STORAGE_GRACE_SECONDS = 300
+
+# Reports remembered for deduplication; past this the least recently used are deleted
+STORAGE_INDEX_SIZE = 10000
+
+def _scan(directory: str) -> List[os.DirEntry]:
+    try:
+        with os.scandir(directory) as entries:
+            return [e for e in entries if e.is_file(follow_symlinks=False)]
+    except FileNotFoundError:
+        return []
+
+def _remove(path: str) -> int:
+    """Delete a file and return the bytes freed (0 if it was already gone)"""
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+    except FileNotFoundError:
+        return 0
+
+def _stat(paths: List[str]) -> Optional[Tuple[float, int]]:
+    """(latest mtime, total size) of a report's files, or None when any of them is gone"""
+    try:
+        stats = [os.stat(path) for path in paths]
+    except FileNotFoundError:
+        return None
+    return max(st.st_mtime for st in stats), sum(st.st_size for st in stats)
+
+class ReportStore:
+    """Deduplicates reports by content key and keeps the reports the app rendered within quota.
+
+    Every report is registered in a manifest next to the reports, and only
+    registered files are ever evicted, so files committed to the repository,
+    batch output and anything else placed in the directory are never touched.
+    Reuse refreshes a file's mtime, so eviction by oldest mtime is least
+    recently used, as in the internal document cache.
+    """
+
+    def __init__(self, reports_dir: str = REPORTS_DIR, max_bytes: int = REPORT_STORAGE_MAX_BYTES,
+                 max_age_hours: float = REPORT_MAX_AGE_HOURS, upload_dir: str = UPLOAD_DIR):
+        self.reports_dir = reports_dir
+        self.manifest_path = os.path.join(reports_dir, MANIFEST_NAME)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_hours * 3600
+        self.upload_dir = upload_dir
+        # content key -> files of one rendered report (every requested format), least recently used first
+        self._index: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._report_bytes: Optional[int] = None
+        self._usage = {"report_files": 0, "upload_files": 0, "upload_bytes": 0, "last_sweep": 0.0}
+        self._counters = {"stored": 0, "dedup_hits": 0, "duplicates_removed": 0, "evicted_age": 0,
+                          "evicted_quota": 0, "evicted_bytes": 0}
+        self._stop_sweeper = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        self._seeding = False
+
+    def _count(self, name: str, n: int = 1):
+        self._counters[name] += n
+
+    def _load(self):
+        """Read the manifest once; later lines for the same key win. Call with the lock held."""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.manifest_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        key, names = record["key"], record["files"]
+                    except (ValueError, KeyError, TypeError):
+                        # A line cut short by a crash; the rest of the manifest is still good
+                        continue
+                    self._index.pop(key, None)
+                    self._index[key] = [os.path.join(self.reports_dir, name) for name in names]
+        except FileNotFoundError:
+            pass
+
+    def _append(self, key: str, paths: List[str]):
+        os.makedirs(self.reports_dir, exist_ok=True)
+        names = [os.path.relpath(path, self.reports_dir) for path in paths]
+        with open(self.manifest_path, "a") as f:
+            f.write(json.dumps({"key": key, "files": names}) + "\n")
+
+    def _rewrite(self):
+        """Compact the manifest to the reports still registered"""
+        if not self._index and not os.path.exists(self.manifest_path):
+            return
+        os.makedirs(self.reports_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            for key, paths in self._index.items():
+                f.write(json.dumps({"key": key, "files": [os.path.relpath(p, self.reports_dir) for p in paths]}) + "\n")
+        os.replace(tmp_path, self.manifest_path)
+
+    def _manages(self, path: str) -> bool:
+        # Only reports written directly into the reports directory are registered
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.reports_dir)
+
+    def lookup(self, key: str) -> Optional[List[str]]:
+        """Files of an identical report rendered earlier, or None when any of them is gone"""
+        with self._lock:
+            self._load()
+            paths = self._index.get(key)
+            if paths is None:
+                return None
+            try:
+                for path in paths:
+                    # Mark as recently used for eviction
+                    os.utime(path)
+            except FileNotFoundError:
+                # Files deleted by hand; the manifest is compacted at the next sweep
+                del self._index[key]
+                return None
+            self._index.move_to_end(key)
+            self._count("dedup_hits")
+            return list(paths)
+
+    def add(self, key: str, paths: List[str]) -> List[str]:
+        """Register a freshly rendered report and return the paths to serve.
+
+        When an identical report finished first (two requests rendering the same
+        content at once), the new copies are deleted and the earlier files returned.
+        Files outside the reports directory are served but never registered.
+        """
+        existing = self.lookup(key)
+        if existing is not None:
+            with self._lock:
+                for path in paths:
+                    if path not in existing:
+                        _remove(path)
+                        self._count("duplicates_removed")
+            return existing
+        if not all(self._manages(path) for path in paths):
+            return list(paths)
+
+        size = sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+        with self._lock:
+            self._load()
+            self._index[key] = list(paths)
+            self._append(key, paths)
+            self._count("stored")
+            if self._report_bytes is None:
+                # Usage is unknown until the first sweep, which is left to the background
+                self._seed_usage()
+                over_quota = len(self._index) > STORAGE_INDEX_SIZE
+            else:
+                self._report_bytes += size
+                over_quota = len(self._index) > STORAGE_INDEX_SIZE or self._report_bytes > self.max_bytes
+        if over_quota:
+            self.sweep()
+        return list(paths)
+
+    def _seed_usage(self):
+        """Start a one-off background sweep to measure usage, unless the sweeper will. Call with the lock held."""
+        if self._sweeper is not None or self._seeding:
+            return
+        self._seeding = True
+
+        def run():
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Storage sweep failed: {str(e)}")
+            finally:
+                self._seeding = False
+
+        threading.Thread(target=run, name="storage-seed", daemon=True).start()
+
+    def clear(self):
+        """Delete every registered report, so the next request for each renders it again"""
+        with self._lock:
+            self._load()
+            for paths in self._index.values():
+                for path in paths:
+                    _remove(path)
+            self._index.clear()
+            self._report_bytes = 0
+            self._rewrite()
+
+    def sweep(self) -> Dict[str, int]:
+        """Delete expired reports, then least recently used reports until under quota"""
+        now = time.time()
+        removed = {"evicted_age": 0, "evicted_quota": 0, "bytes": 0}
+        with self._lock:
+            self._load()
+            entries = []
+            for key, paths in self._index.items():
+                stat = _stat(paths)
+                # Reports whose files were deleted by hand are forgotten
+                if stat is not None:
+                    entries.append((stat[0], stat[1], key))
+            # Oldest (least recently used) first
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            count = len(entries)
+            kept: "OrderedDict[str, List[str]]" = OrderedDict()
+            for mtime, size, key in entries:
+                age = now - mtime
+                if age < STORAGE_GRACE_SECONDS:
+                    reason = None
+                elif self.max_age_seconds > 0 and age > self.max_age_seconds:
+                    reason = "evicted_age"
+                elif total > self.max_bytes or count > STORAGE_INDEX_SIZE:
+                    reason = "evicted_quota"
+                else:
+                    reason = None
+                if reason is None:
+                    kept[key] = self._index[key]
+                    continue
+                for path in self._index[key]:
+                    removed["bytes"] += _remove(path)
+                    removed[reason] += 1
+                total -= size
+                count -= 1
+            self._index = kept
+            self._rewrite()
+
+            upload_files = upload_bytes = 0
+            for entry in _scan(self.upload_dir):
+                upload_files += 1
+                upload_bytes += entry.stat().st_size
+
+            self._report_bytes = total
+            self._usage.update(report_files=sum(len(paths) for paths in kept.values()),
+                               upload_files=upload_files, upload_bytes=upload_bytes, last_sweep=now)
+            for name in ("evicted_age", "evicted_quota"):
+                self._count(name, removed[name])
+            self._count("evicted_bytes", removed["bytes"])
+        return removed
+
+    def usage(self) -> Dict[str, Any]:
+        """Disk usage as of the last sweep plus reports stored since, and lifetime counters"""
+        if self._report_bytes is None:
+            self.sweep()
+        with self._lock:
+            return {
+                "report_bytes": self._report_bytes,
+                "max_bytes": self.max_bytes,
+                "indexed_reports": len(self._index),
+                **self._usage,
+                **self._counters
+            }
+
+    def metrics_lines(self) -> List[str]:
+        """Prometheus lines for the /metrics endpoint"""
+        usage = self.usage()
+        return [
+            "# HELP pharma_storage_bytes Bytes on disk by area",
+            "# TYPE pharma_storage_bytes gauge",
+            f'pharma_storage_bytes{{area="reports"}} {usage["report_bytes"]}',
+            f'pharma_storage_bytes{{area="uploads"}} {usage["upload_bytes"]}',
+            "# HELP pharma_storage_files Managed report files and files in the uploads directory, as of the last sweep",
+            "# TYPE pharma_storage_files gauge",
+            f'pharma_storage_files{{area="reports"}} {usage["report_files"]}',
+            f'pharma_storage_files{{area="uploads"}} {usage["upload_files"]}',
+            "# HELP pharma_storage_dedup_hits_total Reports served from an identical earlier render",
+            "# TYPE pharma_storage_dedup_hits_total counter",
+            f'pharma_storage_dedup_hits_total {usage["dedup_hits"]}',
+            "# HELP pharma_storage_removed_files_total Files deleted by the storage manager",
+            "# TYPE pharma_storage_removed_files_total counter",
+            f'pharma_storage_removed_files_total{{reason="age"}} {usage["evicted_age"]}',
+            f'pharma_storage_removed_files_total{{reason="quota"}} {usage["evicted_quota"]}',
+            f'pharma_storage_removed_files_total{{reason="duplicate"}} {usage["duplicates_removed"]}'
+        ]
+
+    def start_sweeper(self, interval: float = STORAGE_SWEEP_SECONDS):
+        """Sweep in the background every `interval` seconds"""
+        if interval <= 0 or self._sweeper is not None:
+            return
+        self._stop_sweeper.clear()
+
+        def run():
+            while True:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Storage sweep failed: {str(e)}")
+                if self._stop_sweeper.wait(interval):
+                    break
+
+        self._sweeper = threading.Thread(target=run, name="storage-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop_sweeper.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+        self._sweeper = None
+
+# Shared by the report node, the batch CLI and the app's sweeper
+report_store = ReportStore()
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# Allow running as `python agents/stub_server.py` as well as `python -m agents.stub_server`
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from agents.data_index import lookup
+from agents.data_store import DATA_DIR, dataset_cache
+
+def _data_dir() -> str:
+    # The shared cache reads MOCK_DATA_DIR unless a directory was set on it
+    return dataset_cache.data_dir or DATA_DIR
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Serves the mock datasets the way a data API would:
+
+    GET /datasets                        -> list of dataset names
+    GET /datasets/<name>                 -> the whole dataset
+    GET /datasets/<name>/lookup?q=a&q=b  -> {"key", "record"} for the first matching candidate
+    """
+
+    # Keep-alive, so pooled client connections are reused
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    fail_rate = 0.0
+
+    def _send_json(self, status: int, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        url = urlsplit(self.path)
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        if parts == ["datasets"]:
+            names = sorted(f for f in os.listdir(_data_dir()) if f.endswith(".json"))
+            self._send_json(200, names)
+            return
+        if len(parts) not in (2, 3) or parts[0] != "datasets" or (len(parts) == 3 and parts[2] != "lookup"):
+            self._send_json(404, {"error": f"Unknown path: {url.path}"})
+            return
+
+        name = os.path.basename(parts[1])
+        try:
+            if len(parts) == 2:
+                self._send_json(200, dataset_cache.get(name))
+            else:
+                key, record = lookup(name, *parse_qs(url.query).get("q", []))
+                self._send_json(200, {"key": key, "record": record})
+        except FileNotFoundError:
+            self._send_json(404, {"error": f"Unknown dataset: {name}"})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(port: int, host: str = "127.0.0.1", latency_ms: float = 0.0,
+                      fail_rate: float = 0.0) -> ThreadingHTTPServer:
+    """Serve the mock datasets on a background thread, optionally with added latency and 503s"""
+    handler = type("StubHandler", (_StubHandler,), {"latency": latency_ms / 1000, "fail_rate": fail_rate})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    return server
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve the mock datasets over HTTP for DATA_CONNECTOR=http")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args(argv)
+
+    server = start_stub_server(args.port, args.host, args.latency_ms, args.fail_rate)
+    print(f"Serving {_data_dir()} at http://{args.host}:{args.port}/datasets")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Mapping
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from agents.data_index import normalize_key
+from agents.results import json_default
+
+# Log every finished span as one JSON line on the "agents.tracing" logger
+TRACE_LOG = os.environ.get("TRACE_LOG", "").lower() in ("1", "true", "yes")
+
+# Copy the request's spans into the returned state under "trace"
+TRACE_IN_STATE = os.environ.get("TRACE_IN_STATE", "").lower() in ("1", "true", "yes")
+
+# Recent traces kept in memory, by trace ID
+TRACE_HISTORY = int(os.environ.get("TRACE_HISTORY", "256"))
+
+# Upper bounds, in seconds, of the node latency histogram buckets
+LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+logger = logging.getLogger("agents.tracing")
+
+# Payload sizes cost a JSON encode of every node update, so they are only
+# measured when something reads them: span logs or the /metrics endpoint
+_measure_payloads = TRACE_LOG
+
+# Span of the node running in the current context, so agents can annotate it
+_current_span: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("current_span", default=None)
+
+class Metrics:
+    """Per-node counters and latency histograms, rendered in Prometheus text format"""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._calls: Dict[tuple, int] = {}
+        self._cache: Dict[tuple, int] = {}
+        self._single_flight: Dict[tuple, int] = {}
+        self._payload_bytes: Dict[str, int] = {}
+        self._latency: Dict[str, List[int]] = {}
+        self._latency_sum: Dict[str, float] = {}
+        # Other components' metrics, as callables returning Prometheus text lines
+        self._collectors: List[Callable[[], List[str]]] = []
+        self._lock = threading.Lock()
+
+    def add_collector(self, collect: Callable[[], List[str]]):
+        with self._lock:
+            if collect not in self._collectors:
+                self._collectors.append(collect)
+
+    def observe(self, span: Dict[str, Any]):
+        node = span["node"]
+        seconds = span["duration_ms"] / 1000
+        with self._lock:
+            key = (node, span["status"])
+            self._calls[key] = self._calls.get(key, 0) + 1
+            if span.get("cache"):
+                key = (node, span["cache"])
+                self._cache[key] = self._cache.get(key, 0) + 1
+            if span.get("single_flight"):
+                key = (node, span["single_flight"])
+                self._single_flight[key] = self._single_flight.get(key, 0) + 1
+            self._payload_bytes[node] = self._payload_bytes.get(node, 0) + span.get("payload_bytes", 0)
+            counts = self._latency.setdefault(node, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._latency_sum[node] = self._latency_sum.get(node, 0.0) + seconds
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP pharma_node_calls_total Node executions by status",
+                "# TYPE pharma_node_calls_total counter"
+            ]
+            for (node, status), count in sorted(self._calls.items()):
+                lines.append(f'pharma_node_calls_total{{node="{node}",status="{status}"}} {count}')
+            lines += [
+                "# HELP pharma_node_cache_total Cache lookups made by a node",
+                "# TYPE pharma_node_cache_total counter"
+            ]
+            for (node, result), count in sorted(self._cache.items()):
+                lines.append(f'pharma_node_cache_total{{node="{node}",result="{result}"}} {count}')
+            lines += [
+                "# HELP pharma_node_single_flight_total Agent calls that ran (leader) or joined an identical in-flight run (follower)",
+                "# TYPE pharma_node_single_flight_total counter"
+            ]
+            for (node, role), count in sorted(self._single_flight.items()):
+                lines.append(f'pharma_node_single_flight_total{{node="{node}",role="{role}"}} {count}')
+            lines += [
+                "# HELP pharma_node_payload_bytes_total Bytes of state written by a node",
+                "# TYPE pharma_node_payload_bytes_total counter"
+            ]
+            for node, total in sorted(self._payload_bytes.items()):
+                lines.append(f'pharma_node_payload_bytes_total{{node="{node}"}} {total}')
+            lines += [
+                "# HELP pharma_node_duration_seconds Node latency",
+                "# TYPE pharma_node_duration_seconds histogram"
+            ]
+            for node, counts in sorted(self._latency.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f'pharma_node_duration_seconds_bucket{{node="{node}",le="{bound:g}"}} {count}')
+                lines.append(f'pharma_node_duration_seconds_bucket{{node="{node}",le="+Inf"}} {counts[-1]}')
+                lines.append(f'pharma_node_duration_seconds_sum{{node="{node}"}} {self._latency_sum[node]:.6f}')
+                lines.append(f'pharma_node_duration_seconds_count{{node="{node}"}} {counts[-1]}')
+            collectors = list(self._collectors)
+        for collect in collectors:
+            lines += collect()
+        return "\n".join(lines) + "\n"
+
+# Shared metrics registry for every traced node
+metrics = Metrics()
+
+_traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_traces_lock = threading.Lock()
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+def get_trace(trace_id: Optional[str]) -> List[Dict[str, Any]]:
+    """Spans recorded so far for one request"""
+    with _traces_lock:
+        return [dict(span) for span in _traces.get(trace_id or "", [])]
+
+def input_key(state: Dict[str, Any]) -> str:
+    """Normalized entities a node works from, or the query when none were recognized"""
+    parts = [normalize_key(state.get(field)) for field in ("molecule", "disease", "therapy_area")]
+    if any(parts):
+        return "|".join(parts)
+    return normalize_key(state.get("query"))
+
+def annotate(**fields):
+    """Attach details (e.g. cache="hit") to the span of the node currently running"""
+    span = _current_span.get()
+    if span is not None:
+        span.update(fields)
+
+def record_span(span: Dict[str, Any]):
+    """Store a finished span, update the metrics and emit it as a JSON log line"""
+    with _traces_lock:
+        _traces.setdefault(span["trace_id"], []).append(span)
+        _traces.move_to_end(span["trace_id"])
+        while len(_traces) > TRACE_HISTORY:
+            _traces.popitem(last=False)
+    metrics.observe(span)
+    if TRACE_LOG:
+        logger.info(json.dumps(span, default=str))
+
+def _payload_bytes(result: Any) -> int:
+    # Nodes return only the fields they write, so the whole update is the payload
+    if not isinstance(result, dict):
+        return 0
+    changed = {k: v for k, v in result.items() if k not in ("trace", "trace_id")}
+    return len(json.dumps(changed, default=json_default))
+
+def _status(name: str, result: Any) -> str:
+    # Agents report failures in their output rather than raising
+    output = result.get(name) if isinstance(result, dict) else None
+    if isinstance(output, Mapping) and output.get("status") == "error":
+        return "error"
+    return "success"
+
+def traced(name: str, node: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Wrap a graph node so every call records a span"""
+
+    def wrapper(state: Dict[str, Any]) -> Dict[str, Any]:
+        trace_id = state.get("trace_id") or new_trace_id()
+        parent = _current_span.get()
+        span = {
+            "trace_id": trace_id,
+            "span_id": uuid.uuid4().hex[:16],
+            "parent_id": parent["span_id"] if parent else None,
+            "node": name,
+            "input_key": input_key(state),
+            "start": time.time()
+        }
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            result = node(state)
+        except Exception as e:
+            span.update(status="error", error=f"{type(e).__name__}: {str(e)}")
+            raise
+        else:
+            span["status"] = _status(name, result)
+            if span["status"] == "error":
+                span["error"] = result[name].get("summary", "")
+            if _measure_payloads:
+                span["payload_bytes"] = _payload_bytes(result)
+        finally:
+            _current_span.reset(token)
+            span["end"] = time.time()
+            span["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            span.setdefault("payload_bytes", 0)
+            record_span(span)
+
+        if not isinstance(result, dict):
+            return result
+        # The first node assigns the trace ID; later nodes inherit it from the state
+        if not state.get("trace_id"):
+            result["trace_id"] = trace_id
+        # "trace" is a reducer field that starts out empty, so only the flag decides
+        if TRACE_IN_STATE:
+            result["trace"] = get_trace(trace_id)
+        return result
+
+    wrapper.__name__ = getattr(node, "__name__", name)
+    wrapper.__doc__ = node.__doc__
+    wrapper.__wrapped__ = node
+    return wrapper
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics on a background thread; binds to localhost only by default"""
+    global _measure_payloads
+    _measure_payloads = True
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
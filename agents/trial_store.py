@@ -0,0 +1,334 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from agents.data_index import normalize_key, resolve_key
+from agents.data_store import STAT_INTERVAL_SECONDS, dataset_cache
+from agents.query_parser import parse_phase
+
+CLINICAL_FILE = "clinical_mock.json"
+
+# SQLite copy of the clinical dataset, rebuilt when the JSON source or the entity vocabulary changes
+TRIAL_DB = os.environ.get("TRIAL_DB", os.path.join("cache", "clinical_trials.sqlite"))
+
+# Idle read-only connections kept open for reuse; busier moments open extra ones and close them afterwards
+TRIAL_DB_POOL_SIZE = int(os.environ.get("TRIAL_DB_POOL_SIZE", "8"))
+
+# Rows returned by a filtered query unless a limit is given
+TRIAL_QUERY_LIMIT = 50
+
+SCHEMA_VERSION = "1"
+
+# trial_conditions repeats the filter columns so condition queries are answered
+# from its covering index alone; trial_counts pre-aggregates the common counts
+SCHEMA = """
+CREATE TABLE trials (
+    id INTEGER PRIMARY KEY,
+    trial_id TEXT UNIQUE NOT NULL,
+    title TEXT,
+    phase INTEGER,
+    status TEXT,
+    sponsor TEXT,
+    sponsor_name TEXT,
+    completion_date TEXT
+);
+CREATE TABLE trial_conditions (
+    condition TEXT NOT NULL,
+    phase INTEGER,
+    status TEXT,
+    completion_date TEXT,
+    trial INTEGER NOT NULL
+);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Created after the bulk insert, which is much faster than maintaining them row by row
+INDEXES = """
+CREATE INDEX idx_conditions ON trial_conditions (condition, phase, status, completion_date, trial);
+CREATE INDEX idx_conditions_status ON trial_conditions (condition, status, completion_date, phase, trial);
+CREATE INDEX idx_conditions_completion ON trial_conditions (condition, completion_date, trial);
+CREATE INDEX idx_trials_phase ON trials (phase, status, completion_date);
+CREATE INDEX idx_trials_status ON trials (status, completion_date);
+CREATE INDEX idx_trials_sponsor ON trials (sponsor, phase, status);
+CREATE INDEX idx_trials_completion ON trials (completion_date);
+"""
+
+COUNTS = """
+CREATE TABLE trial_counts (
+    condition TEXT,
+    phase INTEGER,
+    status TEXT,
+    n INTEGER NOT NULL
+);
+INSERT INTO trial_counts
+    SELECT condition, phase, status, COUNT(*) FROM trial_conditions GROUP BY condition, phase, status
+    UNION ALL
+    SELECT NULL, phase, status, COUNT(*) FROM trials GROUP BY phase, status;
+CREATE INDEX idx_trial_counts ON trial_counts (condition, phase, status);
+CREATE TABLE sponsor_counts (
+    condition TEXT,
+    sponsor TEXT,
+    n INTEGER NOT NULL
+);
+INSERT INTO sponsor_counts
+    SELECT c.condition, t.sponsor_name, COUNT(*) FROM trial_conditions c JOIN trials t ON t.id = c.trial
+    GROUP BY c.condition, t.sponsor_name
+    UNION ALL
+    SELECT NULL, sponsor_name, COUNT(*) FROM trials GROUP BY sponsor_name;
+CREATE INDEX idx_sponsor_counts ON sponsor_counts (condition, n);
+"""
+
+def trials_from_dataset(data: Dict[str, Any]) -> Iterable[Tuple[Dict[str, Any], List[str]]]:
+    """(trial row, condition terms) for every trial listed under any molecule/therapy area"""
+    from agents.entity_extractor import get_extractor
+
+    extractor = get_extractor()
+    for group, record in data.items():
+        if not isinstance(record, dict):
+            continue
+        listed = [(t, "ongoing") for t in record.get("ongoing_trials") or []]
+        listed += [(t, "completed") for t in record.get("completed_trials") or []]
+        for trial, default_status in listed:
+            if not trial.get("trial_id"):
+                continue
+            title = trial.get("title", "")
+            # Trials are filed under their dataset key and every entity named in the title
+            conditions = {normalize_key(group)}
+            conditions.update(e["value"] for e in extractor.extract(title)
+                              if e["type"] in ("molecule", "disease", "therapy_area"))
+            yield {
+                "trial_id": trial["trial_id"],
+                "title": title,
+                "phase": parse_phase(trial.get("phase")),
+                "status": normalize_key(trial.get("status")) or default_status,
+                "sponsor": normalize_key(trial.get("sponsor")),
+                "sponsor_name": trial.get("sponsor", ""),
+                "completion_date": trial.get("completion_date") or None
+            }, sorted(conditions)
+
+def build_database(data: Dict[str, Any], path: str, signature: str):
+    """Write the trials into a fresh SQLite file and swap it into place"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        # trial_id -> ((row id, phase, status, completion date), conditions filed so far)
+        stored: Dict[str, Tuple[Tuple[int, Optional[int], str, Optional[str]], Set[str]]] = {}
+        for trial, conditions in trials_from_dataset(data):
+            if trial["trial_id"] not in stored:
+                row_id = conn.execute(
+                    "INSERT INTO trials (trial_id, title, phase, status, sponsor, sponsor_name, completion_date) "
+                    "VALUES (:trial_id, :title, :phase, :status, :sponsor, :sponsor_name, :completion_date)",
+                    trial
+                ).lastrowid
+                stored[trial["trial_id"]] = ((row_id, trial["phase"], trial["status"], trial["completion_date"]), set())
+            # A trial listed under several keys is stored once and filed under every condition
+            row, filed = stored[trial["trial_id"]]
+            new_conditions = [c for c in conditions if c not in filed]
+            filed.update(new_conditions)
+            conn.executemany("INSERT INTO trial_conditions VALUES (?, ?, ?, ?, ?)",
+                             [(condition, *row[1:], row[0]) for condition in new_conditions])
+        conn.executescript(INDEXES)
+        conn.executescript(COUNTS)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [("schema", SCHEMA_VERSION), ("source", signature)])
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+class TrialStore:
+    """Filtered queries and counts over clinical trials, served by SQLite secondary indexes"""
+
+    def __init__(self, path: str = TRIAL_DB, pool_size: int = TRIAL_DB_POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection from the pool for the duration of the block"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if not self._closed and len(self._idle) < self.pool_size:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close(self):
+        """Close idle connections; ones still borrowed are closed when they come back"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def meta(self, key: str) -> Optional[str]:
+        try:
+            with self._conn() as conn:
+                row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def has_condition(self, term: str) -> Optional[str]:
+        with self._conn() as conn:
+            row = conn.execute("SELECT 1 FROM trial_counts WHERE condition = ? LIMIT 1", (term,)).fetchone()
+        return term if row else None
+
+    def resolve_condition(self, *candidates: Any) -> Optional[str]:
+        """Condition term for the first candidate with trials, directly or through an alias"""
+        return resolve_key(self.has_condition, *candidates)
+
+    @staticmethod
+    def _where(rows: bool, condition: Optional[str] = None, phase: Optional[int] = None, sponsor: Optional[str] = None,
+               status: Optional[str] = None, completed_after: Optional[str] = None,
+               completed_before: Optional[str] = None) -> Tuple[str, List[Any]]:
+        """FROM/WHERE clauses; trials (t) is only joined when its rows or the sponsor column are needed"""
+        # Condition filters run against trial_conditions (c), everything else against trials (t)
+        table = "c" if condition else "t"
+        if not condition:
+            source = "trials t"
+        elif rows or sponsor:
+            source = "trial_conditions c JOIN trials t ON t.id = c.trial"
+        else:
+            source = "trial_conditions c"
+        clauses, params = [], []
+        if condition:
+            clauses.append("c.condition = ?")
+            params.append(normalize_key(condition))
+        if phase:
+            clauses.append(f"{table}.phase = ?")
+            params.append(phase)
+        if sponsor:
+            clauses.append("t.sponsor = ?")
+            params.append(normalize_key(sponsor))
+        if status:
+            clauses.append(f"{table}.status = ?")
+            params.append(normalize_key(status))
+        if completed_after:
+            clauses.append(f"{table}.completion_date >= ?")
+            params.append(completed_after)
+        if completed_before:
+            clauses.append(f"{table}.completion_date <= ?")
+            params.append(completed_before)
+        return source + ((" WHERE " + " AND ".join(clauses)) if clauses else ""), params
+
+    def query(self, limit: int = TRIAL_QUERY_LIMIT, **filters: Any) -> List[Dict[str, Any]]:
+        """Trials matching every given filter (condition, phase, sponsor, status, completed_after/before).
+
+        Rows come back in index order so the limit stops the scan early.
+        """
+        source, params = self._where(True, **filters)
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT t.trial_id, t.title, t.phase, t.status, t.sponsor_name AS sponsor, t.completion_date "
+                f"FROM {source} LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _count_table(self, group_by: Optional[str], top: Optional[int], condition: Optional[str] = None,
+                     phase: Optional[int] = None, status: Optional[str] = None) -> Any:
+        clauses = ["condition IS ?"]
+        params: List[Any] = [normalize_key(condition) if condition else None]
+        if phase:
+            clauses.append("phase = ?")
+            params.append(phase)
+        if status:
+            clauses.append("status = ?")
+            params.append(normalize_key(status))
+        where = " AND ".join(clauses)
+        limit = f" LIMIT {int(top)}" if top else ""
+        with self._conn() as conn:
+            if group_by is None:
+                return conn.execute(f"SELECT COALESCE(SUM(n), 0) FROM trial_counts WHERE {where}", params).fetchone()[0]
+            if group_by == "sponsor":
+                rows = conn.execute(f"SELECT sponsor, n FROM sponsor_counts WHERE condition IS ? ORDER BY n DESC{limit}", params)
+            else:
+                rows = conn.execute(
+                    f"SELECT {group_by}, SUM(n) AS total FROM trial_counts WHERE {where} GROUP BY {group_by} ORDER BY total DESC{limit}", params
+                )
+            return {row[0]: row[1] for row in rows}
+
+    def count(self, group_by: Optional[str] = None, top: Optional[int] = None, **filters: Any) -> Any:
+        """Number of matching trials, or {value: count} grouped by phase, status or sponsor (largest first)"""
+        if group_by not in (None, "phase", "status", "sponsor"):
+            raise ValueError(f"Cannot group trials by: {group_by}")
+        used = {k for k, v in filters.items() if v}
+        if used <= {"condition", "phase", "status"} and (group_by != "sponsor" or used <= {"condition"}):
+            # Answered from the pre-aggregated counts without touching individual trials
+            return self._count_table(group_by, top, **filters)
+
+        source, params = self._where(group_by == "sponsor", **filters)
+        limit = f" LIMIT {int(top)}" if top else ""
+        with self._conn() as conn:
+            if group_by is None:
+                return conn.execute(f"SELECT COUNT(*) FROM {source}", params).fetchone()[0]
+            column = "t.sponsor_name" if group_by == "sponsor" else f"{'c' if filters.get('condition') else 't'}.{group_by}"
+            rows = conn.execute(
+                f"SELECT {column}, COUNT(*) AS n FROM {source} GROUP BY {column} ORDER BY n DESC{limit}", params
+            )
+            return {row[0]: row[1] for row in rows}
+
+def source_signature() -> str:
+    """Version of every file the database is built from: the trials, plus the entity
+    dictionary and synonyms that file each trial under its conditions"""
+    from agents.entity_extractor import DICTIONARY_FILE, SYNONYMS_FILE
+    stat = os.stat(dataset_cache.path(CLINICAL_FILE))
+    parts = [f"{stat.st_mtime_ns}:{stat.st_size}"]
+    for name in (DICTIONARY_FILE, SYNONYMS_FILE):
+        try:
+            stat = os.stat(dataset_cache.path(name))
+            parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+        except FileNotFoundError:
+            # The extractor falls back to its built-in vocabulary
+            parts.append("-")
+    return "/".join(parts)
+
+_store: Optional[TrialStore] = None
+_store_signature: Optional[str] = None
+_store_checked_at = 0.0
+_store_lock = threading.Lock()
+
+def get_trial_store() -> TrialStore:
+    """Shared store, rebuilt only when the clinical dataset or the entity vocabulary changes"""
+    global _store, _store_signature, _store_checked_at
+    # Like the dataset cache, stat the source at most once per STAT_INTERVAL_SECONDS
+    now = time.monotonic()
+    if _store is not None and now - _store_checked_at < STAT_INTERVAL_SECONDS:
+        return _store
+
+    signature = source_signature()
+    if _store is not None and signature == _store_signature:
+        _store_checked_at = now
+        return _store
+
+    with _store_lock:
+        if _store is None or signature != _store_signature:
+            store = TrialStore(TRIAL_DB)
+            # A database built by an earlier run is reused as long as the source is unchanged
+            if not os.path.exists(TRIAL_DB) or store.meta("source") != signature or store.meta("schema") != SCHEMA_VERSION:
+                store.close()
+                build_database(dataset_cache.get(CLINICAL_FILE), TRIAL_DB, signature)
+                store = TrialStore(TRIAL_DB)
+            if _store is not None:
+                _store.close()
+            _store, _store_signature = store, signature
+        _store_checked_at = now
+    return _store
@@ -1,6 +1,6 @@
-import json
-import os
 from typing import Dict, Any
+from agents.connectors import lookup
+from agents.results import AgentResult
 
 def perform_web_search(state: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -13,15 +13,11 @@ def perform_web_search(state: Dict[str, Any]) -> Dict[str, Any]:
     
     search_key = query or molecule or disease or therapy_area
     
-    mock_file = os.path.join("mock_data", "web_search_mock.json")
-    
     try:
-        if os.path.exists(mock_file):
-            with open(mock_file, 'r') as f:
-                data = json.load(f)
-            result = data.get(search_key, {})
-        else:
-            result = {}
+        try:
+            _, result = lookup("web_search_mock.json", query, molecule, disease, therapy_area)
+        except FileNotFoundError:
+            result = None
         
         # Default structure if not found
         if not result:
@@ -69,4 +65,4 @@ def perform_web_search(state: Dict[str, Any]) -> Dict[str, Any]:
             "summary": f"Error performing web search: {str(e)}"
         }
     
-    return {**state, "web": output}
\ No newline at end of file
+    return {"web": AgentResult(**output)}
\ No newline at end of file
@@ -1,20 +1,114 @@
+import time
+_started = time.perf_counter()
+
 import gradio as gr
+import logging
 import os
 import sys
+import threading
+from collections.abc import Mapping
 from datetime import datetime
 
 # Add agents directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "agents"))
 
-from agents.master_agent import app as langgraph_app
+# Agent modules, LangGraph and ReportLab are imported on first use (or by the warm-up below)
+from agents.master_agent import get_app, warm_up
+from agents.admission import StageBusy, stages
+from agents.admission import metrics_lines as stage_metrics_lines
+from agents.startup import StartupTimer
+from agents.data_store import start_hot_reload
+from agents.exports import available_formats, resolve_formats
+from agents.query_parser import QueryParser
+from agents.result_cache import has_failures, query_cache, query_cache_key, result_ttl
+from agents.report_jobs import report_queue
+from agents.storage import STORAGE_SWEEP_SECONDS, UPLOAD_DIR, UPLOAD_MAX_AGE_HOURS, report_store
+from agents.tracing import TRACE_LOG, get_trace, input_key, metrics, new_trace_id, record_span, start_metrics_server
+
+startup = StartupTimer(_started)
+startup.mark("imports")
+
+# How long the UI waits for a background report before giving up on the download
+REPORT_WAIT_SECONDS = float(os.environ.get("REPORT_WAIT_SECONDS", "120"))
+
+# Requests the UI handles at once (cache hits and report waits included; graph runs are
+# limited separately by ANALYSIS_CONCURRENCY), and requests waiting in Gradio's queue
+# before new ones are turned away
+SERVE_CONCURRENCY = int(os.environ.get("SERVE_CONCURRENCY", "32"))
+SERVE_QUEUE_SIZE = int(os.environ.get("SERVE_QUEUE_SIZE", "200"))
+
+# Seconds between checks of a waiting request's place in line
+QUEUE_UPDATE_SECONDS = 1.0
+
+# Reload mock/data-source files in the background when they change on disk
+if os.environ.get("DATA_HOT_RELOAD", "").lower() in ("1", "true", "yes"):
+    start_hot_reload(float(os.environ.get("DATA_HOT_RELOAD_INTERVAL", "2.0")))
+
+# Structured JSON span logs go to stderr
+if TRACE_LOG:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+# Prometheus-style /metrics endpoint, served on localhost only
+if os.environ.get("METRICS_PORT"):
+    metrics.add_collector(report_store.metrics_lines)
+    metrics.add_collector(stage_metrics_lines)
+    start_metrics_server(int(os.environ["METRICS_PORT"]))
 
 # Create uploads directory
-os.makedirs("uploads", exist_ok=True)
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+def _report_available(result: dict) -> bool:
+    """A cached result is reusable while its reports exist or are still being rendered"""
+    if result.get("report_path"):
+        return all(os.path.exists(path) for path in result.get("report_files") or [result["report_path"]])
+    job = report_queue.status(result.get("report_job_id"))
+    if job["status"] == "done":
+        return all(os.path.exists(path) for path in job["report_files"] or [job["report_path"]])
+    return job["status"] in ("queued", "running")
 
-def run_agentic_ai(query: str, uploaded_file: gr.File = None):
-    """Main function to run the agentic AI pipeline"""
+def build_summary(result: dict) -> str:
+    """Combine each agent's summary into the text shown in the UI"""
+    summary_parts = []
+    
+    # Process each agent result
+    agents = [
+        ("iqvia", "Market Analysis"),
+        ("exim", "Trade Analysis"), 
+        ("patent", "Patent Analysis"),
+        ("clinical", "Clinical Trials"),
+        ("internal", "Internal Docs"),
+        ("web", "Web Intelligence")
+    ]
+    
+    for agent_key, agent_name in agents:
+        agent_data = result.get(agent_key, {})
+        if isinstance(agent_data, Mapping):
+            if "summary" in agent_data and agent_data["summary"]:
+                summary_text = agent_data["summary"]
+                if agent_key == "internal":
+                    summary_text = summary_text[:200] + "..." if len(summary_text) > 200 else summary_text
+                summary_parts.append(f"{agent_name}: {summary_text}")
+            elif "status" in agent_data:
+                summary_parts.append(f"{agent_name}: {agent_data['status'].title()}")
+            else:
+                summary_parts.append(f"{agent_name}: Completed")
+        else:
+            summary_parts.append(f"{agent_name}: Completed")
+    
+    # Combine summary
+    if summary_parts:
+        return "\n\n".join(summary_parts)
+    return "Analysis completed successfully."
+
+def run_agentic_ai(query: str, uploaded_file: gr.File = None, report_formats: list = None):
+    """Main function to run the agentic AI pipeline.
+    
+    Yields the agent summaries as soon as they are ready, then again with the
+    report files once the background renderer has finished them.
+    """
     if not query or query.strip() == "":
-        return "Please enter a research query to analyze.", None
+        yield "Please enter a research query to analyze.", None
+        return
         
     try:
         # Prepare state
@@ -25,8 +119,12 @@ def run_agentic_ai(query: str, uploaded_file: gr.File = None):
             "therapy_area": "",
             "query_type": "",
             "uploaded_file_path": None,
+            "report_formats": resolve_formats(report_formats),
             "subtasks": [],
+            "pending_tasks": [],
+            "current_task": "",
             "completed_tasks": [],
+            "task_timings": {},
             "iqvia": {},
             "exim": {},
             "patent": {},
@@ -34,71 +132,116 @@ def run_agentic_ai(query: str, uploaded_file: gr.File = None):
             "internal": {},
             "web": {},
             "report_path": "",
-            "summary": ""
+            "report_files": [],
+            "report_job_id": "",
+            "summary": "",
+            "trace_id": new_trace_id()
         }
         
         # Handle file upload
         if uploaded_file and hasattr(uploaded_file, 'name'):
             state["uploaded_file_path"] = uploaded_file.name
         
-        # Run the graph
-        print(f"Processing query: {query}")
-        result = langgraph_app.invoke(state)
-        print(f"Analysis completed. Result keys: {list(result.keys())}")
-        
-        # Generate response
-        report_path = result.get("report_path", "")
-        
-        # Create summary
-        summary_parts = []
-        
-        # Process each agent result
-        agents = [
-            ("iqvia", "Market Analysis"),
-            ("exim", "Trade Analysis"), 
-            ("patent", "Patent Analysis"),
-            ("clinical", "Clinical Trials"),
-            ("internal", "Internal Docs"),
-            ("web", "Web Intelligence")
-        ]
+        # Repeat queries (same entities, same uploaded file) reuse the earlier result and report
+        lookup_start, lookup_started = time.time(), time.perf_counter()
+        cache_key = query_cache_key(QueryParser.parse_query(state["query"]), state["uploaded_file_path"], state["report_formats"])
+        result = query_cache.get(cache_key)
+        if result is not None and not _report_available(result):
+            query_cache.discard(cache_key)
+            result = None
+        record_span({
+            "trace_id": state["trace_id"],
+            "span_id": state["trace_id"][:16],
+            "parent_id": None,
+            "node": "query_cache",
+            "input_key": input_key(state),
+            "start": lookup_start,
+            "end": time.time(),
+            "duration_ms": round((time.perf_counter() - lookup_started) * 1000, 3),
+            "status": "success",
+            "cache": "miss" if result is None else "hit",
+            "payload_bytes": 0
+        })
         
-        for agent_key, agent_name in agents:
-            agent_data = result.get(agent_key, {})
-            if isinstance(agent_data, dict):
-                if "summary" in agent_data and agent_data["summary"]:
-                    summary_text = agent_data["summary"]
-                    if agent_key == "internal":
-                        summary_text = summary_text[:200] + "..." if len(summary_text) > 200 else summary_text
-                    summary_parts.append(f"{agent_name}: {summary_text}")
-                elif "status" in agent_data:
-                    summary_parts.append(f"{agent_name}: {agent_data['status'].title()}")
+        if result is not None:
+            print(f"Cache hit for query: {query} ({query_cache.stats()})")
+        else:
+            # Run the graph once an analysis slot is free, showing the user their place in line
+            analysis = stages["analysis"]
+            try:
+                ticket = analysis.join()
+            except StageBusy:
+                yield "The service is at capacity right now. Please try again in a minute.", None
+                return
+            running = False
+            try:
+                last_position = 0
+                # Report the position straight away if the request cannot start immediately
+                while not analysis.start(ticket, timeout=QUEUE_UPDATE_SECONDS if last_position else 0):
+                    position = analysis.position(ticket)
+                    if position != last_position:
+                        yield f"Waiting for an analysis slot: position {position} in queue...", None
+                        last_position = position
+                running = True
+                print(f"Processing query: {query}")
+                result = get_app().invoke(state)
+            finally:
+                # Also reached when the user leaves while waiting
+                if running:
+                    analysis.leave()
                 else:
-                    summary_parts.append(f"{agent_name}: Completed")
-            else:
-                summary_parts.append(f"{agent_name}: Completed")
+                    analysis.cancel(ticket)
+            print(f"Analysis completed. Result keys: {list(result.keys())}")
+            for span in get_trace(result.get("trace_id")):
+                print(f"  {span['node']}: {span['duration_ms']}ms ({span['status']})")
+            # A transient agent failure or timeout must not be served to everyone until the TTL expires
+            if not has_failures(result):
+                query_cache.set(cache_key, result, result_ttl(result.get("subtasks", [])))
         
-        # Combine summary
-        if summary_parts:
-            summary = "\n\n".join(summary_parts)
-        else:
-            summary = "Analysis completed successfully."
+        summary = build_summary(result)
+        report_path = result.get("report_path", "")
+        report_files = result.get("report_files") or ([report_path] if report_path else [])
+        
+        # Show agent results right away while the report renders in the background
+        if not report_path and result.get("report_job_id"):
+            job_id = result["report_job_id"]
+            yield summary + "\n\nGenerating report...", None
+            deadline = time.monotonic() + REPORT_WAIT_SECONDS
+            job = report_queue.wait(job_id, timeout=min(QUEUE_UPDATE_SECONDS, REPORT_WAIT_SECONDS))
+            last_position = 0
+            while job["status"] in ("queued", "running") and time.monotonic() < deadline:
+                position = report_queue.position(job_id)
+                if position and position != last_position:
+                    yield summary + f"\n\nReport queued: position {position}...", None
+                last_position = position
+                job = report_queue.wait(job_id, timeout=min(QUEUE_UPDATE_SECONDS, max(0.0, deadline - time.monotonic())))
+            report_path = job.get("report_path", "")
+            report_files = job.get("report_files") or ([report_path] if report_path else [])
+            if report_path:
+                # Later cache hits can skip the job lookup; other requests may be reading
+                # the cached dict, so replace it rather than writing into it
+                result = {**result, "report_path": report_path, "report_files": report_files}
+                query_cache.replace(cache_key, result)
+            elif job["status"] in ("error", "rejected"):
+                print(f"Report job {job['job_id']} {job['status']}: {job.get('error', '')}")
             
         # Add report info
-        if report_path and os.path.exists(report_path):
-            summary += f"\n\nReport generated: {os.path.basename(report_path)}"
-            return summary, report_path
+        report_files = [path for path in report_files if os.path.exists(path)]
+        if report_files:
+            summary += f"\n\nReport generated: {', '.join(os.path.basename(path) for path in report_files)}"
+            yield summary, report_files
         else:
             summary += "\n\nReport generation completed."
-            return summary, None
+            yield summary, None
         
     except ImportError as e:
         error_msg = f"Missing dependency: {str(e)}\nPlease install required packages: pip install -r requirements.txt"
-        return error_msg, None
+        yield error_msg, None
     except Exception as e:
         import traceback
         error_msg = f"Analysis Error: {str(e)}\n\nPlease try again or contact support if the issue persists."
         print(f"Full error traceback: {traceback.format_exc()}")
-        return error_msg, None
+        yield error_msg, None
 
 # Example queries
 example_queries = [
@@ -115,7 +258,11 @@ example_queries = [
 ]
 
 # Create Gradio interface
-with gr.Blocks(title="Pharmaceutical Agentic AI", theme=gr.themes.Soft()) as demo:
+# Gradio keeps its own copies of uploads and served reports; expire them on the same schedule
+_gradio_cache_sweep = ((int(STORAGE_SWEEP_SECONDS), int(UPLOAD_MAX_AGE_HOURS * 3600))
+                      if STORAGE_SWEEP_SECONDS > 0 and UPLOAD_MAX_AGE_HOURS > 0 else None)
+
+with gr.Blocks(title="Pharmaceutical Agentic AI", theme=gr.themes.Soft(), delete_cache=_gradio_cache_sweep) as demo:
     gr.Markdown("""
     # Pharmaceutical Intelligence Platform
     
@@ -145,6 +292,14 @@ with gr.Blocks(title="Pharmaceutical Agentic AI", theme=gr.themes.Soft()) as dem
                 file_types=[".pdf"]
             )
             
+            # XLSX is only offered when openpyxl is installed
+            format_choices = available_formats()
+            format_select = gr.CheckboxGroup(
+                choices=format_choices,
+                value=[f for f in resolve_formats() if f in format_choices],
+                label="Report formats"
+            )
+            
             submit_btn = gr.Button("Run Analysis", variant="primary", size="lg")
         
         with gr.Column(scale=1):
@@ -163,17 +318,42 @@ with gr.Blocks(title="Pharmaceutical Agentic AI", theme=gr.themes.Soft()) as dem
         
         report_download = gr.File(
             label="Download Report",
+            file_count="multiple",
             visible=True
         )
     
     submit_btn.click(
         fn=run_agentic_ai,
-        inputs=[query_input, file_upload],
+        inputs=[query_input, file_upload, format_select],
         outputs=[output_text, report_download]
     )
     
    
 
+# Explicit request queue: Gradio shows each waiting user their position and turns new
+# requests away once SERVE_QUEUE_SIZE are waiting
+demo.queue(max_size=SERVE_QUEUE_SIZE, default_concurrency_limit=SERVE_CONCURRENCY)
+
+startup.mark("ui")
+
+def _warm_up():
+    warm_up()
+    startup.mark("graph ready")
+    print(f"Startup: {startup.summary()}")
+
 if __name__ == "__main__":
-    # For Hugging Face Spaces, use default settings
-    demo.launch()
\ No newline at end of file
+    if "--startup-report" in sys.argv:
+        # Import-time breakdown of a fresh `import app`, then exit
+        from agents.startup import report
+        print(report("app"))
+        sys.exit(0)
+    
+    # Expire old reports and uploads and keep the reports directory within its size quota
+    report_store.start_sweeper(STORAGE_SWEEP_SECONDS)
+    
+    # Build the graph and import the agents while the server starts, not on the first request
+    if os.environ.get("WARM_START", "1").lower() not in ("0", "false", "no"):
+        threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    
+    # For Hugging Face Spaces, use default settings; enough threads for every concurrent handler
+    demo.launch(max_threads=max(40, SERVE_CONCURRENCY + 8))
\ No newline at end of file
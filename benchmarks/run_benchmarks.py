@@ -0,0 +1,292 @@
+"""Benchmark the agent pipeline and each worker node.
+
+    python benchmarks/run_benchmarks.py --scales 1,10,100,1000 --pdf-pages 300
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/a.json benchmarks/results/b.json
+
+Datasets are generated by replicating the mock JSON records N times under new
+keys, and the internal document is a generated multi-page PDF. Results are
+saved as JSON tagged with the current git commit.
+
+Every scale starts with empty result caches. cold_ms is the median of calls
+made right after clearing them (query, section, report and document caches),
+so it includes any parsing, extraction or rendering a cache would skip. The
+p50/p95/p99 columns time repeated calls after a warm-up and show the cached path.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+MOCK_DATA_DIR = os.path.join(REPO_DIR, "mock_data")
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+# Keyed datasets that get scaled up; the vocabulary/alias files are copied as is
+SCALED_DATASETS = ["iqvia_mock.json", "exim_mock.json", "patent_mock.json", "clinical_mock.json", "web_search_mock.json"]
+
+# Calls timed right after clearing the caches, per stage
+COLD_SAMPLES = 3
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+def generate_datasets(target_dir: str, scale: int):
+    """Copy the mock data, replicating every keyed record `scale` times"""
+    os.makedirs(target_dir, exist_ok=True)
+    for name in os.listdir(MOCK_DATA_DIR):
+        if name.endswith(".json") and name not in SCALED_DATASETS:
+            shutil.copy(os.path.join(MOCK_DATA_DIR, name), target_dir)
+    for name in SCALED_DATASETS:
+        with open(os.path.join(MOCK_DATA_DIR, name)) as f:
+            data = json.load(f)
+        scaled = dict(data)
+        for copy in range(1, scale):
+            for key, value in data.items():
+                scaled[f"{key} {copy:06d}"] = value
+        with open(os.path.join(target_dir, name), "w") as f:
+            json.dump(scaled, f)
+
+def generate_pdf(path: str, pages: int):
+    """Multi-page strategy deck with the section keywords near the end"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(path, pagesize=letter)
+    for page in range(pages):
+        text = pdf.beginText(40, 740)
+        for line in range(45):
+            if page == pages - 1 and line == 0:
+                text.textLine("Strategy: metformin market expansion with clinical data for respiratory indications.")
+            else:
+                text.textLine(f"Page {page + 1} line {line + 1}: portfolio review notes for the internal planning cycle.")
+        pdf.drawText(text)
+        pdf.showPage()
+    pdf.save()
+
+def isolate_storage(work_dir: str):
+    """Point every on-disk cache and the report store at the work directory.
+
+    Their directories come from environment variables and may be absolute,
+    so changing the working directory alone would let reset_caches() delete
+    the app's own index, extracted text and reports.
+    """
+    from agents import columnar_store, report_agent, trial_store
+    from agents.doc_cache import document_cache
+    from agents.doc_index import document_index
+    from agents.storage import MANIFEST_NAME, report_store
+
+    document_cache.cache_dir = os.path.join(work_dir, "cache", "internal_docs")
+    document_index.index_dir = os.path.join(work_dir, "cache", "doc_index")
+    columnar_store.COLUMNAR_DIR = os.path.join(work_dir, "cache", "columnar")
+    trial_store.TRIAL_DB = os.path.join(work_dir, "cache", "clinical_trials.sqlite")
+    reports_dir = os.path.join(work_dir, "reports")
+    report_agent.REPORTS_DIR = report_store.reports_dir = reports_dir
+    report_store.manifest_path = os.path.join(reports_dir, MANIFEST_NAME)
+
+def reset_caches():
+    """Drop every result cache, so the next call does the full work"""
+    from agents.doc_cache import document_cache
+    from agents.doc_index import document_index
+    from agents.report_agent import section_cache
+    from agents.result_cache import query_cache
+    from agents.storage import report_store
+
+    query_cache.clear()
+    section_cache.clear()
+    report_store.clear()
+    shutil.rmtree(document_cache.cache_dir, ignore_errors=True)
+    document_index.clear()
+
+def measure(name: str, fn: Callable[[Any], Any], inputs: List[Any], iterations: int, warmup: int = 1,
+            reset: Optional[Callable[[], None]] = reset_caches) -> Dict[str, Any]:
+    """Cold latency, warm latency percentiles, throughput, peak RSS and allocations for one stage"""
+    cold = []
+    for item in inputs[:COLD_SAMPLES] if reset else []:
+        reset()
+        t0 = time.perf_counter()
+        fn(item)
+        cold.append((time.perf_counter() - t0) * 1000)
+
+    for item in inputs[:warmup]:
+        fn(item)
+
+    samples = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        item = inputs[i % len(inputs)]
+        t0 = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+
+    # Allocations are traced in a separate pass so tracing does not skew the timings
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    fn(inputs[0])
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+
+    return {
+        "stage": name,
+        "iterations": iterations,
+        "cold_ms": round(percentile(cold, 50), 3) if cold else None,
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(sum(samples) / len(samples), 3),
+        "throughput_per_s": round(iterations / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "alloc_peak_kb": round(peak / 1024, 1),
+        "alloc_blocks": blocks
+    }
+
+def run_scale(scale: int, pdf_path: str, work_dir: str, iterations: int) -> List[Dict[str, Any]]:
+    from agents.data_store import dataset_cache, load_dataset
+    from agents.query_parser import QueryParser
+    from agents import master_agent
+    from agents.report_agent import generate_pdf_report
+
+    data_dir = os.path.join(work_dir, f"data_x{scale}")
+    generate_datasets(data_dir, scale)
+    dataset_cache.data_dir = data_dir
+    # Datasets, the patent index and the entity extractor rebuild from this scale's files
+    dataset_cache.invalidate()
+    reset_caches()
+
+    with open(os.path.join(MOCK_DATA_DIR, "synthetic_queries.json")) as f:
+        queries = json.load(f)["queries"]
+    inputs = [{"query": q, "uploaded_file_path": pdf_path} for q in queries]
+    states = [{**state, **master_agent.master_orchestrator(state)} for state in inputs]
+    app = master_agent.build_graph("parallel", report_mode="sync")
+
+    def with_agents(state):
+        for task in master_agent.AGENT_NODES:
+            state = {**state, **master_agent.AGENT_NODES[task](state)}
+        return state
+    report_states = [with_agents(s) for s in states[:3]]
+
+    def cold_load(_):
+        dataset_cache.invalidate()
+        for name in SCALED_DATASETS:
+            load_dataset(name)
+
+    # dataset_load is cold on every call already
+    stages = [("dataset_load", cold_load, [None]),
+              ("parse_query", QueryParser.parse_query, queries),
+              ("master", lambda q: master_agent.master_orchestrator({"query": q}), queries)]
+    stages += [(task, node, states) for task, node in master_agent.AGENT_NODES.items()]
+    stages += [("report", generate_pdf_report, report_states),
+               ("pipeline", lambda q: app.invoke({"query": q, "uploaded_file_path": pdf_path}), queries)]
+
+    results = []
+    for name, fn, inputs in stages:
+        # Loading and rendering are much slower than a lookup; keep the run time reasonable
+        stage_iterations = max(5, iterations // 10) if name in ("dataset_load", "report", "pipeline") else iterations
+        result = measure(name, fn, inputs, stage_iterations, reset=None if name == "dataset_load" else reset_caches)
+        result["scale"] = scale
+        results.append(result)
+        cold = f"{result['cold_ms']:>9.3f}ms" if result["cold_ms"] is not None else f"{'-':>11}"
+        print(f"x{scale:<5} {name:<12} cold {cold}  p50 {result['p50_ms']:>9.3f}ms  p95 {result['p95_ms']:>9.3f}ms  "
+              f"p99 {result['p99_ms']:>9.3f}ms  {result['throughput_per_s'] or 0:>10.1f}/s  "
+              f"rss {result['peak_rss_mb']}MB  alloc {result['alloc_peak_kb']}KB")
+    return results
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def _ms(value: Optional[float]) -> str:
+    return f"{value:>12.3f}" if value is not None else f"{'-':>12}"
+
+def compare(baseline_path: str, candidate_path: str):
+    """Print cold and p50/p95 changes between two saved runs"""
+    with open(baseline_path) as f:
+        baseline = {(r["scale"], r["stage"]): r for r in json.load(f)["results"]}
+    with open(candidate_path) as f:
+        candidate = json.load(f)["results"]
+    print(f"{'scale':<7}{'stage':<13}{'cold before':>12}{'cold after':>12}{'p50 before':>12}{'p50 after':>12}"
+          f"{'change':>9}{'p95 before':>12}{'p95 after':>12}")
+    for result in candidate:
+        before = baseline.get((result["scale"], result["stage"]))
+        if not before:
+            continue
+        change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0
+        # Runs saved before cold timings were recorded have no cold_ms
+        print(f"x{result['scale']:<6}{result['stage']:<13}{_ms(before.get('cold_ms'))}{_ms(result.get('cold_ms'))}"
+              f"{before['p50_ms']:>12.3f}{result['p50_ms']:>12.3f}"
+              f"{change:>8.1f}%{before['p95_ms']:>12.3f}{result['p95_ms']:>12.3f}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the pharmaceutical intelligence pipeline")
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated dataset multipliers, e.g. 1,10,100,1000")
+    parser.add_argument("--iterations", type=int, default=50, help="timed calls per stage")
+    parser.add_argument("--pdf-pages", type=int, default=200, help="pages in the generated internal document")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>_<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"), help="compare two saved runs")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="pharma-bench-")
+    # Reports and caches are written to the work directory, never the repository's
+    os.chdir(work_dir)
+    isolate_storage(work_dir)
+    try:
+        pdf_path = os.path.join(work_dir, "internal_deck.pdf")
+        generate_pdf(pdf_path, args.pdf_pages)
+
+        results = []
+        for scale in [int(s) for s in args.scales.split(",") if s.strip()]:
+            results.extend(run_scale(scale, pdf_path, work_dir, args.iterations))
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    commit = git_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pdf_pages": args.pdf_pages,
+            "results": results
+        }, f, indent=2)
+    print(f"Results saved to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+import sys
+
+# Tests import the app's packages from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Write a PDF with one page per list of lines and return its path"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    def make(name, pages):
+        path = str(tmp_path / name)
+        pdf = canvas.Canvas(path, pagesize=letter)
+        for lines in pages:
+            text = pdf.beginText(40, 740)
+            for line in lines:
+                text.textLine(line)
+            pdf.drawText(text)
+            pdf.showPage()
+        pdf.save()
+        return path
+    return make
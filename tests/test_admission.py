@@ -0,0 +1,66 @@
+import threading
+import pytest
+from agents.admission import Stage, StageBusy, metrics_lines
+
+def test_tickets_start_in_arrival_order():
+    stage = Stage("analysis", limit=1, queue_limit=2)
+    first, second, third = stage.join(), stage.join(), stage.join()
+    assert [stage.position(t) for t in (first, second, third)] == [1, 2, 3]
+
+    # A later ticket cannot jump the line even when it asks first
+    assert not stage.start(second, timeout=0)
+    assert stage.start(first, timeout=0)
+    assert stage.position(first) == 0
+    assert stage.position(third) == 2
+
+    stage.leave()
+    assert stage.start(second, timeout=0)
+
+def test_full_queue_rejects_new_callers():
+    stage = Stage("document", limit=1, queue_limit=1)
+    stage.start(stage.join(), timeout=0)
+    stage.join()
+
+    with pytest.raises(StageBusy, match="queue is full"):
+        stage.join()
+    assert stage.stats()["rejected"] == 1
+
+def test_cancelled_ticket_lets_the_next_one_start():
+    stage = Stage("analysis", limit=1, queue_limit=2)
+    first, second = stage.join(), stage.join()
+
+    stage.cancel(first)
+
+    assert stage.start(second, timeout=0)
+    assert stage.stats()["abandoned"] == 1
+
+def test_slot_times_out_and_gives_up_its_place():
+    stage = Stage("report", limit=1, queue_limit=1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with stage.slot():
+            started.set()
+            release.wait(5)
+    holder = threading.Thread(target=hold)
+    holder.start()
+    started.wait(5)
+
+    with pytest.raises(StageBusy, match="Timed out"):
+        with stage.slot(timeout=0.05):
+            pass
+    assert stage.stats()["waiting"] == 0
+
+    release.set()
+    holder.join()
+    with stage.slot(timeout=0):
+        assert stage.stats()["active"] == 1
+    assert stage.stats()["active"] == 0
+
+def test_metrics_cover_every_stage():
+    text = "\n".join(metrics_lines())
+
+    for name in ("analysis", "document", "report"):
+        assert f'pharma_stage_active{{stage="{name}"}}' in text
+        assert f'pharma_stage_requests_total{{stage="{name}",outcome="rejected"}}' in text
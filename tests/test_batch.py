@@ -0,0 +1,51 @@
+from agents import batch
+from agents.single_flight import lookup_key
+
+def test_lookup_key_ignores_fields_the_agent_does_not_read():
+    base = {"molecule": "Semaglutide", "therapy_area": "diabetes", "entities": [{"type": "molecule", "value": "semaglutide"}]}
+    first = {**base, "query": "Patent expiry for semaglutide", "trial_phase": 3}
+    second = {**base, "query": "semaglutide patents in the US?", "geography": "us"}
+    assert lookup_key("patent", first) == lookup_key("patent", second)
+    assert lookup_key("clinical", first) != lookup_key("clinical", second)
+    assert lookup_key("web", first) != lookup_key("web", second)
+
+def test_duplicate_entities_collapse_into_one_lookup(monkeypatch):
+    calls = []
+
+    def run_agent(task, state):
+        calls.append(task)
+        return {"status": "success", "data": {}, "summary": task}
+
+    monkeypatch.setattr(batch, "_run_agent", run_agent)
+    queries = [
+        {"query": "Metformin patent expiry timeline"},
+        {"query": "metformin patent landscape and FTO risks"},
+        {"query": "Show METFORMIN patents"}
+    ]
+    results = batch.run_batch(queries, workers=2)
+
+    assert all("patent" in r["subtasks"] for r in results)
+    assert calls.count("patent") == 1
+    assert all(r["patent"] is results[0]["patent"] for r in results)
+
+def test_queries_are_read_from_every_supported_format(tmp_path):
+    (tmp_path / "q.jsonl").write_text('{"query": " metformin "}\n\n{"query": ""}\n')
+    (tmp_path / "q.csv").write_text("query,uploaded_file_path\nmetformin,deck.pdf\n")
+    (tmp_path / "q.json").write_text('{"queries": ["metformin", {"query": "asthma"}]}')
+
+    assert batch.load_queries(str(tmp_path / "q.jsonl")) == [{"query": "metformin", "uploaded_file_path": None}]
+    assert batch.load_queries(str(tmp_path / "q.csv")) == [{"query": "metformin", "uploaded_file_path": "deck.pdf"}]
+    assert [q["query"] for q in batch.load_queries(str(tmp_path / "q.json"))] == ["metformin", "asthma"]
+
+def test_failed_lookup_is_reported_for_each_query_that_needed_it(monkeypatch):
+    def run_agent(task, state):
+        if task == "patent":
+            raise RuntimeError("source offline")
+        return {"status": "success", "data": {}, "summary": task}
+
+    monkeypatch.setattr(batch, "_run_agent", run_agent)
+    results = batch.run_batch([{"query": "Metformin patent expiry"}, {"query": "metformin patents"}], workers=2)
+
+    assert all(r["patent"]["status"] == "error" for r in results)
+    assert "source offline" in results[0]["patent"]["summary"]
+    assert results[0]["molecule"] == "Metformin"
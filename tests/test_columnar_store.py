@@ -0,0 +1,36 @@
+import json
+from agents import columnar_store
+from agents.columnar_store import ColumnarTable, columnar_lookup, convert
+from agents.data_store import dataset_cache
+
+RECORDS = {
+    "Metformin": {"market_size_millions_usd": 12, "growth_rate_cagr_percent": 5.2, "competitors": ["A", "B"],
+                  "therapy_area": "Diabetes", "volume_shifts": {"2024": 3}},
+    "Aspirin": {"market_size_millions_usd": 12.5, "growth_rate_cagr_percent": 7, "therapy_area": "Cardiovascular"},
+    "Ibuprofen": {"market_size_millions_usd": 3, "flag": True, "competitors": []}
+}
+
+def test_round_trip_keeps_values_and_types(tmp_path):
+    source = tmp_path / "data.json"
+    source.write_text(json.dumps(RECORDS))
+    convert(str(source), str(tmp_path / "table"), (0, 0))
+    table = ColumnarTable(str(tmp_path / "table"))
+
+    rows = {table.key(i): table.row(i) for i in range(len(table))}
+
+    assert rows == RECORDS
+    # 12 and 7 share float columns with 12.5 and 5.2 but still read back as ints
+    assert type(rows["Metformin"]["market_size_millions_usd"]) is int
+    assert type(rows["Aspirin"]["growth_rate_cagr_percent"]) is int
+    assert type(rows["Aspirin"]["market_size_millions_usd"]) is float
+
+def test_lookup_reads_only_the_requested_columns(tmp_path, monkeypatch):
+    (tmp_path / "data.json").write_text(json.dumps(RECORDS))
+    monkeypatch.setattr(dataset_cache, "data_dir", str(tmp_path))
+    monkeypatch.setattr(columnar_store, "COLUMNAR_DIR", str(tmp_path / "columnar"))
+    monkeypatch.setattr(columnar_store, "_tables", {})
+
+    key, record = columnar_lookup("data.json", "unknown", "metformin", columns=["therapy_area", "missing"])
+
+    assert key == "Metformin"
+    assert record == {"therapy_area": "Diabetes"}
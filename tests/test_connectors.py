@@ -0,0 +1,71 @@
+import pytest
+from agents import connectors
+from agents.connectors import HttpConnector, LocalConnector, get_connector, source_name
+from agents.stub_server import start_stub_server
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        server = start_stub_server(0, **kwargs)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def http(stub):
+    clients = []
+
+    def connect(**kwargs):
+        client = HttpConnector(stub(**kwargs.pop("server", {})), backoff=0.01, **kwargs)
+        clients.append(client)
+        return client
+    yield connect
+    for client in clients:
+        client.close()
+
+def test_http_matches_local_lookups(http):
+    client = http()
+    local = LocalConnector()
+
+    for dataset, candidates in [("iqvia_mock.json", ["nosuchmolecule", "Metformin"]), ("patent_mock.json", ["Lipitor"])]:
+        assert client.lookup(dataset, *candidates) == local.lookup(dataset, *candidates)
+    assert client.lookup("iqvia_mock.json", "nosuchmolecule") == (None, None)
+
+def test_unknown_dataset_raises_file_not_found(http):
+    with pytest.raises(FileNotFoundError):
+        http().lookup("missing_mock.json", "metformin")
+
+def test_failed_requests_are_retried(http):
+    client = http(server={"fail_rate": 0.5}, retries=20)
+
+    for _ in range(5):
+        assert client.lookup("iqvia_mock.json", "metformin")[0] == "metformin"
+    assert client.stats()["requests"] == 5 + client.stats()["retries"]
+
+def test_prefetched_lookup_is_picked_up_by_the_agent(http):
+    client = http(server={"latency_ms": 50})
+
+    client.prefetch([("iqvia_mock.json", ["Metformin"])])
+    assert client.lookup("iqvia_mock.json", "metformin")[0] == "metformin"
+
+    stats = client.stats()
+    assert stats["prefetched"] == 1
+    assert stats["prefetch_hits"] == 1
+    assert stats["requests"] == 1
+
+def test_source_url_overrides_the_default_connector(monkeypatch):
+    monkeypatch.setattr(connectors, "DATA_CONNECTOR", "local")
+    monkeypatch.setenv("CLINICAL_API_URL", "http://127.0.0.1:1")
+
+    assert source_name("clinical_mock.json") == "CLINICAL"
+    assert isinstance(get_connector("clinical_mock.json"), HttpConnector)
+    assert isinstance(get_connector("iqvia_mock.json"), LocalConnector)
+
+    monkeypatch.setattr(connectors, "DATA_CONNECTOR", "ftp")
+    with pytest.raises(ValueError, match="ftp"):
+        get_connector("iqvia_mock.json")
@@ -0,0 +1,29 @@
+from agents.data_index import KeyIndex, alias_chain, lookup, normalize_key, resolve_key
+
+ALIASES = {"lipitor": "atorvastatin", "atorvastatin": "statin", "loop a": "loop b", "loop b": "loop a"}
+
+def test_normalize_key_ignores_case_punctuation_and_spacing():
+    assert normalize_key("  Rest_of-World ") == "rest of world"
+    assert normalize_key(None) == ""
+
+def test_alias_chain_follows_hops_and_stops_on_cycles():
+    assert list(alias_chain("Lipitor", ALIASES)) == ["atorvastatin", "statin"]
+    assert list(alias_chain("loop a", ALIASES)) == ["loop b"]
+
+def test_direct_matches_win_over_aliases(monkeypatch):
+    index = KeyIndex(["Metformin", "statin", "METFORMIN"])
+    monkeypatch.setattr("agents.data_index.load_aliases", lambda: ALIASES)
+
+    # First spelling wins for keys that normalize alike
+    assert index.get("metformin") == "Metformin"
+    assert index.resolve("Lipitor", "metformin") == "Metformin"
+    assert index.resolve("Lipitor") == "statin"
+    assert index.resolve("", None, "unknown") is None
+    assert resolve_key({"statin": 1}.get, "atorvastatin") == 1
+
+def test_lookup_resolves_brand_names_through_the_synonyms_file():
+    key, record = lookup("patent_mock.json", "Lipitor")
+
+    assert key == "statin"
+    assert record is not None
+    assert lookup("patent_mock.json", "no such molecule") == (None, None)
@@ -0,0 +1,77 @@
+import json
+import time
+import pytest
+from agents import patent_index
+from agents.data_store import DatasetCache, dataset_cache
+
+def _write(path, data):
+    path.write_text(json.dumps(data))
+
+def _patents(number, expiry):
+    return {"metformin": {"patent_expiry_timeline": [{"patent_number": number, "expiry_date": expiry}]}}
+
+def test_version_keeps_increasing_across_invalidate(tmp_path):
+    cache = DatasetCache(data_dir=str(tmp_path), stat_interval=0)
+    _write(tmp_path / "data.json", {"a": 1})
+    first = cache.version("data.json")
+    assert cache.derived("data.json", "keys", sorted) == ["a"]
+
+    cache.invalidate("data.json")
+    _write(tmp_path / "data.json", {"b": 2})
+    assert cache.version("data.json") > first
+    assert cache.derived("data.json", "keys", sorted) == ["b"]
+
+def test_patent_index_rebuilds_after_invalidate(tmp_path, monkeypatch):
+    # Same size and a stale stat interval, so only invalidate() can reveal the change
+    monkeypatch.setattr(dataset_cache, "data_dir", str(tmp_path))
+    monkeypatch.setattr(dataset_cache, "stat_interval", 3600)
+    try:
+        dataset_cache.invalidate()
+        _write(tmp_path / patent_index.PATENT_FILE, _patents("US111", "2030-01-01"))
+        assert set(patent_index.get_patent_index().patents) == {"US111"}
+
+        dataset_cache.invalidate(patent_index.PATENT_FILE)
+        _write(tmp_path / patent_index.PATENT_FILE, _patents("US222", "2031-01-01"))
+        assert set(patent_index.get_patent_index().patents) == {"US222"}
+    finally:
+        dataset_cache.invalidate()
+
+def test_dataset_is_parsed_once_until_the_file_changes(tmp_path):
+    cache = DatasetCache(data_dir=str(tmp_path), stat_interval=0)
+    _write(tmp_path / "data.json", {"a": 1})
+    first = cache.get("data.json")
+
+    assert cache.get("data.json") is first
+    assert cache.derived("data.json", "keys", sorted) is cache.derived("data.json", "keys", sorted)
+
+    # Different size, so the change is seen even with a coarse mtime
+    _write(tmp_path / "data.json", {"a": 1, "b": 2})
+    assert cache.get("data.json") == {"a": 1, "b": 2}
+    assert cache.derived("data.json", "keys", sorted) == ["a", "b"]
+
+def test_stat_interval_skips_file_checks(tmp_path):
+    cache = DatasetCache(data_dir=str(tmp_path), stat_interval=3600)
+    _write(tmp_path / "data.json", {"a": 1})
+    assert cache.get("data.json") == {"a": 1}
+
+    _write(tmp_path / "data.json", {"a": 1, "b": 2})
+    assert cache.get("data.json") == {"a": 1}
+
+def test_missing_dataset_raises_file_not_found(tmp_path):
+    cache = DatasetCache(data_dir=str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        cache.get("missing.json")
+
+def test_watcher_reloads_changed_files(tmp_path):
+    cache = DatasetCache(data_dir=str(tmp_path), stat_interval=3600)
+    _write(tmp_path / "data.json", {"a": 1})
+    cache.get("data.json")
+    cache.start_watcher(interval=0.01)
+    try:
+        _write(tmp_path / "data.json", {"a": 1, "b": 2})
+        deadline = time.monotonic() + 5
+        while cache.get("data.json") == {"a": 1} and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.get("data.json") == {"a": 1, "b": 2}
+    finally:
+        cache.stop_watcher()
@@ -0,0 +1,53 @@
+import os
+import shutil
+import pytest
+from agents import internal_agent
+from agents.doc_cache import DocumentCache
+from agents.internal_agent import load_extraction
+
+def test_round_trip_is_stored_compressed(tmp_path):
+    cache = DocumentCache(str(tmp_path))
+    record = {"summary": "metformin " * 200, "key_sections": []}
+
+    cache.put("abc", record)
+
+    assert cache.get("abc") == record
+    assert os.path.getsize(tmp_path / "abc.json.z") < len(record["summary"])
+    assert cache.get("missing") is None
+
+def test_corrupt_entry_is_dropped(tmp_path):
+    cache = DocumentCache(str(tmp_path))
+    (tmp_path / "abc.json.z").write_bytes(b"not zlib")
+
+    assert cache.get("abc") is None
+    assert not (tmp_path / "abc.json.z").exists()
+
+def test_least_recently_used_entries_are_evicted_past_the_cap(tmp_path):
+    cache = DocumentCache(str(tmp_path), max_bytes=10 ** 6)
+    for digest in ("old", "used", "new"):
+        cache.put(digest, {"summary": os.urandom(200).hex()})
+    entry_size = os.path.getsize(tmp_path / "old.json.z")
+    os.utime(tmp_path / "old.json.z", (1, 1))
+    os.utime(tmp_path / "used.json.z", (2, 2))
+    cache.get("used")
+
+    cache.max_bytes = entry_size * 2 + entry_size // 2
+    cache.evict()
+
+    assert cache.get("old") is None
+    assert cache.get("used") is not None
+    assert cache.get("new") is not None
+
+def test_extraction_is_reused_for_identical_bytes(tmp_path, make_pdf, monkeypatch):
+    monkeypatch.setattr(internal_agent, "document_cache", DocumentCache(str(tmp_path / "cache")))
+    path = make_pdf("deck.pdf", [["Strategy review"], ["Market sizing"]])
+    first = load_extraction(path)
+
+    def parse_again(*args):
+        pytest.fail("document was parsed again")
+    monkeypatch.setattr(internal_agent, "extract_summary_text", parse_again)
+
+    # Same bytes under a different name hit the cache
+    copy = shutil.copy(path, tmp_path / "copy.pdf")
+    assert load_extraction(str(copy)) == first
+    assert first["total_pages"] == 2
@@ -0,0 +1,42 @@
+from agents.doc_index import DocumentIndex
+
+def _index(tmp_path, **kwargs):
+    return DocumentIndex(str(tmp_path / "index"), **kwargs)
+
+def test_uploads_are_only_searched_by_their_own_request(tmp_path, make_pdf):
+    index = _index(tmp_path)
+    corpus = index.add_document(make_pdf("deck.pdf", [["Metformin market expansion in India"]]), corpus=True)
+    upload = index.add_document(make_pdf("upload.pdf", [["Metformin pricing notes from the field"]]))
+
+    assert [hit["document"] for hit in index.search("metformin")] == ["deck.pdf"]
+    assert [hit["document"] for hit in index.search("metformin", documents=[upload])] == ["upload.pdf"]
+    assert index.corpus_documents() == [corpus]
+
+def test_segments_are_reloaded_after_a_restart(tmp_path, make_pdf):
+    _index(tmp_path).add_document(make_pdf("deck.pdf", [["Respiratory pipeline review"], ["Asthma inhaler launch plan"]]), corpus=True)
+
+    hits = _index(tmp_path).search("asthma inhaler")
+
+    assert [(hit["document"], hit["page"]) for hit in hits] == [("deck.pdf", 2)]
+
+def test_eviction_removes_every_trace_of_a_document(tmp_path, make_pdf):
+    index = _index(tmp_path, max_uploads=1)
+    first = index.add_document(make_pdf("first.pdf", [["Zorbex trial results"], ["Shared oncology notes"]]))
+    second = index.add_document(make_pdf("second.pdf", [["Shared oncology notes"]]))
+
+    assert list(index.docs) == [second]
+    assert all(chunk["doc"] == second for chunk in index.chunks.values())
+    assert set(index.lengths) == set(index.chunks)
+    assert "zorbex" not in index.postings
+    assert set(index.postings["oncology"]) == set(index.docs[second]["chunks"])
+    assert not (tmp_path / "index" / f"{first}.json.z").exists()
+    assert index.search("oncology", documents=[first]) == []
+
+def test_clear_empties_the_index(tmp_path, make_pdf):
+    index = _index(tmp_path)
+    index.add_document(make_pdf("deck.pdf", [["Metformin market"]]), corpus=True)
+
+    index.clear()
+
+    assert not index.docs and not index.chunks and not index.postings
+    assert list((tmp_path / "index").iterdir()) == []
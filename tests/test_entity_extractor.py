@@ -0,0 +1,37 @@
+from agents.entity_extractor import EntityExtractor, get_extractor
+
+VOCABULARY = {
+    "therapy_areas": ["diabetes"],
+    "molecules": ["metformin", "atorvastatin"],
+    "diseases": ["type 2 diabetes", "asthma"],
+    "query_types": {"patent_analysis": ["patent", "fto"]},
+    "geographies": {"usa": ["usa", "united states"]}
+}
+
+def _found(extractor, text):
+    return [(e["type"], e["value"]) for e in extractor.extract(text)]
+
+def test_entities_are_found_in_order_of_appearance():
+    extractor = EntityExtractor(VOCABULARY)
+
+    assert _found(extractor, "FTO for Metformin in the United  States") == \
+        [("query_type", "patent_analysis"), ("molecule", "metformin"), ("geography", "usa")]
+
+def test_multi_word_terms_also_report_the_terms_nested_inside():
+    extractor = EntityExtractor(VOCABULARY)
+
+    assert _found(extractor, "type 2 diabetes trials") == [("disease", "type 2 diabetes"), ("therapy_area", "diabetes")]
+
+def test_terms_only_match_whole_words():
+    extractor = EntityExtractor(VOCABULARY)
+
+    assert _found(extractor, "patents on metformins in fusa") == []
+
+def test_brand_names_resolve_to_their_molecule():
+    extractor = EntityExtractor(VOCABULARY, aliases={"lipitor": "atorvastatin"})
+
+    assert _found(extractor, "Lipitor patent") == [("molecule", "atorvastatin"), ("query_type", "patent_analysis")]
+
+def test_shared_extractor_is_compiled_once():
+    assert get_extractor() is get_extractor()
+    assert ("molecule", "metformin") in _found(get_extractor(), "metformin market")
@@ -0,0 +1,61 @@
+import csv
+import json
+import pytest
+from agents import exports
+from agents.exports import resolve_formats, write_exports
+
+RESULTS = [
+    {"query": "Metformin market", "molecule": "Metformin",
+     "iqvia": {"status": "success", "summary": "Diabetes market", "data": {"markets": [{"region": "India", "size": 1.5}]}}},
+    {"query": "Asthma trials", "disease": "asthma",
+     "clinical": {"status": "error", "summary": "no trials", "data": {}}}
+]
+
+def test_formats_are_validated_and_ordered():
+    assert resolve_formats("JSON, pdf") == ["pdf", "json"]
+    assert resolve_formats(["csv", "csv"]) == ["csv"]
+    with pytest.raises(ValueError, match="docx"):
+        resolve_formats("docx")
+
+def test_csv_export_writes_a_summary_and_one_file_per_agent_with_data(tmp_path):
+    paths = write_exports(RESULTS, ["csv"], str(tmp_path / "out"))
+
+    assert sorted(paths) == sorted([str(tmp_path / "out_summary.csv"), str(tmp_path / "out_iqvia.csv")])
+    with open(tmp_path / "out_summary.csv") as f:
+        summary = list(csv.DictReader(f))
+    assert [row["clinical_status"] for row in summary] == ["", "error"]
+    with open(tmp_path / "out_iqvia.csv") as f:
+        details = list(csv.DictReader(f))
+    assert {(row["field"], row["item"], row["attribute"], row["value"]) for row in details} == \
+        {("markets", "0", "region", "India"), ("markets", "0", "size", "1.5")}
+    assert details[0]["entity"] == "Metformin"
+
+def test_json_export_keeps_full_agent_outputs(tmp_path):
+    paths = write_exports(RESULTS, ["json"], str(tmp_path / "out"))
+
+    with open(paths[0]) as f:
+        bundle = json.load(f)
+    assert bundle["results"][0]["iqvia"] == RESULTS[0]["iqvia"]
+    assert "iqvia" not in bundle["results"][1]
+
+def test_failing_format_is_dropped_and_its_files_removed(tmp_path, monkeypatch):
+    class BrokenWriter(exports.CsvExportWriter):
+        def write(self, result):
+            super().write(result)
+            raise OSError("disk full")
+
+    monkeypatch.setitem(exports.EXPORT_WRITERS, "csv", BrokenWriter)
+    errors = {}
+    paths = write_exports(RESULTS, ["csv", "json"], str(tmp_path / "out"), errors)
+
+    assert paths == [str(tmp_path / "out.json")]
+    assert errors == {"csv": "disk full"}
+    assert not list(tmp_path.glob("*.csv"))
+
+def test_xlsx_export_has_a_summary_and_a_sheet_per_agent(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    paths = write_exports(RESULTS, ["xlsx"], str(tmp_path / "out"))
+
+    workbook = openpyxl.load_workbook(paths[0])
+    assert workbook.sheetnames == ["Summary"] + [label for _, label in exports.SECTIONS]
+    assert workbook["Market"].max_row == 3
@@ -0,0 +1,31 @@
+from PyPDF2 import PdfReader
+from agents import internal_agent
+from agents.internal_agent import extract_summary_text, iter_pdf_pages
+
+SECTION_PAGES = [["Strategy for the metformin franchise"], ["Market sizing by region"], ["Clinical data summary"]]
+
+def test_pages_are_yielded_in_order(make_pdf):
+    reader = PdfReader(make_pdf("deck.pdf", [["First page"], ["Second page"]]))
+
+    pages = list(iter_pdf_pages(reader))
+
+    assert [page_num for page_num, _ in pages] == [1, 2]
+    assert "Second page" in pages[1][1]
+
+def test_reading_stops_once_budget_is_full_and_every_section_is_found(make_pdf):
+    reader = PdfReader(make_pdf("deck.pdf", SECTION_PAGES + [["Appendix"]] * 5))
+
+    extracted = extract_summary_text(reader, budget=40)
+
+    assert extracted["pages_read"] == 3
+    assert len(extracted["summary"]) == 40
+    assert extracted["key_sections"] == list(internal_agent.SECTION_DETECTORS.values())
+    assert extracted["page_offsets"][0] == [1, 0]
+
+def test_missing_sections_keep_reading_to_the_last_page(make_pdf):
+    reader = PdfReader(make_pdf("deck.pdf", [["Strategy notes"]] + [["Appendix"]] * 3))
+
+    extracted = extract_summary_text(reader, budget=20)
+
+    assert extracted["pages_read"] == 4
+    assert extracted["key_sections"] == ["Strategy discussion found"]
@@ -0,0 +1,25 @@
+from agents.iqvia_agent import fetch_iqvia_data
+from agents.market_analytics import market_overview, market_table
+from agents.query_parser import QueryParser
+
+def test_therapy_area_is_ranked_against_every_market():
+    overview = market_overview("oncology")
+
+    assert len(overview["top_markets"]) == min(len(market_table()), 5)
+    assert overview["focus"]["therapy_area"] == "oncology"
+    assert overview["focus"]["ranked"] == overview["markets_ranked"] == len(market_table())
+    assert overview["focus"]["ranks"] == {"oncology": 1}
+
+def test_geography_counts_only_markets_with_a_breakdown():
+    # Only the respiratory market reports a geographic split in the mock data
+    overview = market_overview("diabetes", "usa")
+
+    assert overview["markets_ranked"] == len(overview["top_markets"]) == 1
+    assert overview["focus"]["ranks"] == {}
+
+    summary = fetch_iqvia_data({"therapy_area": "diabetes", "geography": "usa", "analysis_scope": "portfolio"})["iqvia"].summary
+    assert "Across 1 market in USA" in summary
+
+def test_which_alone_does_not_start_a_portfolio_scan():
+    assert QueryParser.parse_query("Which oncology markets are growing")["analysis_scope"] == "single"
+    assert QueryParser.parse_query("Top oncology markets")["analysis_scope"] == "portfolio"
@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from agents import master_agent
+
+def _state(tasks):
+    return {"query": "", "pending_tasks": list(tasks), "completed_tasks": [], "task_timings": {}}
+
+def _sleeper(task, seconds, release=None):
+    def node(state):
+        if release is not None:
+            release.wait(seconds)
+        else:
+            time.sleep(seconds)
+        return {task: {"status": "success"}}
+    return node
+
+def test_queue_time_does_not_count_against_the_agent_timeout(monkeypatch):
+    # One worker: "web" waits ~0.3s for "iqvia" to finish, then runs for 0.3s
+    monkeypatch.setattr(master_agent, "_agent_executor", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(master_agent, "AGENT_NODES", {
+        "iqvia": _sleeper("iqvia", 0.3),
+        "web": _sleeper("web", 0.3)
+    })
+    monkeypatch.setattr(master_agent, "AGENT_TIMEOUT_SECONDS", 0.5)
+
+    result = master_agent.run_agents_parallel(_state(["iqvia", "web"]))
+
+    assert result["iqvia"] == {"status": "success"}
+    assert result["web"] == {"status": "success"}
+
+def test_timed_out_agent_is_counted_until_it_returns(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(master_agent, "_agent_executor", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(master_agent, "AGENT_NODES", {
+        "iqvia": _sleeper("iqvia", 5, release),
+        "web": _sleeper("web", 0)
+    })
+    monkeypatch.setattr(master_agent, "AGENT_TIMEOUT_SECONDS", 0.2)
+    before = master_agent.abandoned_agents()
+
+    result = master_agent.run_agents_parallel(_state(["iqvia", "web"]))
+
+    assert result["task_timings"]["iqvia"]["status"] == "timeout"
+    # "web" never got the only worker and was cancelled rather than run late
+    assert result["task_timings"]["web"]["status"] == "timeout"
+    assert "no free worker" in result["web"]["summary"]
+    assert master_agent.abandoned_agents() == before + 1
+
+    release.set()
+    master_agent._agent_executor.shutdown(wait=True)
+    assert master_agent.abandoned_agents() == before
+
+def test_plan_orders_dependencies_first_and_drops_duplicates():
+    dependencies = {"report_prep": ["iqvia", "patent"], "patent": ["clinical"]}
+    plan = master_agent.TaskScheduler.plan(["report_prep", "iqvia", "patent", "iqvia", "clinical"], dependencies)
+
+    assert plan == ["iqvia", "clinical", "patent", "report_prep"]
+
+def test_plan_rejects_circular_dependencies():
+    with pytest.raises(ValueError, match="Circular"):
+        master_agent.TaskScheduler.plan(["a", "b"], {"a": ["b"], "b": ["a"]})
+
+def test_tasks_are_dispatched_exactly_once():
+    scheduler = master_agent.TaskScheduler(["iqvia", "web"], dependencies={"web": ["iqvia"]})
+    assert scheduler.ready() == ["iqvia"]
+
+    scheduler.dispatch("iqvia")
+    assert scheduler.ready() == []
+    with pytest.raises(ValueError):
+        scheduler.dispatch("iqvia")
+
+    scheduler.complete("iqvia")
+    scheduler.complete("iqvia", "error")
+    assert scheduler.ready() == ["web"]
+    assert scheduler.completed == ["iqvia"]
+    assert scheduler.timings["iqvia"]["status"] == "success"
+
+def test_sequential_scheduler_runs_every_agent_once_then_reports(monkeypatch):
+    monkeypatch.setattr(master_agent, "AGENT_NODES", {"iqvia": None, "web": None})
+    state = _state(["iqvia", "unknown", "web"])
+    visited = []
+
+    while True:
+        state = {**state, **master_agent.schedule_next_task(state)}
+        route = master_agent.route_after_scheduler(state)
+        if route == "report":
+            break
+        visited.append(route)
+        state[route] = {"status": "error" if route == "web" else "success"}
+
+    assert visited == ["iqvia", "web"]
+    assert state["pending_tasks"] == []
+    assert {task: timing["status"] for task, timing in state["task_timings"].items()} == \
+        {"iqvia": "success", "unknown": "skipped", "web": "error"}
@@ -0,0 +1,60 @@
+from datetime import date
+from agents.patent_index import PatentIndex, add_months, parse_date, patents_from_dataset
+
+DATASET = {
+    "Metformin": {
+        "fto_risks": ["US-1"],
+        "active_patents": [{"patent_number": "US-1", "title": "Extended release", "molecule": "Metformin", "expiry": "2027-03-01"}],
+        "patent_expiry_timeline": [
+            {"patent_number": "US-1", "expiry_date": "2030-01-01"},
+            {"patent_number": "US-2", "expiry_date": "2026-06"},
+            {"patent_number": "US-3", "expiry_date": "unknown"}
+        ]
+    },
+    "diabetes": {"patent_expiry_timeline": [{"patent_number": "US-2", "expiry_date": "2026-06-01"}]}
+}
+
+def _index():
+    index = PatentIndex()
+    index.sync(patents_from_dataset(DATASET))
+    return index
+
+def test_dataset_is_flattened_to_one_entry_per_patent():
+    patents = patents_from_dataset(DATASET)
+
+    assert sorted(patents) == ["US-1", "US-2"]
+    assert patents["US-1"]["expiry"] == date(2027, 3, 1)
+    assert patents["US-1"]["fto_risk"]
+    assert patents["US-2"]["groups"] == ["metformin", "diabetes"]
+
+def test_dates_and_month_arithmetic():
+    assert parse_date("2026") == date(2026, 1, 1)
+    assert parse_date("soon") is None
+    assert add_months(date(2026, 1, 31), 1) == date(2026, 2, 28)
+    assert add_months(date(2026, 11, 15), 14) == date(2028, 1, 15)
+
+def test_expiring_returns_the_window_soonest_first():
+    index = _index()
+
+    assert [p["patent_number"] for p in index.expiring(date(2026, 1, 1), date(2028, 1, 1))] == ["US-2", "US-1"]
+    assert index.expiring(date(2026, 1, 1), date(2028, 1, 1), numbers={"US-1"})[0]["patent_number"] == "US-1"
+    assert index.expiring(date(2031, 1, 1), date(2032, 1, 1)) == []
+
+def test_sync_applies_changes_incrementally():
+    index = _index()
+    updated = {"Metformin": {"patent_expiry_timeline": [{"patent_number": "US-1", "expiry_date": "2035-01-01"}]}}
+
+    assert index.sync(patents_from_dataset(updated)) == {"added_or_updated": 1, "removed": 1}
+    assert len(index) == 1
+    assert index.find("diabetes") is None
+    assert index.expiring(date(2034, 1, 1), date(2036, 1, 1))[0]["patent_number"] == "US-1"
+
+def test_fto_clears_once_the_last_flagged_patent_expires():
+    index = _index()
+    numbers = index.patents_for("metformin")
+
+    restricted = index.fto_rollup(numbers, as_of=date(2026, 1, 1))
+    assert restricted["status"] == "restricted"
+    assert restricted["clear_from"] == "2027-03-01"
+    assert index.fto_rollup(numbers, as_of=date(2026, 1, 1), launch_date=date(2028, 1, 1))["status"] == "clear"
+    assert index.fto_rollup(set(), as_of=date(2026, 1, 1))["status"] == "unknown"
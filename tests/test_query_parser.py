@@ -0,0 +1,30 @@
+import json
+import os
+import pytest
+from agents.query_parser import QueryParser
+
+# Parses of mock_data/synthetic_queries.json by the keyword parser the entity extractor replaced
+with open(os.path.join(os.path.dirname(__file__), "data", "baseline_parses.json")) as f:
+    BASELINE = json.load(f)
+
+# Deliberate differences from the keyword parser: dictionary entities it missed
+INTENDED_CHANGES = {
+    "Analyze market opportunity for repurposing metformin for cancer treatment": {"disease": "cancer"},
+    "What are the patent expiry timelines for statin drugs?": {"molecule": "Statin"}
+}
+
+@pytest.mark.parametrize("query", list(BASELINE))
+def test_parse_matches_the_keyword_parser(query):
+    parsed = QueryParser.parse_query(query)
+    expected = {**BASELINE[query], **INTENDED_CHANGES.get(query, {})}
+
+    assert {field: parsed[field] for field in ("molecule", "disease", "therapy_area", "query_type")} == \
+        {field: expected[field] for field in ("molecule", "disease", "therapy_area", "query_type")}
+    assert QueryParser.decompose_query(parsed) == expected["subtasks"]
+
+def test_explicit_disease_stops_at_a_recognized_molecule():
+    # The keyword parser captured "asthma with metformin" as the disease and the molecule
+    parsed = QueryParser.parse_query("Find disease: asthma with metformin")
+
+    assert parsed["disease"] == "asthma"
+    assert parsed["molecule"] == "Metformin"
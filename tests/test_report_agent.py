@@ -0,0 +1,38 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate
+from agents import report_agent
+from agents.report_agent import _section_flowables, cached_flowables, section_cache, section_fingerprint
+
+# Long enough to split across pages, which rewrites the split lines' fragments
+SECTIONS = [
+    (f"Section {i}", {"status": "success", "summary": "market growth " * 40,
+                      "competitors": [f"Company {n}" for n in range(5)], "notes": "detail " * 30})
+    for i in range(12)
+]
+
+def _render(cached: bool) -> bytes:
+    story = []
+    for name, data in SECTIONS:
+        if cached:
+            story += cached_flowables(section_fingerprint(name, data), lambda: _section_flowables(name, data))
+        else:
+            story += _section_flowables(name, data)
+    buffer = io.BytesIO()
+    # invariant=1 leaves out the creation date and random document ID
+    SimpleDocTemplate(buffer, pagesize=letter, invariant=1).build(story)
+    return buffer.getvalue()
+
+def test_concurrent_reports_from_cached_sections_are_identical():
+    section_cache.clear()
+    expected = _render(cached=False)
+    # Warm the cache, then render the same sections from many threads at once
+    assert _render(cached=True) == expected
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        pdfs = list(pool.map(lambda _: _render(cached=True), range(32)))
+
+    assert all(pdf == expected for pdf in pdfs)
+    assert report_agent.section_cache.stats()["hits"] >= 32 * len(SECTIONS)
+    section_cache.clear()
@@ -0,0 +1,60 @@
+import threading
+import time
+import pytest
+from agents import report_agent
+from agents.report_jobs import ReportJobQueue
+
+@pytest.fixture
+def release(monkeypatch):
+    """Fake renderer that blocks until the returned event is set"""
+    event = threading.Event()
+
+    def generate_reports(state):
+        event.wait(5)
+        if state.get("fail"):
+            return {"summary": "no data"}
+        return {"report_path": f"reports/{state['query']}.pdf", "report_files": [f"reports/{state['query']}.pdf"]}
+    monkeypatch.setattr(report_agent, "generate_reports", generate_reports)
+    yield event
+    event.set()
+
+def test_job_reports_its_file_once_rendered(release):
+    queue = ReportJobQueue(workers=1, queue_limit=1)
+    job_id = queue.submit({"query": "metformin"})
+    assert queue.status(job_id)["status"] in ("queued", "running")
+
+    release.set()
+    job = queue.wait(job_id, timeout=5)
+
+    assert job["status"] == "done"
+    assert job["report_path"] == "reports/metformin.pdf"
+    assert job["finished_at"] >= job["submitted_at"]
+
+def test_full_queue_rejects_new_jobs(release):
+    queue = ReportJobQueue(workers=1, queue_limit=1)
+    running = queue.submit({"query": "a"})
+    while queue.status(running)["status"] == "queued":
+        time.sleep(0.01)
+    waiting = queue.submit({"query": "b"})
+    rejected = queue.submit({"query": "c"})
+
+    assert queue.status(rejected)["status"] == "rejected"
+    assert queue.position(waiting) == 1
+    assert queue.position(running) == 0
+
+    release.set()
+    assert queue.wait(waiting, timeout=5)["status"] == "done"
+    # Capacity is released once jobs finish
+    assert queue.wait(queue.submit({"query": "d"}), timeout=5)["status"] == "done"
+
+def test_failed_render_is_reported_as_an_error(release):
+    queue = ReportJobQueue(workers=1, queue_limit=1)
+    release.set()
+
+    job = queue.wait(queue.submit({"query": "a", "fail": True}), timeout=5)
+
+    assert job["status"] == "error"
+    assert job["error"] == "no data"
+
+def test_unknown_job_id():
+    assert ReportJobQueue(workers=1, queue_limit=0).status("missing")["status"] == "unknown"
@@ -0,0 +1,25 @@
+from agents.query_parser import QueryParser
+from agents.result_cache import query_cache_key
+
+def _key(query, upload=None):
+    return query_cache_key(QueryParser.parse_query(query), upload, ["pdf"])
+
+def test_query_dependent_agents_do_not_share_results_across_queries():
+    # Both run the web and internal agents, which search with the query text
+    assert _key("Find opportunities for metformin") != _key("What are metformin opportunities")
+    assert _key("Market size of metformin") != _key("Metformin market size")
+
+def test_entity_only_agents_share_results_across_wordings():
+    # Trade analysis runs only the exim and iqvia agents, keyed on the molecule
+    assert _key("Export data for metformin") == _key("Metformin import export trade")
+
+def test_uploads_are_keyed_by_content(tmp_path):
+    first, same, other = tmp_path / "a.pdf", tmp_path / "b.pdf", tmp_path / "c.pdf"
+    first.write_bytes(b"%PDF-1.4 one")
+    same.write_bytes(b"%PDF-1.4 one")
+    other.write_bytes(b"%PDF-1.4 two")
+    query = "Find opportunities for metformin"
+
+    assert _key(query, str(first)) == _key(query, str(same))
+    assert _key(query, str(first)) != _key(query, str(other))
+    assert _key(query, str(first)) != _key(query)
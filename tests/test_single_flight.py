@@ -0,0 +1,79 @@
+import threading
+import time
+import pytest
+from agents import master_agent
+from agents.single_flight import SingleFlight, WaitTimeout, agent_flights, lookup_key, single_flight
+
+def test_concurrent_callers_share_one_run():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do(("web", "q"), work)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do(("web", "q"), work)))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert calls == [1]
+    assert sorted(results) == [("result", False), ("result", True)]
+    assert flights.stats()["web"] == {"leaders": 1, "followers": 1}
+    assert flights.in_flight() == 0
+
+def test_follower_wait_is_bounded():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    leader = threading.Thread(target=lambda: flights.do(("web", "q"), lambda: started.set() or release.wait(5)))
+    leader.start()
+    started.wait(5)
+
+    with pytest.raises(WaitTimeout):
+        flights.do(("web", "q"), lambda: "never runs", timeout=0.05)
+    release.set()
+    leader.join()
+
+def test_follower_of_a_hung_agent_times_out_with_an_error(monkeypatch):
+    monkeypatch.setattr(master_agent, "AGENT_TIMEOUT_SECONDS", 0.1)
+    started, release = threading.Event(), threading.Event()
+
+    def hung(state):
+        started.set()
+        release.wait(5)
+        return {"web": {"status": "success"}}
+
+    node = single_flight("web", hung)
+    state = {"query": "metformin news"}
+    leader = threading.Thread(target=node, args=(state,))
+    leader.start()
+    started.wait(5)
+
+    output = node(state)["web"]
+    assert output["status"] == "error"
+    assert "timed out" in output["summary"]
+    release.set()
+    leader.join()
+    assert agent_flights.in_flight() == 0
+
+def test_uploads_are_keyed_by_content(tmp_path):
+    first, copy, other = tmp_path / "a.pdf", tmp_path / "b.pdf", tmp_path / "c.pdf"
+    first.write_bytes(b"%PDF-1.4 report")
+    copy.write_bytes(b"%PDF-1.4 report")
+    other.write_bytes(b"%PDF-1.4 other")
+    state = {"query": "metformin", "molecule": "Metformin", "entities": [{"type": "molecule", "value": "metformin"}]}
+
+    def key(path):
+        return lookup_key("internal", {**state, "uploaded_file_path": str(path)})
+
+    assert key(first) == key(copy)
+    assert key(first) != key(other)
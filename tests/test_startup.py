@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+from agents import startup
+from agents.startup import StartupTimer, by_package
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["langgraph", "reportlab", "PyPDF2", "numpy", "agents.iqvia_agent", "agents.report_agent", "agents.internal_agent"]
+
+def _loaded_after(statement):
+    code = f"import sys\n{statement}\nprint(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    completed = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return completed.stdout.split()
+
+def test_importing_the_orchestrator_loads_no_heavy_libraries():
+    assert _loaded_after("import agents.master_agent") == []
+
+def test_graph_is_compiled_on_first_use():
+    assert "langgraph" in _loaded_after("import agents.master_agent\nagents.master_agent.app")
+
+def test_import_times_are_grouped_by_package():
+    records = startup.import_times("agents.results")
+
+    assert any(r["module"] == "agents.results" for r in records)
+    totals = by_package(records)
+    assert abs(sum(totals.values()) - sum(r["self_ms"] for r in records)) < 1e-6
+
+def test_timer_marks_milestones_in_order():
+    timer = StartupTimer()
+    timer.mark("imports")
+    timer.mark("ui")
+
+    assert list(timer.marks) == ["imports", "ui"]
+    assert timer.summary().startswith("imports ")
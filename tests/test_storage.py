@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from agents import report_agent, storage
+from agents.storage import ReportStore
+
+def _file(path, size=100, age=0.0):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return str(path)
+
+def test_sweep_only_deletes_registered_reports(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "STORAGE_GRACE_SECONDS", 0)
+    # Named like the app's reports, but not written by the store (e.g. committed to the repository)
+    unmanaged = _file(tmp_path / "pharma_intelligence_report_Respiratory_20251109_233320.pdf", age=10 * 24 * 3600)
+    store = ReportStore(str(tmp_path), max_bytes=10 ** 6, max_age_hours=1, upload_dir=str(tmp_path / "uploads"))
+    old = _file(tmp_path / "pharma_intelligence_report_old.pdf")
+    store.add("old", [old])
+    os.utime(old, (time.time() - 2 * 3600,) * 2)
+
+    removed = store.sweep()
+
+    assert removed["evicted_age"] == 1
+    assert not os.path.exists(old)
+    assert os.path.exists(unmanaged)
+
+def test_registered_reports_survive_a_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "STORAGE_GRACE_SECONDS", 0)
+    store = ReportStore(str(tmp_path), max_bytes=150, max_age_hours=0)
+    # Measure the (empty) directory first so the quota applies from the first add
+    store.usage()
+    first = _file(tmp_path / "pharma_intelligence_a.pdf", age=60)
+    second = _file(tmp_path / "pharma_intelligence_b.pdf")
+    store.add("a", [first])
+    store.add("b", [second])
+    assert os.path.exists(second) and not os.path.exists(first)
+
+    restarted = ReportStore(str(tmp_path), max_bytes=150, max_age_hours=0)
+    assert restarted.lookup("b") == [second]
+    assert restarted.lookup("a") is None
+
+def test_first_add_measures_usage_in_the_background(tmp_path, monkeypatch):
+    store = ReportStore(str(tmp_path), max_bytes=0, max_age_hours=0, upload_dir=str(tmp_path / "uploads"))
+    sweeps = []
+    sweep = store.sweep
+    monkeypatch.setattr(store, "sweep", lambda: sweeps.append(threading.current_thread().name) or sweep())
+
+    store.add("a", [_file(tmp_path / "pharma_intelligence_a.pdf")])
+
+    deadline = time.monotonic() + 5
+    while store._report_bytes is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store._report_bytes == 100
+    assert sweeps == ["storage-seed"]
+
+def test_partial_exports_are_registered_but_not_reused(tmp_path, monkeypatch):
+    store = ReportStore(str(tmp_path), max_age_hours=0, upload_dir=str(tmp_path / "uploads"))
+    monkeypatch.setattr(report_agent, "report_store", store)
+    monkeypatch.setattr(report_agent, "REPORTS_DIR", str(tmp_path))
+
+    def write_exports(results, formats, base_path, errors):
+        errors["xlsx"] = "disk full"
+        return [_file(base_path + ".csv")]
+    monkeypatch.setattr(report_agent, "write_exports", write_exports)
+
+    result = report_agent._write_reports({"query": "metformin"}, ["csv", "xlsx"], "key")
+
+    assert "xlsx: disk full" in result["summary"]
+    assert store.lookup("key") is None
+    assert store.lookup("key:incomplete") == result["report_files"]
+    store.clear()
+    assert not os.path.exists(result["report_files"][0])
@@ -0,0 +1,26 @@
+import json
+import os
+from urllib.request import urlopen
+import pytest
+from agents.data_store import DATA_DIR
+from agents.stub_server import start_stub_server
+
+@pytest.fixture
+def base_url():
+    server = start_stub_server(0)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def _get(url):
+    with urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+def test_lists_the_default_data_directory(base_url):
+    expected = sorted(f for f in os.listdir(DATA_DIR) if f.endswith(".json"))
+    assert _get(f"{base_url}/datasets") == expected
+
+def test_lookup_returns_the_first_matching_candidate(base_url):
+    result = _get(f"{base_url}/datasets/iqvia_mock.json/lookup?q=nosuchmolecule&q=metformin")
+    assert result["key"] == "metformin"
+    assert result["record"]
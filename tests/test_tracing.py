@@ -0,0 +1,58 @@
+from langgraph.graph import StateGraph, END
+from agents import tracing
+from agents.master_agent import State
+from agents.tracing import traced
+
+def _graph():
+    graph = StateGraph(State)
+    graph.add_node("master", traced("master", lambda state: {"molecule": "Metformin"}))
+    graph.add_node("web", traced("web", lambda state: {"web": {"status": "success"}}))
+    graph.set_entry_point("master")
+    graph.add_edge("master", "web")
+    graph.add_edge("web", END)
+    return graph.compile()
+
+def test_default_run_leaves_trace_empty(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_IN_STATE", False)
+    result = _graph().invoke({"query": "metformin"})
+
+    assert not result.get("trace")
+    # The spans are still recorded and can be fetched by trace ID
+    assert [span["node"] for span in tracing.get_trace(result["trace_id"])] == ["master", "web"]
+
+def test_trace_in_state_copies_every_span(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_IN_STATE", True)
+    result = _graph().invoke({"query": "metformin"})
+
+    assert [span["node"] for span in result["trace"]] == ["master", "web"]
+
+def test_spans_record_errors_annotations_and_parents():
+    def web(state):
+        tracing.annotate(cache="hit")
+        return {"web": {"status": "error", "summary": "search offline"}}
+    inner = traced("web", web)
+    outer = traced("master", lambda state: inner(state))
+
+    trace_id = tracing.new_trace_id()
+    outer({"query": "metformin", "trace_id": trace_id})
+    spans = {span["node"]: span for span in tracing.get_trace(trace_id)}
+
+    assert spans["web"]["status"] == "error"
+    assert spans["web"]["error"] == "search offline"
+    assert spans["web"]["cache"] == "hit"
+    assert spans["web"]["parent_id"] == spans["master"]["span_id"]
+
+def test_metrics_render_counters_histograms_and_collectors():
+    registry = tracing.Metrics(buckets=[0.1, 1.0])
+    registry.add_collector(lambda: ["pharma_extra 1"])
+    registry.observe({"node": "web", "status": "success", "duration_ms": 50, "cache": "miss", "payload_bytes": 10})
+    registry.observe({"node": "web", "status": "error", "duration_ms": 500})
+
+    text = registry.render()
+
+    assert 'pharma_node_calls_total{node="web",status="error"} 1' in text
+    assert 'pharma_node_cache_total{node="web",result="miss"} 1' in text
+    assert 'pharma_node_duration_seconds_bucket{node="web",le="0.1"} 1' in text
+    assert 'pharma_node_duration_seconds_bucket{node="web",le="+Inf"} 2' in text
+    assert 'pharma_node_payload_bytes_total{node="web"} 10' in text
+    assert text.endswith("pharma_extra 1\n")
@@ -0,0 +1,51 @@
+import json
+import pytest
+from agents import trial_store
+from agents.data_store import dataset_cache
+
+CLINICAL = {
+    "respiratory": {
+        "ongoing_trials": [
+            {"trial_id": "NCT1", "title": "Zorbex for asthma", "phase": "Phase 3", "sponsor": "GSK"},
+            {"trial_id": "NCT2", "title": "Inhaler study", "phase": "Phase II", "sponsor": "Novartis"}
+        ],
+        "completed_trials": [{"trial_id": "NCT3", "title": "Asthma device study", "sponsor": "GSK"}]
+    }
+}
+
+def _write(path, data):
+    path.write_text(json.dumps(data))
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    _write(tmp_path / trial_store.CLINICAL_FILE, CLINICAL)
+    _write(tmp_path / "entity_dictionary.json", {"molecules": [], "diseases": ["asthma"], "therapy_areas": ["respiratory"]})
+    _write(tmp_path / "synonyms.json", {})
+    monkeypatch.setattr(dataset_cache, "data_dir", str(tmp_path))
+    monkeypatch.setattr(dataset_cache, "stat_interval", 0)
+    monkeypatch.setattr(trial_store, "TRIAL_DB", str(tmp_path / "trials.sqlite"))
+    monkeypatch.setattr(trial_store, "STAT_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(trial_store, "_store", None)
+    monkeypatch.setattr(trial_store, "_store_signature", None)
+    dataset_cache.invalidate()
+    yield tmp_path
+    if trial_store._store is not None:
+        trial_store._store.close()
+    dataset_cache.invalidate()
+
+def test_trials_are_filed_under_title_entities_and_filtered(data_dir):
+    store = trial_store.get_trial_store()
+
+    assert store.has_condition("asthma")
+    assert [t["trial_id"] for t in store.query(condition="respiratory", phase=3)] == ["NCT1"]
+    assert store.count(group_by="phase", condition="respiratory") == {3: 1, 2: 1, None: 1}
+    assert store.count(group_by="sponsor", condition="asthma")["GSK"] == 2
+
+def test_store_rebuilds_when_the_entity_dictionary_changes(data_dir):
+    assert trial_store.get_trial_store().has_condition("zorbex") is None
+
+    # Same clinical file; only the vocabulary that files trials by title changes
+    _write(data_dir / "entity_dictionary.json",
+           {"molecules": ["zorbex"], "diseases": ["asthma"], "therapy_areas": ["respiratory"]})
+
+    assert trial_store.get_trial_store().has_condition("zorbex") == "zorbex"